@@ -0,0 +1,265 @@
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import gen_sql_inserts
+import gerar_dados_sinteticos
+import preprocess
+from verificar_normalizacao_cid import causas_com_melt, gerar_colunas_cid
+
+# --- CONFIGURAÇÕES ---
+LINHAS_BENCHMARK_SQL = 50000
+LINHAS_BENCHMARK_CID = 200000
+# Suíte por escala (python benchmark.py escalas [registros ...]): gera um arquivo DO
+# sintético por escala e roda o preprocess.py e o gen_sql_inserts.py sobre ele.
+ESCALAS_BENCHMARK = [10000, 100000, 1000000]  # Use 5000000 para o tamanho de um ano completo do SIM
+PASTA_TRABALHO_BENCHMARK = None  # Onde ficam os arquivos de cada escala (None: pasta temporária do sistema)
+ARQUIVO_RESULTADOS_ESCALAS = "relatorio_benchmark_escalas.json"
+ARQUIVOS_DO_PROJETO = ['schema.sql', 'cubos.sql']  # Lidos pelo gen_sql_inserts.py na pasta de trabalho
+ETAPAS_PREPROCESS = ['carga_consultas', 'leitura_csv', 'transformacao', 'dimensoes_dinamicas', 'normalizacao_cid', 'tabelas_de_fatos', 'escrita']
+ETAPAS_GEN_SQL = ['schema', 'leitura', 'sql']
+
+
+def gerar_tabela_exemplo(numero_de_linhas: int, semente: int = 0) -> pd.DataFrame:
+    """Gera um DataFrame no formato da tabela Obito, com nulos, datas e horas, para medir o gerador SQL."""
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        'id': np.arange(1, numero_de_linhas + 1),
+        'local_obito_id': rng.choice([1, 2, 3, 4, 5, 6, 9], numero_de_linhas).astype(float),
+        'tipo_de_morte_id': rng.choice([1, 2, 3, 4, 9, np.nan], numero_de_linhas),
+        'data_ocorrencia': pd.Series(pd.date_range('2024-01-01', periods=366)).dt.strftime('%Y-%m-%d')
+                             .sample(numero_de_linhas, replace=True, random_state=semente).to_numpy(),
+        'hora_ocorrencia': rng.choice(['12:30:00', '00:05:00', None], numero_de_linhas),
+        'estabelecimento_de_saude_id': rng.choice([2077485, 2078015, np.nan], numero_de_linhas),
+        'nome': rng.choice(["HOSPITAL SANT'ANA", 'UBS CENTRO', None], numero_de_linhas),
+    })
+    return df
+
+
+def medir(funcao, *args) -> float:
+    """Executa a função uma vez e retorna o tempo de parede em segundos."""
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+
+def inserts_por_linha(df: pd.DataFrame, nome_tabela: str):
+    """Implementação original (iterrows + formatar_valor_sql), mantida como referência do benchmark."""
+    f_out = io.StringIO()
+    nomes_colunas_sql = ', '.join([f'"{col}"' for col in df.columns])
+    insert_inicio = f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) VALUES "
+    colunas_conflito = gen_sql_inserts.COLUNAS_DE_CONFLITO[nome_tabela]
+    for _, linha in df.iterrows():
+        valores_sql = ', '.join([gen_sql_inserts.formatar_valor_sql(linha[col], df[col].dtype) for col in df.columns])
+        f_out.write(f"{insert_inicio}({valores_sql}) ON CONFLICT ({colunas_conflito}) DO NOTHING;\n")
+    return f_out.getvalue()
+
+
+def inserts_vetorizados(df: pd.DataFrame, nome_tabela: str, linhas_por_insert: int):
+    f_out = io.StringIO()
+    gen_sql_inserts.escrever_inserts_tabela(f_out, nome_tabela, df, linhas_por_insert)
+    return f_out.getvalue()
+
+
+def benchmark_gerador_sql(numero_de_linhas: int = LINHAS_BENCHMARK_SQL):
+    """Compara linhas/s do gerador de INSERTs original com o vetorizado, e confere que a saída é a mesma."""
+    df = gerar_tabela_exemplo(numero_de_linhas)
+
+    if inserts_por_linha(df, 'Obito') != inserts_vetorizados(df, 'Obito', 1):
+        raise AssertionError("A saída vetorizada difere da saída original.")
+
+    tempo_original = medir(inserts_por_linha, df, 'Obito')
+    print(f"{'iterrows (original)':<34} {numero_de_linhas / tempo_original:>14,.0f} linhas/s")
+    for linhas_por_insert in (1, 1000):
+        tempo = medir(inserts_vetorizados, df, 'Obito', linhas_por_insert)
+        rotulo = f"vetorizado, {linhas_por_insert} linha(s)/INSERT"
+        print(f"{rotulo:<34} {numero_de_linhas / tempo:>14,.0f} linhas/s  ({tempo_original / tempo:.1f}x)")
+
+
+def benchmark_normalizacao_cid(numero_de_linhas: int = LINHAS_BENCHMARK_CID):
+    """
+    Compara a velocidade da normalização de CIDs original com `preprocess.normalizar_causas`.
+    A equivalência dos resultados é conferida por verificar_normalizacao_cid.py.
+    """
+    df = gerar_colunas_cid(numero_de_linhas)
+
+    tempo_original = medir(causas_com_melt, df)
+    print(f"{'melt + explode (original)':<34} {numero_de_linhas / tempo_original:>14,.0f} linhas/s")
+    tempo = medir(preprocess.normalizar_causas, df, {})
+    print(f"{'normalizar_causas':<34} {numero_de_linhas / tempo:>14,.0f} linhas/s  ({tempo_original / tempo:.1f}x)")
+
+
+def vincular(origem: Path, destino: Path):
+    """Cria `destino` apontando para `origem` (cópia onde não há links simbólicos)."""
+    try:
+        os.symlink(origem.resolve(), destino)
+    except OSError:
+        shutil.copy(origem, destino)
+
+
+def preparar_pasta_de_trabalho(pasta: Path):
+    """Monta a pasta onde os scripts rodam: arquivos de consulta e arquivos .sql do projeto."""
+    for caminho in (preprocess.ARQUIVO_LOOKUP_CID, preprocess.ARQUIVO_LOOKUP_MUNICIPIO,
+                    preprocess.ARQUIVO_LOOKUP_OCUPACAO, preprocess.ARQUIVO_LOOKUP_CNES, *ARQUIVOS_DO_PROJETO):
+        if os.path.exists(caminho):
+            (pasta / caminho).parent.mkdir(parents=True, exist_ok=True)
+            vincular(Path(caminho), pasta / caminho)
+
+
+def somar_etapas(etapas: dict, nome: str) -> dict:
+    """Soma as etapas `nome` e `nome:*` (ex.: todas as 'escrita:<Tabela>') de um relatório de execução."""
+    medidas = [medida for etapa, medida in etapas.items() if etapa == nome or etapa.startswith(f'{nome}:')]
+    if not medidas:
+        return None
+    return {
+        'tempo_parede_s': sum(medida['tempo_parede_s'] for medida in medidas),
+        'tempo_cpu_s': sum(medida['tempo_cpu_s'] for medida in medidas),
+        'pico_rss_processo_mb': max((medida['pico_rss_processo_mb'] or 0 for medida in medidas), default=None),
+        'maior_aumento_rss_mb': max((medida['maior_aumento_rss_mb'] or 0 for medida in medidas), default=None),
+    }
+
+
+def resumir_relatorio(relatorio: dict, registros: int, etapas: list) -> dict:
+    """Tempo total, vazão (registros de entrada por segundo) e pico de memória de uma execução, por etapa."""
+    resumo = {
+        'tempo_parede_s': relatorio['tempo_parede_s'],
+        'tempo_cpu_s': relatorio['tempo_cpu_s'],
+        'registros_por_s': registros / relatorio['tempo_parede_s'],
+        'pico_rss_mb': relatorio['pico_rss_mb'],
+        'etapas': {},
+    }
+    for nome in etapas:
+        medida = somar_etapas(relatorio['etapas'], nome)
+        if medida is not None:
+            medida['registros_por_s'] = registros / medida['tempo_parede_s'] if medida['tempo_parede_s'] else None
+            resumo['etapas'][nome] = medida
+    return resumo
+
+
+# As funções abaixo rodam em um processo novo cada uma (ver `executar_isolado`), para
+# que o pico de RSS medido seja só o da etapa e os módulos comecem da configuração padrão.
+
+def gerar_arquivo_na_pasta(pasta: str, registros: int) -> dict:
+    os.chdir(pasta)
+    return gerar_dados_sinteticos.gerar_arquivo_sintetico(os.path.join('Data', f'DO_SINTETICO_{registros}.csv'), registros)
+
+
+def usar_cadastro_cnes(cadastro_cnes: str):
+    """Aponta o preprocess.py para o cadastro CNES sintético, quando a geração gravou um (só neste processo)."""
+    if cadastro_cnes:
+        preprocess.ARQUIVO_LOOKUP_CNES = cadastro_cnes
+
+
+def medir_carga_de_consulta(pasta: str, cadastro_cnes: str = None) -> dict:
+    """Tempo de `preprocess.carregar_dados_de_consulta` lendo os arquivos de consulta e lendo o cache binário."""
+    os.chdir(pasta)
+    usar_cadastro_cnes(cadastro_cnes)
+    if os.path.exists(preprocess.ARQUIVO_CACHE_CONSULTA):
+        os.remove(preprocess.ARQUIVO_CACHE_CONSULTA)
+    tempo_sem_cache = medir(preprocess.carregar_dados_de_consulta, False)
+    preprocess.carregar_dados_de_consulta()  # grava o cache
+    tempo_com_cache = medir(preprocess.carregar_dados_de_consulta)
+    return {'sem_cache_s': tempo_sem_cache, 'com_cache_s': tempo_com_cache}
+
+
+def executar_preprocess_na_pasta(pasta: str, arquivo: str, cadastro_cnes: str = None) -> dict:
+    os.chdir(pasta)
+    usar_cadastro_cnes(cadastro_cnes)
+    shutil.rmtree(preprocess.PASTA_SAIDA, ignore_errors=True)
+    preprocess.NUMERO_DE_LINHAS = None
+    preprocess.main([arquivo])
+    with open(preprocess.ARQUIVO_RELATORIO_EXECUCAO, encoding='utf-8') as f_in:
+        return json.load(f_in)
+
+
+def executar_gen_sql_na_pasta(pasta: str) -> dict:
+    os.chdir(pasta)
+    gen_sql_inserts.gerar_script_sql_com_inserts()
+    with open(gen_sql_inserts.ARQUIVO_RELATORIO_EXECUCAO, encoding='utf-8') as f_in:
+        return json.load(f_in)
+
+
+def executar_isolado(funcao, *args):
+    """Executa `funcao(*args)` em um processo novo (spawn) e retorna o resultado."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(funcao, *args).result()
+
+
+def imprimir_etapas(resultados: list, script: str, etapas: list):
+    print(f"{script + ' (s)':<22}" + ''.join(f"{resultado['registros']:>14,}" for resultado in resultados))
+    for nome in ['total'] + etapas:
+        tempos = []
+        for resultado in resultados:
+            medida = resultado[script] if nome == 'total' else resultado[script]['etapas'].get(nome)
+            tempos.append(f"{medida['tempo_parede_s']:>14.2f}" if medida else f"{'-':>14}")
+        print(f"  {nome:<20}" + ''.join(tempos))
+
+
+def benchmark_escalas(escalas: list = ESCALAS_BENCHMARK, pasta_trabalho: str = PASTA_TRABALHO_BENCHMARK) -> dict:
+    """
+    Para cada escala, gera um arquivo DO sintético e mede o preprocess.py e o
+    gen_sql_inserts.py sobre ele, cada um em um processo novo: tempo de cada etapa,
+    registros por segundo e pico de memória. Mede também a carga dos arquivos de
+    consulta com e sem o cache. Os resultados vão para ARQUIVO_RESULTADOS_ESCALAS.
+    """
+    resultados = {'escalas': list(escalas), 'resultados': []}
+    with tempfile.TemporaryDirectory(prefix='benchmark_sim_', dir=pasta_trabalho) as pasta:
+        preparar_pasta_de_trabalho(Path(pasta))
+
+        for registros in escalas:
+            print(f"--- Escala: {registros:,} registros ---")
+            geracao = executar_isolado(gerar_arquivo_na_pasta, pasta, registros)
+            if 'carga_consultas' not in resultados:
+                resultados['carga_consultas'] = executar_isolado(medir_carga_de_consulta, pasta, geracao['cadastro_cnes'])
+
+            relatorio_preprocess = executar_isolado(executar_preprocess_na_pasta, pasta, geracao['arquivo'], geracao['cadastro_cnes'])
+            if relatorio_preprocess['resultados']['erro']:
+                raise RuntimeError(f"O preprocess.py falhou: {relatorio_preprocess['resultados']['erro']}")
+            relatorio_gen_sql = executar_isolado(executar_gen_sql_na_pasta, pasta)
+
+            resultado = {
+                'registros': registros,
+                'geracao_s': geracao['tempo_s'],
+                'tamanho_entrada_mb': os.path.getsize(Path(pasta) / geracao['arquivo']) / 2**20,
+                'preprocess': resumir_relatorio(relatorio_preprocess, registros, ETAPAS_PREPROCESS),
+                'gen_sql': resumir_relatorio(relatorio_gen_sql, registros, ETAPAS_GEN_SQL),
+            }
+            resultado['gen_sql']['tamanho_saida_mb'] = relatorio_gen_sql['resultados']['tamanho_saida_bytes'] / 2**20
+            resultados['resultados'].append(resultado)
+            os.remove(Path(pasta) / geracao['arquivo'])
+
+            for script in ('preprocess', 'gen_sql'):
+                medida = resultado[script]
+                print(f"{script:<12} {medida['tempo_parede_s']:>9.2f} s  {medida['registros_por_s']:>12,.0f} registros/s  "
+                      f"pico {medida['pico_rss_mb'] or 0:>8.1f} MB")
+
+    consulta = resultados['carga_consultas']
+    print(f"\n--- carregar_dados_de_consulta: {consulta['sem_cache_s']:.3f} s sem cache, {consulta['com_cache_s']:.3f} s com cache ---")
+    imprimir_etapas(resultados['resultados'], 'preprocess', ETAPAS_PREPROCESS)
+    imprimir_etapas(resultados['resultados'], 'gen_sql', ETAPAS_GEN_SQL)
+
+    if ARQUIVO_RESULTADOS_ESCALAS:
+        with open(ARQUIVO_RESULTADOS_ESCALAS, 'w', encoding='utf-8') as f_out:
+            json.dump(resultados, f_out, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em '{ARQUIVO_RESULTADOS_ESCALAS}'.")
+    return resultados
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['escalas']:
+        benchmark_escalas([int(registros) for registros in sys.argv[2:]] or ESCALAS_BENCHMARK)
+    else:
+        print(f"--- Gerador SQL ({LINHAS_BENCHMARK_SQL} linhas) ---")
+        benchmark_gerador_sql()
+        print(f"--- Normalização de CIDs ({LINHAS_BENCHMARK_CID} linhas) ---")
+        benchmark_normalizacao_cid()
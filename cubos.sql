@@ -0,0 +1,83 @@
+/* Cubos pré-agregados para as consultas de queries.sql (as versões reescritas estão em
+   queries_cubos.sql). São recriados a partir das tabelas normalizadas ao fim de cada carga. */
+
+/* Óbitos por causa básica e sexo (consulta 1) */
+DROP TABLE IF EXISTS bdsm.Cubo_Causa_Basica_Sexo;
+CREATE TABLE bdsm.Cubo_Causa_Basica_Sexo AS
+SELECT
+    f.sexo_id,
+    ac.cid_id,
+    COUNT(*) AS total_obitos
+FROM bdsm.falecido f
+JOIN bdsm.obito o ON f.obito_id = o.id
+JOIN bdsm.atestado_causa ac ON o.atestado_de_obito_id = ac.atestado_de_obito_id
+WHERE ac.linha = 'CB'
+GROUP BY f.sexo_id, ac.cid_id;
+
+/* Óbitos por município de residência, sexo, escolaridade e assistência médica (consulta 2).
+   A idade média é guardada como soma e contagem das idades conhecidas. */
+DROP TABLE IF EXISTS bdsm.Cubo_Municipio_Residencia;
+CREATE TABLE bdsm.Cubo_Municipio_Residencia AS
+SELECT
+    f.municipio_residencia_id,
+    f.sexo_id,
+    f.escolaridade_nivel_id,
+    o.recebeu_assist_med_id,
+    COUNT(*) AS total_obitos,
+    COUNT(EXTRACT(YEAR FROM AGE(o.data_ocorrencia, f.data_nascimento))) AS obitos_com_idade,
+    SUM(EXTRACT(YEAR FROM AGE(o.data_ocorrencia, f.data_nascimento))::INT) AS soma_idades
+FROM bdsm.falecido f
+JOIN bdsm.obito o ON f.obito_id = o.id
+GROUP BY f.municipio_residencia_id, f.sexo_id, f.escolaridade_nivel_id, o.recebeu_assist_med_id;
+
+/* Óbitos por ocupação e acidente de trabalho (consulta 3) */
+DROP TABLE IF EXISTS bdsm.Cubo_Ocupacao_Acidente;
+CREATE TABLE bdsm.Cubo_Ocupacao_Acidente AS
+SELECT
+    f.ocupacao_habitual,
+    a.acidente_de_trabalho_id,
+    COUNT(*) AS total_obitos
+FROM bdsm.falecido f
+JOIN bdsm.obito ob ON f.obito_id = ob.id
+JOIN bdsm.atestado_de_obito a ON ob.atestado_de_obito_id = a.id_atestado_obito
+GROUP BY f.ocupacao_habitual, a.acidente_de_trabalho_id;
+
+/* Óbitos de menores de 1 ano por faixa de peso ao nascer e de semanas de gestação (consulta 4) */
+DROP TABLE IF EXISTS bdsm.Cubo_Mortalidade_Infantil;
+CREATE TABLE bdsm.Cubo_Mortalidade_Infantil AS
+SELECT
+    CASE
+        WHEN f.peso_ao_nascer IS NULL THEN NULL
+        WHEN f.peso_ao_nascer < 1500 THEN 'Muito baixo peso (<1500g)'
+        WHEN f.peso_ao_nascer < 2500 THEN 'Baixo peso (1500-2499g)'
+        WHEN f.peso_ao_nascer < 4000 THEN 'Normal (2500-3999g)'
+        ELSE 'Macrossomia (≥4000g)'
+    END AS faixa_peso,
+    CASE
+        WHEN m.semanas_gestacao IS NULL THEN NULL
+        WHEN m.semanas_gestacao < 28 THEN 'Extremamente prematuro (<28 sem)'
+        WHEN m.semanas_gestacao < 32 THEN 'Muito prematuro (28-31 sem)'
+        WHEN m.semanas_gestacao < 37 THEN 'Prematuro (32-36 sem)'
+        ELSE 'A termo (≥37 sem)'
+    END AS faixa_gestacao,
+    COUNT(*) AS total_obitos,
+    COUNT(m.idade) AS maes_com_idade,
+    SUM(m.idade) AS soma_idade_mae
+FROM bdsm.falecido f
+JOIN bdsm.mae m ON f.mae_id = m.id_mae
+JOIN bdsm.obito o ON f.obito_id = o.id
+WHERE EXTRACT(YEAR FROM AGE(o.data_ocorrencia, f.data_nascimento)) < 1
+GROUP BY faixa_peso, faixa_gestacao;
+
+/* Óbitos por idade em anos, sexo e escolaridade, para quem tem data de nascimento (consulta 5) */
+DROP TABLE IF EXISTS bdsm.Cubo_Idade_Escolaridade;
+CREATE TABLE bdsm.Cubo_Idade_Escolaridade AS
+SELECT
+    EXTRACT(YEAR FROM AGE(o.data_ocorrencia, f.data_nascimento))::INT AS idade,
+    f.sexo_id,
+    f.escolaridade_nivel_id,
+    COUNT(*) AS total_obitos
+FROM bdsm.falecido f
+JOIN bdsm.obito o ON f.obito_id = o.id
+WHERE f.data_nascimento IS NOT NULL
+GROUP BY idade, f.sexo_id, f.escolaridade_nivel_id;
@@ -1,11 +1,74 @@
 import pandas as pd
 import numpy as np
+import gzip
+import importlib
+import io
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import instrumentacao
+import preprocess
+import tabelas_parquet
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import psycopg2
+    import psycopg2.extras
+except ImportError:
+    psycopg2 = None
+
 # --- CONFIGURAÇÕES ---
 PASTA_CSVS = "Tables"
 ARQUIVO_SCHEMA = 'schema.sql'
 ARQUIVO_SAIDA = 'bdsim.sql'
+LINHAS_POR_INSERT = 1000  # Linhas por comando INSERT multi-linha (1 = um INSERT por linha)
+FORMATO_TABELAS = 'csv'  # Formato das tabelas geradas pelo preprocess.py: 'csv' ou 'parquet'
+FORMATO_SAIDA = 'insert'  # 'insert' (comandos INSERT) ou 'copy' (blocos COPY ... FROM STDIN, para o psql)
+# Para tabelas geradas com preprocess.MODO_INCREMENTAL: não recria o schema e remove
+# as linhas antigas dos registros alterados antes de carregar o delta.
+MODO_INCREMENTAL = False
+TABELA_REGISTROS_ALTERADOS = 'Registros_Alterados'
+# Cubos pré-agregados (ver queries_cubos.sql), recriados no fim do script a cada carga
+GERAR_CUBOS = True
+ARQUIVO_CUBOS = 'cubos.sql'
+# No MODO_INCREMENTAL, recriar os cubos relê o banco inteiro: só com esta opção ligada
+# (ou executando ARQUIVO_CUBOS à parte, quando convier)
+RECRIAR_CUBOS_NO_MODO_INCREMENTAL = False
+# Projeto físico: índices secundários depois da carga, chaves estrangeiras criadas só
+# depois da carga (ALTER TABLE) e particionamento declarativo de Obito por ano.
+CRIAR_INDICES = True
+ADIAR_CHAVES_ESTRANGEIRAS = False
+PARTICIONAR_OBITO_POR_ANO = False
+# Relatório JSON com tempo de parede, tempo de CPU, memória e linhas de cada etapa (None para não gravar)
+ARQUIVO_RELATORIO_EXECUCAO = 'relatorio_gen_sql.json'
+ETAPA_PERFILADA = None  # Nome de uma etapa do relatório (ex.: 'sql:Obito') para gravar seu perfil cProfile
+ARQUIVO_PERFIL = 'perfil_gen_sql.prof'
+# Saída em fragmentos: em vez de ARQUIVO_SAIDA, um arquivo por tabela (ou por LINHAS_POR_FRAGMENTO
+# linhas) em PASTA_FRAGMENTOS, formatados em paralelo, mais um manifesto e um script de carga
+# (carregar.sh) que roda o psql em paralelo nas tabelas que não dependem umas das outras.
+GERAR_FRAGMENTOS = False
+PASTA_FRAGMENTOS = 'bdsim_fragmentos'
+LINHAS_POR_FRAGMENTO = None  # None = um fragmento por tabela
+COMPRESSAO_FRAGMENTOS = 'gzip'  # None, 'gzip' ou 'zstd' (requer o pacote 'zstandard')
+NIVEL_DE_COMPRESSAO = 3
+NUMERO_DE_PROCESSOS = os.cpu_count()  # Processos que formatam as tabelas em paralelo
+# Carga direta: em vez de gerar ARQUIVO_SAIDA, insere as tabelas no banco por uma conexão
+# DB-API, uma transação por tabela. 'postgres' (psycopg2, conectando com DSN_POSTGRES) ou
+# 'sqlite' (ARQUIVO_SQLITE anexado como 'bdsm', para testar a carga sem um servidor).
+CARGA_DIRETA = None
+DSN_POSTGRES = "dbname=bdsim"
+ARQUIVO_SQLITE = "bdsim.sqlite"
+LINHAS_POR_LOTE = 10000  # Linhas por lote (executemany no sqlite3; INSERT multi-linha com execute_values no psycopg2)
+METODO_DE_CARGA = 'executemany'  # 'executemany' (lotes parametrizados, ver inserir_em_lotes) ou 'copy' (COPY FROM STDIN por uma tabela temporária; requer psycopg2)
 
 
 ORDEM_DE_CARGA = [
@@ -24,6 +87,49 @@ ORDEM_DE_CARGA = [
     'Falecido'
 ]
 
+# Tabelas de domínio fixo, iguais em toda execução do preprocess.py (as anteriores a
+# Ocupacao). No MODO_INCREMENTAL elas já estão no banco e não são reemitidas.
+TABELAS_ESTATICAS = ORDEM_DE_CARGA[:ORDEM_DE_CARGA.index('Ocupacao')]
+
+# Tabelas e colunas por onde as linhas de um registro alterado são removidas,
+# em ordem inversa às chaves estrangeiras (todas usam o id do registro).
+ORDEM_DE_REMOCAO = [
+    ('Falecido', 'id'),
+    ('Obito', 'id'),
+    ('Atestado_Causa', 'atestado_de_obito_id'),
+    ('Investigacao', 'id'),
+    ('Atestado_de_Obito', 'id_atestado_obito'),
+    ('Mae', 'id_mae'),
+]
+
+# Índices secundários para os caminhos de junção de queries.sql: nome -> (tabela, colunas, condição).
+# Falecido.obito_id já é UNIQUE e a chave primária de Atestado_Causa já começa por
+# atestado_de_obito_id, então as duas junções já têm índice.
+INDICES = {
+    'idx_falecido_sexo': ('Falecido', 'sexo_id', None),
+    'idx_falecido_municipio_residencia': ('Falecido', 'municipio_residencia_id', None),
+    'idx_falecido_escolaridade': ('Falecido', 'escolaridade_nivel_id', None),
+    'idx_falecido_ocupacao': ('Falecido', 'ocupacao_habitual', None),
+    'idx_falecido_mae': ('Falecido', 'mae_id', None),
+    'idx_obito_atestado': ('Obito', 'atestado_de_obito_id', None),
+    'idx_obito_data_ocorrencia': ('Obito', 'data_ocorrencia', None),
+    'idx_atestado_acidente': ('Atestado_de_Obito', 'acidente_de_trabalho_id', None),
+    # Índices parciais só com as causas básicas (consulta 1 e cubo de causa básica)
+    'idx_atestado_causa_basica': ('Atestado_Causa', 'atestado_de_obito_id, cid_id', "linha = 'CB'"),
+    'idx_atestado_causa_basica_cid': ('Atestado_Causa', 'cid_id', "linha = 'CB'"),
+}
+
+EXTENSOES_DE_COMPRESSAO = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+DESCOMPRESSORES = {None: 'cat', 'gzip': 'gzip -dc', 'zstd': 'zstd -dcq'}
+ARQUIVO_MANIFESTO_FRAGMENTOS = 'manifesto.json'
+ARQUIVO_SCRIPT_DE_CARGA = 'carregar.sh'
+# Marcador de parâmetro de cada `paramstyle` da DB-API suportado na carga direta
+MARCADORES_DE_PARAMETRO = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+TIPOS_SQLITE = {'int8': 'INTEGER', 'int16': 'INTEGER', 'int32': 'INTEGER'}
+
+PADRAO_CREATE_TABLE = re.compile(r'CREATE TABLE (\w+) \((.*?)\n\) ;', re.DOTALL)
+PADRAO_CHAVE_ESTRANGEIRA = re.compile(r'CONSTRAINT (\w+) FOREIGN KEY \(([^)]*)\) REFERENCES (\w+) \(([^)]*)\)')
+
 # --- MODIFICAÇÃO PRINCIPAL ---
 # O dicionário agora contém a chave primária para TODAS as tabelas do schema.
 # Isso aplicará a regra ON CONFLICT para todos os inserts.
@@ -61,6 +167,11 @@ COLUNAS_DE_CONFLITO = {
 }
 
 
+# Escapes do formato texto do COPY. A barra invertida deve ser a primeira a ser escapada.
+ESCAPES_COPY = {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'}
+NULO_COPY = '\\N'
+
+
 def formatar_valor_sql(valor, dtype):
     """
     Formata um valor Python para uma string SQL válida, tratando NULOs,
@@ -78,11 +189,426 @@ def formatar_valor_sql(valor, dtype):
     return f"'{str_valor}'"
 
 
-def gerar_script_sql_com_inserts():
+def formatar_numeros(serie: pd.Series) -> pd.Series:
+    """Converte uma coluna numérica em texto, escrevendo floats com valor inteiro sem a parte decimal."""
+    valores = serie.astype(object).astype(str)
+    if pd.api.types.is_float_dtype(serie.dtype):
+        inteiros = serie.notna() & np.isfinite(serie) & (serie % 1 == 0)
+        valores[inteiros] = serie[inteiros].astype(np.int64).astype(str)
+    return valores
+
+
+def eh_coluna_numerica(serie: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype)
+
+
+def formatar_coluna_sql(serie: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de `formatar_valor_sql`: formata a coluna inteira de uma vez,
+    com as mesmas regras de NULL, float inteiro e escape de aspas simples.
+    """
+    if eh_coluna_numerica(serie):
+        valores = formatar_numeros(serie)
+    else:
+        valores = "'" + serie.astype(object).astype(str).str.replace("'", "''", regex=False) + "'"
+
+    valores[serie.isna()] = "NULL"
+    return valores
+
+
+def formatar_coluna_copy(serie: pd.Series) -> pd.Series:
+    """
+    Formata a coluna no formato texto do COPY do PostgreSQL: nulos viram \\N e
+    barra invertida, tabulação e quebras de linha são escapadas.
+    """
+    if eh_coluna_numerica(serie):
+        valores = formatar_numeros(serie)
+    else:
+        valores = serie.astype(object).astype(str)
+        for caractere, escape in ESCAPES_COPY.items():
+            valores = valores.str.replace(caractere, escape, regex=False)
+
+    valores[serie.isna()] = NULO_COPY
+    return valores
+
+
+def juntar_colunas(df: pd.DataFrame, formatador, separador: str) -> pd.Series:
+    """Formata cada coluna com `formatador` e junta os valores de cada linha com `separador`."""
+    linhas = None
+    for col in df.columns:
+        coluna = formatador(df[col])
+        linhas = coluna if linhas is None else linhas + separador + coluna
+    return linhas
+
+
+def formatar_linhas_sql(df: pd.DataFrame) -> np.ndarray:
+    """Monta a tupla '(v1, v2, ...)' de cada linha do DataFrame a partir das colunas já formatadas."""
+    return ('(' + juntar_colunas(df, formatar_coluna_sql, ', ') + ')').to_numpy()
+
+
+def converter_colunas_de_id(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte para numérico as colunas de id, mantendo a coluna original quando a conversão falha."""
+    for col in df.columns:
+        if 'id' in col.lower():
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def escrever_inserts_tabela(f_out, nome_tabela: str, df: pd.DataFrame, linhas_por_insert: int = None):
+    """Escreve os dados da tabela como comandos INSERT de até `linhas_por_insert` (padrão: LINHAS_POR_INSERT) linhas cada."""
+    linhas_por_insert = linhas_por_insert or LINHAS_POR_INSERT
+    nomes_colunas_sql = ', '.join([f'"{col}"' for col in df.columns])
+    insert_inicio = f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) VALUES "
+
+    sufixo = ""
+    if nome_tabela in COLUNAS_DE_CONFLITO:
+        sufixo = f" ON CONFLICT ({clausula_de_conflito(nome_tabela)}) DO NOTHING"
+
+    linhas = formatar_linhas_sql(df)
+    for inicio in range(0, len(linhas), linhas_por_insert):
+        valores_sql = ',\n'.join(linhas[inicio:inicio + linhas_por_insert])
+        f_out.write(f"{insert_inicio}{valores_sql}{sufixo};\n")
+
+
+def clausula_de_conflito(nome_tabela: str) -> str:
+    """
+    Retorna as colunas de conflito da tabela, como no ON CONFLICT. Com Obito particionada,
+    a chave primária inclui a chave de partição, e o ON CONFLICT precisa dela também.
+    """
+    if nome_tabela == 'Obito' and PARTICIONAR_OBITO_POR_ANO:
+        return '"id", "data_ocorrencia"'
+    return COLUNAS_DE_CONFLITO[nome_tabela]
+
+
+def colunas_de_conflito(nome_tabela: str) -> list:
+    """Retorna os nomes (sem aspas) das colunas de conflito da tabela."""
+    return [col.strip().strip('"') for col in clausula_de_conflito(nome_tabela).split(',')]
+
+
+def tem_chaves_repetidas(nome_tabela: str, df: pd.DataFrame) -> bool:
+    return nome_tabela in COLUNAS_DE_CONFLITO and df.duplicated(subset=colunas_de_conflito(nome_tabela)).any()
+
+
+def precisa_de_staging(nome_tabela: str, df: pd.DataFrame) -> bool:
+    """
+    Indica se o COPY da tabela deve passar por uma tabela temporária (ver escrever_copy_tabela).
+    No MODO_INCREMENTAL, toda tabela com colunas de conflito passa, pois o banco já tem
+    linhas que o delta repete (ex.: as ocupações e os municípios já carregados); fora
+    dele, só as que têm chaves repetidas nos próprios dados.
+    """
+    if MODO_INCREMENTAL:
+        return nome_tabela in COLUNAS_DE_CONFLITO
+    return tem_chaves_repetidas(nome_tabela, df)
+
+
+def tabelas_a_carregar() -> list:
+    """Tabelas de ORDEM_DE_CARGA emitidas nesta execução (no MODO_INCREMENTAL, sem as TABELAS_ESTATICAS)."""
+    if MODO_INCREMENTAL:
+        return [nome_tabela for nome_tabela in ORDEM_DE_CARGA if nome_tabela not in TABELAS_ESTATICAS]
+    return ORDEM_DE_CARGA
+
+
+def escrever_copy_tabela(f_out, nome_tabela: str, df: pd.DataFrame, usar_staging: bool = None):
+    """
+    Escreve os dados da tabela como um bloco COPY ... FROM STDIN. Se houver chaves de
+    conflito repetidas nos dados ou no MODO_INCREMENTAL (ver precisa_de_staging), carrega
+    primeiro uma tabela temporária e insere dela com INSERT ... SELECT ... ON CONFLICT DO
+    NOTHING, mantendo a semântica dos INSERTs. Quem escreve só uma parte da tabela
+    informa `usar_staging`, calculado sobre a tabela inteira.
+    """
+    nomes_colunas_sql = ', '.join([f'"{col}"' for col in df.columns])
+
+    linhas = juntar_colunas(df, formatar_coluna_copy, '\t')
+
+    if usar_staging is None:
+        usar_staging = precisa_de_staging(nome_tabela, df)
+    destino = f"stg_{nome_tabela}" if usar_staging else f"bdsm.{nome_tabela}"
+
+    if usar_staging:
+        f_out.write(f"CREATE TEMP TABLE {destino} (LIKE bdsm.{nome_tabela} INCLUDING DEFAULTS);\n")
+
+    f_out.write(f"COPY {destino} ({nomes_colunas_sql}) FROM STDIN;\n")
+    f_out.writelines((linhas + '\n').to_numpy())
+    f_out.write("\\.\n")
+
+    if usar_staging:
+        f_out.write(
+            f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) "
+            f"SELECT {nomes_colunas_sql} FROM {destino} "
+            f"ON CONFLICT ({clausula_de_conflito(nome_tabela)}) DO NOTHING;\n"
+        )
+        f_out.write(f"DROP TABLE {destino};\n")
+
+
+def ler_blocos_copy(texto: str) -> dict:
+    """
+    Lê de volta os blocos COPY ... FROM STDIN de um script gerado e retorna, para cada
+    destino, a lista de colunas e as linhas com os escapes desfeitos (nulos como None).
+    Permite validar o script sem um servidor PostgreSQL.
+    """
+    desfazer = {'\\\\': '\\', '\\t': '\t', '\\n': '\n', '\\r': '\r'}
+    blocos = {}
+    linhas_texto = iter(texto.split('\n'))
+    for linha in linhas_texto:
+        if not linha.startswith('COPY ') or not linha.endswith(' FROM STDIN;'):
+            continue
+        destino, colunas = linha[len('COPY '):-len(' FROM STDIN;')].split(' ', 1)
+        colunas = [col.strip().strip('"') for col in colunas.strip('()').split(',')]
+        registros = []
+        for registro in linhas_texto:
+            if registro == '\\.':
+                break
+            campos = []
+            for campo in registro.split('\t'):
+                if campo == NULO_COPY:
+                    campos.append(None)
+                else:
+                    campos.append(re.sub(r'\\[\\tnr]', lambda m: desfazer[m.group(0)], campo))
+            registros.append(campos)
+        blocos[destino] = (colunas, registros)
+    return blocos
+
+
+def ler_tabela(caminho: Path, formato_tabelas: str = None) -> pd.DataFrame:
+    """
+    Lê uma tabela gerada pelo preprocess.py (no formato `formato_tabelas`, padrão:
+    FORMATO_TABELAS). O Parquet já traz os tipos de schema.sql; no CSV, os tipos são
+    inferidos e as colunas de id convertidas para numérico.
+    """
+    formato_tabelas = formato_tabelas or FORMATO_TABELAS
+    if formato_tabelas == 'parquet':
+        return tabelas_parquet.ler_tabela_parquet(caminho)
+    return converter_colunas_de_id(pd.read_csv(caminho))
+
+
+def escrever_remocoes(f_out, ids: pd.Series, linhas_por_comando: int = None):
+    """Escreve os DELETEs que removem as linhas antigas dos registros alterados, em blocos de ids (padrão: LINHAS_POR_INSERT)."""
+    linhas_por_comando = linhas_por_comando or LINHAS_POR_INSERT
+    ids = pd.to_numeric(ids, errors='coerce').dropna().astype('int64').astype(str).tolist()
+    for nome_tabela, coluna in ORDEM_DE_REMOCAO:
+        for inicio in range(0, len(ids), linhas_por_comando):
+            lista = ', '.join(ids[inicio:inicio + linhas_por_comando])
+            f_out.write(f'DELETE FROM bdsm.{nome_tabela} WHERE "{coluna}" IN ({lista});\n')
+
+
+def chaves_estrangeiras(texto_schema: str) -> list:
+    """Lista as chaves estrangeiras do schema como (tabela, nome, colunas, tabela referenciada, colunas referenciadas)."""
+    return [
+        (tabela, *chave.groups())
+        for tabela, corpo in PADRAO_CREATE_TABLE.findall(texto_schema)
+        for chave in PADRAO_CHAVE_ESTRANGEIRA.finditer(corpo)
+    ]
+
+
+def remover_restricoes(corpo: str, nomes: set) -> str:
+    """Remove as linhas CONSTRAINT indicadas do corpo de um CREATE TABLE, sem deixar vírgula sobrando."""
+    linhas = [linha for linha in corpo.split('\n') if linha.split(' ')[:2] not in [['CONSTRAINT', nome] for nome in nomes]]
+    while not linhas[-1].strip():
+        linhas.pop()
+    linhas[-1] = linhas[-1].rstrip().rstrip(',')
+    return '\n'.join(linhas)
+
+
+def anos_de_ocorrencia(formato_tabelas: str = None) -> list:
+    """Anos de data_ocorrencia presentes na tabela Obito gerada, para criar uma partição por ano."""
+    formato_tabelas = formato_tabelas or FORMATO_TABELAS
+    caminho_tabela = Path(PASTA_CSVS) / f"Obito.{formato_tabelas}"
+    if not caminho_tabela.exists():
+        return []
+    if formato_tabelas == 'parquet':
+        datas = tabelas_parquet.ler_tabela_parquet(caminho_tabela, colunas=['data_ocorrencia'])['data_ocorrencia']
+    else:
+        datas = pd.read_csv(caminho_tabela, usecols=['data_ocorrencia'])['data_ocorrencia']
+    return sorted(pd.to_datetime(datas, errors='coerce').dt.year.dropna().astype(int).unique().tolist())
+
+
+def particoes_de_obito(anos: list) -> str:
+    """DDL das partições anuais de Obito, mais uma partição padrão para os demais anos."""
+    particoes = [
+        f"CREATE TABLE Obito_{ano} PARTITION OF Obito FOR VALUES FROM ('{ano}-01-01') TO ('{ano + 1}-01-01') ;"
+        for ano in anos
+    ]
+    particoes.append("CREATE TABLE Obito_Outros PARTITION OF Obito DEFAULT ;")
+    return '\n'.join(particoes)
+
+
+def particoes_de_obito_incrementais(anos: list) -> list:
+    """
+    No MODO_INCREMENTAL, cria as partições de Obito dos anos do delta que ainda não
+    existem. Sem elas, as linhas de um ano novo iriam para Obito_Outros, e a partição
+    do ano não poderia mais ser criada enquanto essas linhas estivessem lá.
+    """
+    return [
+        f"CREATE TABLE IF NOT EXISTS bdsm.Obito_{ano} PARTITION OF bdsm.Obito "
+        f"FOR VALUES FROM ('{ano}-01-01') TO ('{ano + 1}-01-01');"
+        for ano in anos
+    ]
+
+
+def preparar_schema(texto_schema: str, adiar_chaves: bool = None, particionar_obito: bool = None, anos: list = ()) -> tuple:
+    """
+    Ajusta o schema.sql ao projeto físico escolhido e retorna o DDL e os comandos a
+    executar depois da carga. Com `adiar_chaves` (padrão: ADIAR_CHAVES_ESTRANGEIRAS),
+    as chaves estrangeiras saem dos CREATE TABLE e viram ALTER TABLE ... ADD CONSTRAINT
+    no fim. Com `particionar_obito` (padrão: PARTICIONAR_OBITO_POR_ANO), Obito é
+    particionada por ano de data_ocorrencia; a chave primária passa a incluir a data
+    e a chave estrangeira Falecido -> Obito deixa de existir, pois o PostgreSQL exige
+    uma restrição única só em Obito.id para referenciá-la.
+    """
+    adiar_chaves = ADIAR_CHAVES_ESTRANGEIRAS if adiar_chaves is None else adiar_chaves
+    particionar_obito = PARTICIONAR_OBITO_POR_ANO if particionar_obito is None else particionar_obito
+    chaves = chaves_estrangeiras(texto_schema)
+    removidas = {chave for chave in chaves if particionar_obito and chave[3] == 'Obito'}
+    adiadas = [chave for chave in chaves if chave not in removidas] if adiar_chaves else []
+    removidas.update(adiadas)
+
+    def ajustar_tabela(match):
+        tabela, corpo = match.groups()
+        nomes = {nome for tabela_fk, nome, *_ in removidas if tabela_fk == tabela}
+        if nomes:
+            corpo = remover_restricoes(corpo, nomes)
+        if not (particionar_obito and tabela == 'Obito'):
+            return f"CREATE TABLE {tabela} ({corpo}\n) ;"
+        corpo = corpo.replace('id SERIAL PRIMARY KEY,', 'id SERIAL,', 1)
+        corpo += ',\nCONSTRAINT pk_obito PRIMARY KEY (id, data_ocorrencia)'
+        return f"CREATE TABLE {tabela} ({corpo}\n) PARTITION BY RANGE (data_ocorrencia) ;\n\n{particoes_de_obito(anos)}"
+
+    ddl = PADRAO_CREATE_TABLE.sub(ajustar_tabela, texto_schema)
+    comandos_pos_carga = [
+        f"ALTER TABLE bdsm.{tabela} ADD CONSTRAINT {nome} FOREIGN KEY ({colunas}) REFERENCES bdsm.{referencia} ({colunas_referencia});"
+        for tabela, nome, colunas, referencia, colunas_referencia in adiadas
+    ]
+    return ddl, comandos_pos_carga
+
+
+def comandos_de_indices() -> list:
+    """CREATE INDEX de cada índice de INDICES (parciais quando há condição), seguidos de ANALYZE."""
+    comandos = []
+    for nome, (tabela, colunas, condicao) in INDICES.items():
+        onde = f" WHERE {condicao}" if condicao else ""
+        comandos.append(f"CREATE INDEX IF NOT EXISTS {nome} ON bdsm.{tabela} ({colunas}){onde};")
+    comandos.append("ANALYZE;")
+    return comandos
+
+
+def tabelas_do_delta() -> list:
+    """
+    Tabelas que a carga incremental altera: as que têm arquivo no delta e, se houver
+    registros alterados, as de ORDEM_DE_REMOCAO.
+    """
+    tabelas = [
+        nome_tabela for nome_tabela in tabelas_a_carregar()
+        if (Path(PASTA_CSVS) / f"{nome_tabela}.{FORMATO_TABELAS}").exists()
+    ]
+    if (Path(PASTA_CSVS) / f"{TABELA_REGISTROS_ALTERADOS}.{FORMATO_TABELAS}").exists():
+        tabelas += [nome_tabela for nome_tabela, _ in ORDEM_DE_REMOCAO if nome_tabela not in tabelas]
+    return tabelas
+
+
+def escrever_inicio(f_out) -> list:
+    """
+    Escreve o início do script: o schema (ajustado por preparar_schema) ou, no
+    MODO_INCREMENTAL, as partições de Obito dos anos do delta (com
+    PARTICIONAR_OBITO_POR_ANO) e a remoção das linhas antigas dos registros alterados.
+    Retorna os comandos a executar depois da carga.
+    """
+    comandos_pos_carga = []
+    if MODO_INCREMENTAL:
+        if PARTICIONAR_OBITO_POR_ANO:
+            particoes = particoes_de_obito_incrementais(anos_de_ocorrencia())
+            if particoes:
+                f_out.write("-- Partições de Obito dos anos do delta\n")
+                f_out.write('\n'.join(particoes) + "\n\n")
+        caminho_alterados = Path(PASTA_CSVS) / f"{TABELA_REGISTROS_ALTERADOS}.{FORMATO_TABELAS}"
+        if caminho_alterados.exists():
+            ids_alterados = ler_tabela(caminho_alterados, FORMATO_TABELAS)['id']
+            print(f"Modo incremental: removendo as linhas antigas de {len(ids_alterados)} registros alterados...")
+            f_out.write("-- Remoção das linhas antigas dos registros alterados\n")
+            with instrumentacao.etapa('remocoes', linhas_entrada=len(ids_alterados)):
+                escrever_remocoes(f_out, ids_alterados)
+            f_out.write("\n")
+    else:
+        print(f"Lendo e escrevendo o schema de '{ARQUIVO_SCHEMA}'...")
+        with instrumentacao.etapa('schema'):
+            with open(ARQUIVO_SCHEMA, 'r', encoding='utf-8') as f_in:
+                texto_schema = f_in.read()
+            if ADIAR_CHAVES_ESTRANGEIRAS or PARTICIONAR_OBITO_POR_ANO:
+                anos = anos_de_ocorrencia(FORMATO_TABELAS) if PARTICIONAR_OBITO_POR_ANO else []
+                texto_schema, comandos_pos_carga = preparar_schema(
+                    texto_schema, ADIAR_CHAVES_ESTRANGEIRAS, PARTICIONAR_OBITO_POR_ANO, anos)
+            f_out.write(texto_schema)
+            f_out.write("\n\n")
+    return comandos_pos_carga
+
+
+def escrever_fim(f_out, comandos_pos_carga: list):
+    """
+    Escreve o que roda depois da carga: chaves estrangeiras adiadas, índices e cubos.
+    No MODO_INCREMENTAL, o custo acompanha o delta: os índices já existem e o ANALYZE
+    se limita às tabelas do delta (ver tabelas_do_delta); os cubos só são recriados com
+    RECRIAR_CUBOS_NO_MODO_INCREMENTAL.
+    """
+    if CRIAR_INDICES and MODO_INCREMENTAL:
+        comandos_pos_carga = comandos_pos_carga + [f"ANALYZE bdsm.{nome_tabela};" for nome_tabela in tabelas_do_delta()]
+    elif CRIAR_INDICES:
+        comandos_pos_carga = comandos_pos_carga + comandos_de_indices()
+    if comandos_pos_carga:
+        if MODO_INCREMENTAL:
+            print("Adicionando o ANALYZE das tabelas do delta, depois da carga...")
+            titulo = "ESTATÍSTICAS DAS TABELAS DO DELTA (DEPOIS DA CARGA)"
+        else:
+            print("Adicionando as chaves estrangeiras adiadas e os índices, depois da carga...")
+            titulo = "CHAVES ESTRANGEIRAS ADIADAS E ÍNDICES (DEPOIS DA CARGA)"
+        f_out.write(
+            "-- ===================================================================\n")
+        f_out.write(f"-- {titulo}\n")
+        f_out.write(
+            "-- ===================================================================\n\n")
+        f_out.write('\n'.join(comandos_pos_carga) + '\n\n')
+
+    if GERAR_CUBOS and MODO_INCREMENTAL and not RECRIAR_CUBOS_NO_MODO_INCREMENTAL:
+        print(f"AVISO: Modo incremental: os cubos não serão recriados. Ligue RECRIAR_CUBOS_NO_MODO_INCREMENTAL "
+              f"ou execute '{ARQUIVO_CUBOS}' depois da carga.")
+    elif GERAR_CUBOS:
+        if Path(ARQUIVO_CUBOS).exists():
+            print(f"Adicionando os cubos pré-agregados de '{ARQUIVO_CUBOS}'...")
+            f_out.write(
+                "-- ===================================================================\n")
+            f_out.write("-- CUBOS PRÉ-AGREGADOS\n")
+            f_out.write(
+                "-- ===================================================================\n\n")
+            with open(ARQUIVO_CUBOS, 'r', encoding='utf-8') as f_in:
+                f_out.write(f_in.read())
+        else:
+            print(f"AVISO: O arquivo '{ARQUIVO_CUBOS}' não foi encontrado. Os cubos não serão gerados.")
+
+
+def escrever_dados_tabela(f_out, nome_tabela: str, df: pd.DataFrame, formato: str, usar_staging: bool = None):
+    if formato == 'copy':
+        escrever_copy_tabela(f_out, nome_tabela, df, usar_staging)
+    else:
+        escrever_inserts_tabela(f_out, nome_tabela, df)
+
+
+def gerar_script_sql_com_inserts(formato: str = None):
     """
     Gera um único arquivo .sql que cria o schema e insere os dados
     usando comandos INSERT INTO com tratamento de duplicatas para todas as tabelas.
+    Com formato='copy', os dados são escritos como blocos COPY ... FROM STDIN.
+    Com MODO_INCREMENTAL, o schema não é recriado, as TABELAS_ESTATICAS não são reemitidas
+    e os registros alterados são removidos antes da carga.
+    Com GERAR_CUBOS, os cubos de ARQUIVO_CUBOS são recriados depois da carga (no
+    MODO_INCREMENTAL, só com RECRIAR_CUBOS_NO_MODO_INCREMENTAL; ver escrever_fim).
+    Índices e chaves estrangeiras adiadas vêm depois da carga (ver preparar_schema).
     """
+    formato = formato or FORMATO_SAIDA
+    if formato not in ('insert', 'copy'):
+        print(f"ERRO: Formato de saída '{formato}' inválido. Use 'insert' ou 'copy'.")
+        return
+
     print(f"Iniciando a geração do arquivo '{ARQUIVO_SAIDA}'...")
 
     if not Path(ARQUIVO_SCHEMA).exists():
@@ -92,62 +618,524 @@ def gerar_script_sql_com_inserts():
         print(f"ERRO: A pasta '{PASTA_CSVS}' não foi encontrada.")
         return
 
+    instrumentacao.iniciar_relatorio(
+        'gen_sql_inserts.py', ETAPA_PERFILADA, pasta_tabelas=PASTA_CSVS, formato_tabelas=FORMATO_TABELAS,
+        formato_saida=formato, linhas_por_insert=LINHAS_POR_INSERT, modo_incremental=MODO_INCREMENTAL,
+    )
+
     with open(ARQUIVO_SAIDA, 'w', encoding='utf-8') as f_out:
-        print(f"Lendo e escrevendo o schema de '{ARQUIVO_SCHEMA}'...")
-        with open(ARQUIVO_SCHEMA, 'r', encoding='utf-8') as f_in:
-            f_out.write(f_in.read())
-            f_out.write("\n\n")
+        comandos_pos_carga = escrever_inicio(f_out)
 
-        print("Gerando comandos INSERT para cada arquivo CSV...")
+        comando = 'INSERT' if formato == 'insert' else 'COPY'
+        print(f"Gerando comandos {comando} para cada tabela...")
         f_out.write(
             "-- ===================================================================\n")
-        f_out.write("-- INÍCIO DA CARGA DE DADOS COM COMANDOS INSERT\n")
+        f_out.write(f"-- INÍCIO DA CARGA DE DADOS COM COMANDOS {comando}\n")
         f_out.write(
             "-- ===================================================================\n\n")
 
-        for nome_tabela in ORDEM_DE_CARGA:
-            caminho_csv = Path(PASTA_CSVS) / f"{nome_tabela}.csv"
+        for nome_tabela in tabelas_a_carregar():
+            caminho_tabela = Path(PASTA_CSVS) / f"{nome_tabela}.{FORMATO_TABELAS}"
 
-            if not caminho_csv.exists():
-                print(f"AVISO: Arquivo '{caminho_csv}' não encontrado. Pulando a tabela '{nome_tabela}'.")
+            if not caminho_tabela.exists():
+                print(f"AVISO: Arquivo '{caminho_tabela}' não encontrado. Pulando a tabela '{nome_tabela}'.")
                 continue
 
-            print(f"Processando '{caminho_csv}' para a tabela '{nome_tabela}'...")
+            print(f"Processando '{caminho_tabela}' para a tabela '{nome_tabela}'...")
             f_out.write(f"-- Dados para a tabela: {nome_tabela}\n")
 
-            df = pd.read_csv(caminho_csv)
+            with instrumentacao.etapa(f'leitura:{nome_tabela}') as medida:
+                df = ler_tabela(caminho_tabela, FORMATO_TABELAS)
+                medida['linhas_saida'] = len(df)
 
             if df.empty:
-                print(f"AVISO: O arquivo '{caminho_csv}' está vazio.")
+                print(f"AVISO: O arquivo '{caminho_tabela}' está vazio.")
                 continue
                 
-            for col in df.columns:
-                if 'id' in col.lower():
-                    df[col] = pd.to_numeric(df[col], errors='ignore')
-
-            nomes_colunas_sql = ', '.join([f'"{col}"' for col in df.columns])
-            insert_inicio = f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) VALUES "
-            
-            for _, linha in df.iterrows():
-                valores_formatados = [formatar_valor_sql(linha[col], df[col].dtype) for col in df.columns]
-                valores_sql = ', '.join(valores_formatados)
-                
-                comando_final = f"{insert_inicio}({valores_sql})"
-                
-                # A verificação agora funcionará para todas as tabelas definidas no dicionário
-                if nome_tabela in COLUNAS_DE_CONFLITO:
-                    colunas_conflito = COLUNAS_DE_CONFLITO[nome_tabela]
-                    comando_final += f" ON CONFLICT ({colunas_conflito}) DO NOTHING"
-                
-                f_out.write(f"{comando_final};\n")
+            with instrumentacao.etapa(f'sql:{nome_tabela}', linhas_entrada=len(df)):
+                escrever_dados_tabela(f_out, nome_tabela, df, formato)
 
             f_out.write("\n")
 
+        escrever_fim(f_out, comandos_pos_carga)
+
+    instrumentacao.salvar_relatorio(
+        ARQUIVO_RELATORIO_EXECUCAO, ARQUIVO_PERFIL, arquivo_saida=ARQUIVO_SAIDA,
+        tamanho_saida_bytes=Path(ARQUIVO_SAIDA).stat().st_size,
+    )
+
     print("-" * 50)
     print(f"✅ Arquivo '{ARQUIVO_SAIDA}' gerado com sucesso!")
     print("AVISO: Este arquivo pode ser muito grande e sua execução no banco de dados pode demorar.")
+    if MODO_INCREMENTAL:
+        print("AVISO: Depois de carregá-lo, confirme a carga com 'python preprocess.py --confirmar-carga'.")
+    print("-" * 50)
+
+
+def niveis_de_carga(texto_schema: str, adiar_chaves: bool = None, particionar_obito: bool = None) -> dict:
+    """
+    Nível de cada tabela de ORDEM_DE_CARGA no grafo das chaves estrangeiras ativas
+    durante a carga: 0 para as que não referenciam outras tabelas e n + 1 para as que
+    referenciam alguma de nível n. As tabelas de um mesmo nível podem ser carregadas
+    ao mesmo tempo (com as chaves adiadas, todas ficam no nível 0). Os padrões são
+    ADIAR_CHAVES_ESTRANGEIRAS e PARTICIONAR_OBITO_POR_ANO.
+    """
+    adiar_chaves = ADIAR_CHAVES_ESTRANGEIRAS if adiar_chaves is None else adiar_chaves
+    particionar_obito = PARTICIONAR_OBITO_POR_ANO if particionar_obito is None else particionar_obito
+    dependencias = {tabela: set() for tabela in ORDEM_DE_CARGA}
+    if not adiar_chaves:
+        for tabela, _, _, referencia, _ in chaves_estrangeiras(texto_schema):
+            if particionar_obito and referencia == 'Obito':
+                continue
+            if tabela in dependencias and referencia in dependencias and referencia != tabela:
+                dependencias[tabela].add(referencia)
+
+    niveis = {}
+    for tabela in ORDEM_DE_CARGA:  # ORDEM_DE_CARGA já traz cada tabela depois das que ela referencia
+        niveis[tabela] = max((niveis[referencia] + 1 for referencia in dependencias[tabela]), default=0)
+    return niveis
+
+
+def abrir_fragmento(caminho: Path, compressao: str, nivel: int = None):
+    """Abre um fragmento para escrita de texto, comprimindo com gzip ou zstd se pedido (nível padrão: NIVEL_DE_COMPRESSAO)."""
+    nivel = NIVEL_DE_COMPRESSAO if nivel is None else nivel
+    if compressao == 'gzip':
+        return gzip.open(caminho, 'wt', encoding='utf-8', compresslevel=nivel)
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise ImportError("A compressão 'zstd' requer o pacote 'zstandard' (pip install zstandard).")
+        return zstandard.open(caminho, 'wt', cctx=zstandard.ZstdCompressor(level=nivel), encoding='utf-8')
+    return open(caminho, 'w', encoding='utf-8')
+
+
+def inicializar_processo(particionar_obito: bool, modo_incremental: bool):
+    """Repassa ao processo de trabalho a configuração que muda as cláusulas ON CONFLICT e o uso de staging."""
+    global PARTICIONAR_OBITO_POR_ANO, MODO_INCREMENTAL
+    PARTICIONAR_OBITO_POR_ANO = particionar_obito
+    MODO_INCREMENTAL = modo_incremental
+
+
+def escrever_fragmentos_tabela(nome_tabela: str, caminho_tabela: Path, pasta_fragmentos: Path, prefixo: str,
+                               formato: str, formato_tabelas: str, linhas_por_fragmento: int,
+                               compressao: str, nivel_de_compressao: int) -> tuple:
+    """
+    Lê uma tabela e grava seus dados em um ou mais fragmentos de até `linhas_por_fragmento`
+    linhas. Roda em um processo de trabalho: devolve a descrição de cada fragmento e as
+    etapas medidas.
+    """
+    instrumentacao.iniciar_relatorio('gen_sql_inserts.py')
+    with instrumentacao.etapa(f'leitura:{nome_tabela}') as medida:
+        df = ler_tabela(caminho_tabela, formato_tabelas)
+        medida['linhas_saida'] = len(df)
+
+    fragmentos = []
+    if df.empty:
+        print(f"AVISO: O arquivo '{caminho_tabela}' está vazio.")
+        return fragmentos, instrumentacao.etapas_registradas()
+
+    with instrumentacao.etapa(f'sql:{nome_tabela}', linhas_entrada=len(df)):
+        # As chaves repetidas são procuradas na tabela inteira, pois podem cair em fragmentos diferentes
+        usar_staging = precisa_de_staging(nome_tabela, df) if formato == 'copy' else None
+        linhas_por_fragmento = linhas_por_fragmento or len(df)
+        inicios = range(0, len(df), linhas_por_fragmento)
+        for numero, inicio in enumerate(inicios, start=1):
+            parte = df.iloc[inicio:inicio + linhas_por_fragmento]
+            sufixo = f"_{numero:04d}" if len(inicios) > 1 else ''
+            nome_arquivo = f"{prefixo}{sufixo}.sql{EXTENSOES_DE_COMPRESSAO[compressao]}"
+            with abrir_fragmento(pasta_fragmentos / nome_arquivo, compressao, nivel_de_compressao) as f_out:
+                f_out.write(f"-- Dados para a tabela: {nome_tabela}\n")
+                escrever_dados_tabela(f_out, nome_tabela, parte, formato, usar_staging)
+            fragmentos.append({
+                'arquivo': nome_arquivo, 'tabela': nome_tabela, 'linhas': len(parte),
+                'bytes': (pasta_fragmentos / nome_arquivo).stat().st_size,
+            })
+    return fragmentos, instrumentacao.etapas_registradas()
+
+
+def escrever_script_de_carga(caminho: Path, etapas_de_carga: list, compressao: str):
+    """
+    Grava o script shell que carrega os fragmentos com o psql, etapa por etapa. Os
+    fragmentos de uma mesma etapa são carregados em paralelo (até $PARALELISMO por vez),
+    cada um em uma transação; a conexão vem das variáveis do psql (PGHOST, PGDATABASE...).
+    """
+    comando_psql = f"{DESCOMPRESSORES[compressao]} \"$1\" | psql -X -q -1 -v ON_ERROR_STOP=1"
+    with open(caminho, 'w', encoding='utf-8', newline='\n') as f_out:
+        f_out.write("#!/bin/sh\n")
+        f_out.write("# Gerado pelo gen_sql_inserts.py: carrega os fragmentos na ordem das dependências entre as tabelas.\n")
+        f_out.write("# Uso: PARALELISMO=4 sh carregar.sh  (conexão pelas variáveis PGHOST, PGPORT, PGDATABASE, PGUSER...)\n")
+        f_out.write("set -e\n")
+        f_out.write('cd "$(dirname "$0")"\n')
+        f_out.write('PARALELISMO="${PARALELISMO:-4}"\n\n')
+        f_out.write("carregar() {\n")
+        f_out.write(f"    printf '%s\\n' \"$@\" | xargs -P \"$PARALELISMO\" -I {{}} sh -c '{comando_psql}' _ {{}}\n")
+        f_out.write("}\n")
+        for descricao, fragmentos in etapas_de_carga:
+            f_out.write(f'\necho "{descricao}: {len(fragmentos)} fragmento(s)"\n')
+            f_out.write("carregar " + ' '.join(fragmento['arquivo'] for fragmento in fragmentos) + "\n")
+    os.chmod(caminho, 0o755)
+
+
+def gerar_fragmentos_sql(formato: str = None, numero_de_processos: int = None):
+    """
+    Gera o script SQL em fragmentos, em PASTA_FRAGMENTOS: um fragmento inicial (schema ou
+    remoções), os fragmentos de dados de cada tabela, formatados em paralelo, e um
+    fragmento final (chaves adiadas, índices e cubos), mais o manifesto e o script de
+    carga que os executa na ordem das dependências (ver niveis_de_carga).
+    Os padrões são FORMATO_SAIDA e NUMERO_DE_PROCESSOS.
+    """
+    formato = formato or FORMATO_SAIDA
+    numero_de_processos = numero_de_processos or NUMERO_DE_PROCESSOS
+    if formato not in ('insert', 'copy'):
+        print(f"ERRO: Formato de saída '{formato}' inválido. Use 'insert' ou 'copy'.")
+        return
+    if COMPRESSAO_FRAGMENTOS not in EXTENSOES_DE_COMPRESSAO:
+        print(f"ERRO: Compressão '{COMPRESSAO_FRAGMENTOS}' inválida. Use None, 'gzip' ou 'zstd'.")
+        return
+    if COMPRESSAO_FRAGMENTOS == 'zstd' and zstandard is None:
+        print("ERRO: A compressão 'zstd' requer o pacote 'zstandard' (pip install zstandard).")
+        return
+    if not Path(ARQUIVO_SCHEMA).exists():
+        print(f"ERRO: O arquivo '{ARQUIVO_SCHEMA}' não foi encontrado.")
+        return
+    if not Path(PASTA_CSVS).exists():
+        print(f"ERRO: A pasta '{PASTA_CSVS}' não foi encontrada.")
+        return
+
+    print(f"Iniciando a geração dos fragmentos em '{PASTA_FRAGMENTOS}'...")
+    instrumentacao.iniciar_relatorio(
+        'gen_sql_inserts.py', ETAPA_PERFILADA, pasta_tabelas=PASTA_CSVS, formato_tabelas=FORMATO_TABELAS,
+        formato_saida=formato, linhas_por_insert=LINHAS_POR_INSERT, modo_incremental=MODO_INCREMENTAL,
+        linhas_por_fragmento=LINHAS_POR_FRAGMENTO, compressao=COMPRESSAO_FRAGMENTOS,
+        numero_de_processos=numero_de_processos,
+    )
+
+    pasta_fragmentos = Path(PASTA_FRAGMENTOS)
+    pasta_fragmentos.mkdir(parents=True, exist_ok=True)
+    for antigo in pasta_fragmentos.glob('[0-9][0-9]_*.sql*'):
+        antigo.unlink()
+    extensao = f".sql{EXTENSOES_DE_COMPRESSAO[COMPRESSAO_FRAGMENTOS]}"
+
+    def escrever_fragmento_unico(nome: str, escrever) -> dict:
+        with abrir_fragmento(pasta_fragmentos / f"{nome}{extensao}", COMPRESSAO_FRAGMENTOS, NIVEL_DE_COMPRESSAO) as f_out:
+            retorno = escrever(f_out)
+        return {'arquivo': f"{nome}{extensao}", 'bytes': (pasta_fragmentos / f"{nome}{extensao}").stat().st_size}, retorno
+
+    inicio, comandos_pos_carga = escrever_fragmento_unico('00_inicio', escrever_inicio)
+
+    with open(ARQUIVO_SCHEMA, 'r', encoding='utf-8') as f_in:
+        niveis = niveis_de_carga(f_in.read())
+
+    tabelas = []
+    for numero, nome_tabela in enumerate(ORDEM_DE_CARGA, start=1):
+        if nome_tabela not in tabelas_a_carregar():
+            continue
+        caminho_tabela = Path(PASTA_CSVS) / f"{nome_tabela}.{FORMATO_TABELAS}"
+        if not caminho_tabela.exists():
+            print(f"AVISO: Arquivo '{caminho_tabela}' não encontrado. Pulando a tabela '{nome_tabela}'.")
+            continue
+        tabelas.append((nome_tabela, caminho_tabela, f"{numero:02d}_{nome_tabela}"))
+    # As maiores primeiro, para que nenhuma tabela grande comece por último e atrase o fim
+    tabelas.sort(key=lambda tabela: tabela[1].stat().st_size, reverse=True)
+
+    comando = 'INSERT' if formato == 'insert' else 'COPY'
+    print(f"Gerando comandos {comando} de {len(tabelas)} tabelas em {numero_de_processos} processos...")
+    fragmentos_por_tabela = {}
+    with instrumentacao.etapa('fragmentos'):
+        with ProcessPoolExecutor(max_workers=numero_de_processos, initializer=inicializar_processo,
+                                 initargs=(PARTICIONAR_OBITO_POR_ANO, MODO_INCREMENTAL)) as executor:
+            futuros = {
+                executor.submit(
+                    escrever_fragmentos_tabela, nome_tabela, caminho_tabela, pasta_fragmentos, prefixo, formato,
+                    FORMATO_TABELAS, LINHAS_POR_FRAGMENTO, COMPRESSAO_FRAGMENTOS, NIVEL_DE_COMPRESSAO,
+                ): nome_tabela
+                for nome_tabela, caminho_tabela, prefixo in tabelas
+            }
+            for futuro, nome_tabela in futuros.items():
+                fragmentos, etapas = futuro.result()
+                fragmentos_por_tabela[nome_tabela] = fragmentos
+                instrumentacao.incorporar_etapas(etapas, prefixo='processos:')
+                print(f"Tabela '{nome_tabela}': {len(fragmentos)} fragmento(s).")
+
+    fim, _ = escrever_fragmento_unico('99_fim', lambda f_out: escrever_fim(f_out, comandos_pos_carga))
+
+    etapas_de_carga = [('Início', [inicio])]
+    for nivel in sorted(set(niveis.values())):
+        fragmentos = [
+            fragmento for nome_tabela in ORDEM_DE_CARGA if niveis[nome_tabela] == nivel
+            for fragmento in fragmentos_por_tabela.get(nome_tabela, [])
+        ]
+        if fragmentos:
+            etapas_de_carga.append((f"Nível {nivel}", fragmentos))
+    etapas_de_carga.append(('Fim', [fim]))
+
+    manifesto = {
+        'formato': formato,
+        'compressao': COMPRESSAO_FRAGMENTOS,
+        'etapas': [{'descricao': descricao, 'fragmentos': fragmentos} for descricao, fragmentos in etapas_de_carga],
+    }
+    with open(pasta_fragmentos / ARQUIVO_MANIFESTO_FRAGMENTOS, 'w', encoding='utf-8') as f_out:
+        json.dump(manifesto, f_out, ensure_ascii=False, indent=2)
+    escrever_script_de_carga(pasta_fragmentos / ARQUIVO_SCRIPT_DE_CARGA, etapas_de_carga, COMPRESSAO_FRAGMENTOS)
+
+    tamanho_total = sum(fragmento['bytes'] for _, fragmentos in etapas_de_carga for fragmento in fragmentos)
+    instrumentacao.salvar_relatorio(
+        ARQUIVO_RELATORIO_EXECUCAO, ARQUIVO_PERFIL, pasta_saida=PASTA_FRAGMENTOS, tamanho_saida_bytes=tamanho_total,
+        fragmentos=sum(len(fragmentos) for _, fragmentos in etapas_de_carga),
+    )
+
+    print("-" * 50)
+    print(f"✅ Fragmentos gerados em '{PASTA_FRAGMENTOS}' ({tamanho_total / 2**20:.1f} MB).")
+    print(f"Para carregar: PARALELISMO=4 sh {pasta_fragmentos / ARQUIVO_SCRIPT_DE_CARGA}")
+    if MODO_INCREMENTAL:
+        print("AVISO: Depois da carga, confirme-a com 'python preprocess.py --confirmar-carga'.")
+    print("-" * 50)
+
+
+def valores_da_coluna(serie: pd.Series) -> np.ndarray:
+    """
+    Converte uma coluna em valores Python para os parâmetros da DB-API, com as mesmas
+    regras dos INSERTs: nulos viram None, floats com valor inteiro viram int e as
+    demais colunas viram texto (datas e horas no formato ISO).
+    """
+    if eh_coluna_numerica(serie):
+        valores = serie.astype(object)
+        if pd.api.types.is_float_dtype(serie.dtype):
+            inteiros = serie.notna() & np.isfinite(serie) & (serie % 1 == 0)
+            valores[inteiros] = serie[inteiros].astype(np.int64).astype(object)
+    else:
+        valores = serie.astype(object).astype(str)
+    valores[serie.isna()] = None
+    return valores.to_numpy()
+
+
+def marcador_de_parametro(conexao) -> str:
+    """Marcador de parâmetro ('?' ou '%s') do módulo DB-API da conexão, pelo seu `paramstyle`."""
+    modulo = importlib.import_module(type(conexao).__module__.split('.')[0])
+    estilo = getattr(modulo, 'paramstyle', None)
+    if estilo not in MARCADORES_DE_PARAMETRO:
+        raise ValueError(f"paramstyle '{estilo}' do módulo '{modulo.__name__}' não é suportado na carga direta.")
+    return MARCADORES_DE_PARAMETRO[estilo]
+
+
+def eh_cursor_psycopg2(cursor) -> bool:
+    return psycopg2 is not None and isinstance(cursor, psycopg2.extensions.cursor)
+
+
+def inserir_em_lotes(cursor, nome_tabela: str, df: pd.DataFrame, marcador: str, linhas_por_lote: int = None):
+    """
+    Insere o DataFrame em lotes de `linhas_por_lote` linhas (padrão: LINHAS_POR_LOTE), com ON CONFLICT DO NOTHING.
+    No psycopg2, o executemany faz uma ida ao servidor por linha; cada lote vai então
+    como um único INSERT multi-linha, com psycopg2.extras.execute_values. Nos demais
+    drivers (ex.: sqlite3), usa executemany.
+    """
+    linhas_por_lote = linhas_por_lote or LINHAS_POR_LOTE
+    nomes_colunas_sql = ', '.join([f'"{col}"' for col in df.columns])
+    conflito = f"ON CONFLICT ({clausula_de_conflito(nome_tabela)}) DO NOTHING"
+    usar_execute_values = eh_cursor_psycopg2(cursor)
+    if usar_execute_values:
+        comando = f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) VALUES %s {conflito}"
+    else:
+        comando = f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) VALUES ({', '.join([marcador] * len(df.columns))}) {conflito}"
+    colunas = [valores_da_coluna(df[col]) for col in df.columns]
+    for inicio in range(0, len(df), linhas_por_lote):
+        lote = list(zip(*(coluna[inicio:inicio + linhas_por_lote] for coluna in colunas)))
+        if usar_execute_values:
+            psycopg2.extras.execute_values(cursor, comando, lote, page_size=linhas_por_lote)
+        else:
+            cursor.executemany(comando, lote)
+
+
+def copiar_em_lote(cursor, nome_tabela: str, df: pd.DataFrame):
+    """
+    Carrega o DataFrame com COPY FROM STDIN (psycopg2) em uma tabela temporária e insere
+    dela com ON CONFLICT DO NOTHING, como os blocos COPY de escrever_copy_tabela.
+    """
+    nomes_colunas_sql = ', '.join([f'"{col}"' for col in df.columns])
+    staging = f"stg_{nome_tabela}"
+    dados = io.StringIO()
+    dados.writelines((juntar_colunas(df, formatar_coluna_copy, '\t') + '\n').to_numpy())
+    dados.seek(0)
+
+    cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE bdsm.{nome_tabela} INCLUDING DEFAULTS) ON COMMIT DROP")
+    cursor.copy_expert(f"COPY {staging} ({nomes_colunas_sql}) FROM STDIN", dados)
+    cursor.execute(
+        f"INSERT INTO bdsm.{nome_tabela} ({nomes_colunas_sql}) SELECT {nomes_colunas_sql} FROM {staging} "
+        f"ON CONFLICT ({clausula_de_conflito(nome_tabela)}) DO NOTHING"
+    )
+
+
+def executar_em_transacao(conexao, funcao, *args):
+    """Executa `funcao(cursor, *args)` em uma transação: confirma no fim ou desfaz se houver erro."""
+    cursor = conexao.cursor()
+    try:
+        funcao(cursor, *args)
+        conexao.commit()
+    except Exception:
+        conexao.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def remover_registros_alterados(cursor, ids: pd.Series, marcador: str, linhas_por_lote: int = None):
+    """
+    Remove as linhas antigas dos registros alterados (ver ORDEM_DE_REMOCAO). No psycopg2,
+    cada lote de ids vai em um único DELETE ... = ANY(array); nos demais drivers, com executemany.
+    """
+    linhas_por_lote = linhas_por_lote or LINHAS_POR_LOTE
+    ids = [int(valor) for valor in pd.to_numeric(ids, errors='coerce').dropna()]
+    usar_array = eh_cursor_psycopg2(cursor)
+    for nome_tabela, coluna in ORDEM_DE_REMOCAO:
+        if usar_array:
+            for inicio in range(0, len(ids), linhas_por_lote):
+                cursor.execute(f'DELETE FROM bdsm.{nome_tabela} WHERE "{coluna}" = ANY(%s)', (ids[inicio:inicio + linhas_por_lote],))
+        else:
+            cursor.executemany(f'DELETE FROM bdsm.{nome_tabela} WHERE "{coluna}" = {marcador}', [(valor,) for valor in ids])
+
+
+def carregar_no_banco(conexao, criar_schema: bool = True, executar_pos_carga: bool = True,
+                      linhas_por_lote: int = None, metodo: str = None) -> dict:
+    """
+    Carrega as tabelas de PASTA_CSVS direto no banco pela conexão DB-API, na ordem de
+    ORDEM_DE_CARGA e com a mesma semântica de ON CONFLICT DO NOTHING do script gerado.
+    Cada tabela é carregada em uma transação; se uma falhar, as anteriores já estão
+    confirmadas e a carga pode ser repetida. No MODO_INCREMENTAL, remove antes as linhas
+    antigas dos registros alterados; fora dele, com `criar_schema`, executa antes o schema.
+    Com `executar_pos_carga`, executa depois as chaves adiadas, os índices e os cubos (o
+    schema e esse trecho são SQL do PostgreSQL). Retorna as linhas, o tempo e as linhas
+    por segundo de cada tabela. Os padrões são LINHAS_POR_LOTE e METODO_DE_CARGA.
+    """
+    linhas_por_lote = linhas_por_lote or LINHAS_POR_LOTE
+    metodo = metodo or METODO_DE_CARGA
+    if metodo not in ('executemany', 'copy'):
+        raise ValueError(f"Método de carga '{metodo}' inválido. Use 'executemany' ou 'copy'.")
+    marcador = marcador_de_parametro(conexao)
+
+    comandos_pos_carga = []
+    if MODO_INCREMENTAL:
+        if PARTICIONAR_OBITO_POR_ANO and criar_schema:
+            particoes = particoes_de_obito_incrementais(anos_de_ocorrencia())
+            if particoes:
+                executar_em_transacao(conexao, lambda cursor: cursor.execute('\n'.join(particoes)))
+        caminho_alterados = Path(PASTA_CSVS) / f"{TABELA_REGISTROS_ALTERADOS}.{FORMATO_TABELAS}"
+        if caminho_alterados.exists():
+            ids_alterados = ler_tabela(caminho_alterados, FORMATO_TABELAS)['id']
+            print(f"Modo incremental: removendo as linhas antigas de {len(ids_alterados)} registros alterados...")
+            with instrumentacao.etapa('remocoes', linhas_entrada=len(ids_alterados)):
+                executar_em_transacao(conexao, remover_registros_alterados, ids_alterados, marcador, linhas_por_lote)
+    elif criar_schema:
+        f_inicio = io.StringIO()
+        comandos_pos_carga = escrever_inicio(f_inicio)
+        executar_em_transacao(conexao, lambda cursor: cursor.execute(f_inicio.getvalue()))
+
+    resultados = {}
+    for nome_tabela in tabelas_a_carregar():
+        caminho_tabela = Path(PASTA_CSVS) / f"{nome_tabela}.{FORMATO_TABELAS}"
+        if not caminho_tabela.exists():
+            print(f"AVISO: Arquivo '{caminho_tabela}' não encontrado. Pulando a tabela '{nome_tabela}'.")
+            continue
+
+        with instrumentacao.etapa(f'leitura:{nome_tabela}') as medida:
+            df = ler_tabela(caminho_tabela, FORMATO_TABELAS)
+            medida['linhas_saida'] = len(df)
+        if df.empty:
+            print(f"AVISO: O arquivo '{caminho_tabela}' está vazio.")
+            continue
+
+        inicio = time.perf_counter()
+        with instrumentacao.etapa(f'carga:{nome_tabela}', linhas_entrada=len(df)):
+            if metodo == 'copy':
+                executar_em_transacao(conexao, copiar_em_lote, nome_tabela, df)
+            else:
+                executar_em_transacao(conexao, inserir_em_lotes, nome_tabela, df, marcador, linhas_por_lote)
+        tempo = time.perf_counter() - inicio
+        resultados[nome_tabela] = {'linhas': len(df), 'tempo_s': tempo, 'linhas_por_s': len(df) / tempo if tempo else None}
+        print(f"Tabela '{nome_tabela}': {len(df)} linhas em {tempo:.2f} s ({len(df) / max(tempo, 1e-9):,.0f} linhas/s).")
+
+    if executar_pos_carga:
+        f_fim = io.StringIO()
+        escrever_fim(f_fim, comandos_pos_carga)
+        if f_fim.getvalue():
+            with instrumentacao.etapa('pos_carga'):
+                executar_em_transacao(conexao, lambda cursor: cursor.execute(f_fim.getvalue()))
+    return resultados
+
+
+def conectar_sqlite(caminho_banco: str = None) -> sqlite3.Connection:
+    """
+    Abre um SQLite com o banco `caminho_banco` (padrão: ARQUIVO_SQLITE) anexado como
+    'bdsm' e cria nele as tabelas (tipos de tabelas_parquet.TIPOS_DAS_COLUNAS e chave
+    primária nas colunas de conflito, para o ON CONFLICT). Serve para testar a carga
+    direta sem um servidor PostgreSQL.
+    """
+    caminho_banco = caminho_banco or ARQUIVO_SQLITE
+    conexao = sqlite3.connect(':memory:')
+    conexao.execute("ATTACH DATABASE ? AS bdsm", (str(caminho_banco),))
+    for nome_tabela in ORDEM_DE_CARGA:
+        colunas = [
+            f'"{coluna}" {TIPOS_SQLITE.get(tipo, "TEXT")}'
+            for coluna, tipo in tabelas_parquet.TIPOS_DAS_COLUNAS[nome_tabela].items()
+        ]
+        chave = ', '.join(f'"{coluna}"' for coluna in colunas_de_conflito(nome_tabela))
+        conexao.execute(f"CREATE TABLE IF NOT EXISTS bdsm.{nome_tabela} ({', '.join(colunas)}, PRIMARY KEY ({chave}))")
+    conexao.commit()
+    return conexao
+
+
+def carregar_tabelas_no_banco(destino: str = None):
+    """
+    Carga direta (sem gerar ARQUIVO_SAIDA) no PostgreSQL ('postgres', com DSN_POSTGRES)
+    ou em um SQLite de teste ('sqlite', em ARQUIVO_SQLITE; sem schema, índices e cubos,
+    que são SQL do PostgreSQL). No MODO_INCREMENTAL, uma carga bem-sucedida confirma o
+    manifesto pendente do preprocess.py (ver preprocess.confirmar_manifesto). O destino padrão é CARGA_DIRETA.
+    """
+    destino = destino or CARGA_DIRETA
+    if destino not in ('postgres', 'sqlite'):
+        print(f"ERRO: Destino da carga direta '{destino}' inválido. Use 'postgres' ou 'sqlite'.")
+        return
+    if not Path(PASTA_CSVS).exists():
+        print(f"ERRO: A pasta '{PASTA_CSVS}' não foi encontrada.")
+        return
+    if destino == 'postgres':
+        if psycopg2 is None:
+            print("ERRO: A carga direta no PostgreSQL requer o pacote 'psycopg2' (pip install psycopg2-binary).")
+            return
+        if not MODO_INCREMENTAL and not Path(ARQUIVO_SCHEMA).exists():
+            print(f"ERRO: O arquivo '{ARQUIVO_SCHEMA}' não foi encontrado.")
+            return
+        conexao = psycopg2.connect(DSN_POSTGRES)
+    else:
+        conexao = conectar_sqlite(ARQUIVO_SQLITE)
+
+    print(f"Iniciando a carga direta das tabelas de '{PASTA_CSVS}' ({destino})...")
+    instrumentacao.iniciar_relatorio(
+        'gen_sql_inserts.py', ETAPA_PERFILADA, pasta_tabelas=PASTA_CSVS, formato_tabelas=FORMATO_TABELAS,
+        carga_direta=destino, metodo_de_carga=METODO_DE_CARGA, linhas_por_lote=LINHAS_POR_LOTE,
+        modo_incremental=MODO_INCREMENTAL,
+    )
+    try:
+        resultados = carregar_no_banco(
+            conexao, criar_schema=destino == 'postgres', executar_pos_carga=destino == 'postgres',
+            linhas_por_lote=LINHAS_POR_LOTE, metodo=METODO_DE_CARGA,
+        )
+    finally:
+        conexao.close()
+
+    total_linhas = sum(resultado['linhas'] for resultado in resultados.values())
+    instrumentacao.salvar_relatorio(ARQUIVO_RELATORIO_EXECUCAO, ARQUIVO_PERFIL, tabelas=resultados, linhas=total_linhas)
+    if MODO_INCREMENTAL:
+        # O delta já está no banco: o manifesto da execução do preprocess.py passa a valer
+        preprocess.confirmar_manifesto()
+
+    print("-" * 50)
+    print(f"✅ Carga direta concluída: {total_linhas} linhas em {len(resultados)} tabelas.")
     print("-" * 50)
 
 
 if __name__ == '__main__':
-    gerar_script_sql_com_inserts()
+    if CARGA_DIRETA:
+        carregar_tabelas_no_banco()
+    elif GERAR_FRAGMENTOS:
+        gerar_fragmentos_sql()
+    else:
+        gerar_script_sql_com_inserts()
@@ -0,0 +1,382 @@
+import csv
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import preprocess
+
+# --- CONFIGURAÇÕES ---
+ARQUIVO_SAIDA = os.path.join("Data", "DO_SINTETICO.csv")
+NUMERO_DE_REGISTROS = 100000
+SEMENTE = 2024  # Mesma semente e mesmo número de registros geram o mesmo arquivo
+ANO = 2024  # Ano das datas de óbito
+TAMANHO_DO_BLOCO = 200000  # Registros gerados e gravados por vez
+# Sem o cadastro CNES real em preprocess.ARQUIVO_LOOKUP_CNES, os estabelecimentos são
+# códigos sintéticos de 7 dígitos, gravados como cadastro em ARQUIVO_CADASTRO_CNES_SINTETICO
+# (nunca na pasta Codigos). Para processar o arquivo sintético, aponte o
+# preprocess.ARQUIVO_LOOKUP_CNES para ele.
+NUMERO_DE_ESTABELECIMENTOS = 6000
+ARQUIVO_CADASTRO_CNES_SINTETICO = os.path.join("Data", "CNES_SINTETICO.csv")
+
+# Colunas que existem nos arquivos DO do SIM mas que o preprocess.py descarta na leitura
+COLUNAS_EXTRAS = ['CONTADOR', 'ORIGEM', 'TIPOBITO']
+COLUNAS_DO_ARQUIVO = COLUNAS_EXTRAS + preprocess.COLUNAS_NECESSARIAS
+
+# Textos de dois dígitos ('00'..'99'), para montar datas e horas sem strftime
+DOIS_DIGITOS = np.array([f'{numero:02d}' for numero in range(100)], dtype=object)
+
+
+def carregar_espacos_de_codigos(semente: int = SEMENTE) -> dict:
+    """
+    Lê os códigos reais de CID, município e ocupação dos arquivos de consulta. Cada
+    espaço recebe pesos de Zipf sobre uma ordem aleatória (fixada pela semente), para
+    que poucos códigos concentrem a maioria dos óbitos, como nos dados reais.
+    """
+    rng = np.random.default_rng(semente)
+
+    cids = pd.read_csv(preprocess.ARQUIVO_LOOKUP_CID, sep=';', dtype=str, encoding='latin1')['id_cid'].dropna()
+    cids = cids[cids.str.len().isin([3, 4])].to_numpy()
+    capitulo = np.array([cid[0] for cid in cids])
+    externas = cids[np.isin(capitulo, list('VWXY'))]
+    lesoes = cids[np.isin(capitulo, list('ST'))]
+    perinatais = cids[capitulo == 'P']
+    naturais = cids[~np.isin(capitulo, list('OPSTVWXYZ'))]
+
+    municipios = pd.read_csv(preprocess.ARQUIVO_LOOKUP_MUNICIPIO, sep=',', dtype=str, encoding='utf-8').iloc[:, 0]
+    municipios = municipios.str.slice(0, 6).drop_duplicates().to_numpy()
+
+    ocupacoes = pd.read_csv(preprocess.ARQUIVO_LOOKUP_OCUPACAO, sep=',', dtype=str, encoding='utf-8-sig').iloc[:, 0]
+    ocupacoes = ocupacoes.dropna().to_numpy()
+
+    if os.path.exists(preprocess.ARQUIVO_LOOKUP_CNES):
+        cnes = pd.read_csv(preprocess.ARQUIVO_LOOKUP_CNES, sep=';', dtype=str, encoding='utf-8')['CNES'].dropna()
+        cnes = cnes.drop_duplicates().to_numpy()
+        cnes_sintetico = False
+    else:
+        cnes = np.char.zfill(rng.choice(10_000_000, NUMERO_DE_ESTABELECIMENTOS, replace=False).astype(str), 7).astype(object)
+        cnes_sintetico = True
+
+    espacos = {
+        'cid_natural': com_pesos_de_zipf(naturais, rng),
+        'cid_externa': com_pesos_de_zipf(externas, rng),
+        'cid_lesao': com_pesos_de_zipf(lesoes, rng),
+        'cid_perinatal': com_pesos_de_zipf(perinatais, rng),
+        'municipio': com_pesos_de_zipf(municipios, rng),
+        'ocupacao': com_pesos_de_zipf(ocupacoes, rng),
+        'cnes': com_pesos_de_zipf(cnes, rng),
+        'cnes_sintetico': cnes_sintetico,
+    }
+    # Cada estabelecimento fica em um município fixo (o município de ocorrência dos óbitos nele)
+    espacos['municipio_do_cnes'] = sortear(espacos['municipio'], len(cnes), rng)
+    return espacos
+
+
+def com_pesos_de_zipf(codigos: np.ndarray, rng: np.random.Generator, expoente: float = 1.1) -> tuple:
+    """Embaralha os códigos e retorna (códigos, probabilidades acumuladas) com peso 1/posição^expoente."""
+    codigos = rng.permutation(np.asarray(codigos, dtype=object))
+    pesos = 1.0 / np.arange(1, len(codigos) + 1) ** expoente
+    return codigos, np.cumsum(pesos) / pesos.sum()
+
+
+def sortear_posicoes(espaco: tuple, quantidade: int, rng: np.random.Generator) -> np.ndarray:
+    """Sorteia `quantidade` posições de um espaço de `com_pesos_de_zipf`."""
+    codigos, acumulado = espaco
+    return np.minimum(np.searchsorted(acumulado, rng.random(quantidade), side='right'), len(codigos) - 1)
+
+
+def sortear(espaco: tuple, quantidade: int, rng: np.random.Generator) -> np.ndarray:
+    """Sorteia `quantidade` códigos de um espaço de `com_pesos_de_zipf`."""
+    return espaco[0][sortear_posicoes(espaco, quantidade, rng)]
+
+
+def sortear_valores(valores: list, probabilidades: list, quantidade: int, rng: np.random.Generator) -> np.ndarray:
+    """Sorteia códigos (texto; None para nulo) com as probabilidades dadas."""
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    return np.array(valores, dtype=object)[rng.choice(len(valores), quantidade, p=probabilidades / probabilidades.sum())]
+
+
+def anular(valores: np.ndarray, taxa_de_nulos: float, rng: np.random.Generator) -> np.ndarray:
+    """Troca por nulo uma fração `taxa_de_nulos` dos valores."""
+    valores = np.asarray(valores, dtype=object).copy()
+    valores[rng.random(len(valores)) < taxa_de_nulos] = None
+    return valores
+
+
+def formatar_datas(datas: np.ndarray) -> np.ndarray:
+    """Formata datas (datetime64[D]) como DDMMYYYY, o formato dos arquivos DO."""
+    indice = pd.DatetimeIndex(datas)
+    return DOIS_DIGITOS[indice.day] + DOIS_DIGITOS[indice.month] + indice.year.astype(str).to_numpy(dtype=object)
+
+
+def formatar_inteiros(valores: np.ndarray) -> np.ndarray:
+    return np.asarray(valores).astype(np.int64).astype(str).astype(object)
+
+
+def anos_completos(data_obito: np.ndarray, data_nascimento: np.ndarray) -> np.ndarray:
+    """Idade em anos completos na data do óbito."""
+    obito, nascimento = pd.DatetimeIndex(data_obito), pd.DatetimeIndex(data_nascimento)
+    antes_do_aniversario = (obito.month < nascimento.month) | ((obito.month == nascimento.month) & (obito.day < nascimento.day))
+    return np.asarray(obito.year - nascimento.year - antes_do_aniversario)
+
+
+def codificar_idade(data_obito: np.ndarray, data_nascimento: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Codifica a idade no formato do SIM, coerente com as datas: 1hh (horas, no dia do
+    nascimento), 2dd (dias), 3mm (meses), 4aa (anos) e 5aa (100 anos ou mais).
+    """
+    anos = anos_completos(data_obito, data_nascimento)
+    dias = (data_obito - data_nascimento).astype(np.int64)
+    meses = np.clip(dias // 30, 1, 11)
+
+    unidade = np.select([anos >= 100, anos >= 1, dias >= 30, dias >= 1], ['5', '4', '3', '2'], default='1').astype(object)
+    quantidade = np.select(
+        [anos >= 100, anos >= 1, dias >= 30, dias >= 1],
+        [anos - 100, anos, meses, dias], default=rng.integers(0, 24, len(dias))
+    )
+    return unidade + DOIS_DIGITOS[np.clip(quantidade, 0, 99)]
+
+
+def completar_cid(cids: np.ndarray) -> np.ndarray:
+    """Completa com 'X' os CIDs de 3 caracteres, como no SIM (I10 -> I10X)."""
+    cids = np.asarray(cids, dtype=object)
+    return cids + np.where(np.char.str_len(cids.astype(str)) == 3, 'X', '').astype(object)
+
+
+def formatar_cid(cids: np.ndarray) -> np.ndarray:
+    """Formata CIDs como nas linhas da declaração: '*I10X', '*I219'."""
+    return '*' + completar_cid(cids)
+
+
+def montar_linha_cid(primeiro_cid: np.ndarray, espaco_extra: tuple, rng: np.random.Generator) -> np.ndarray:
+    """
+    Monta o texto de uma linha da declaração a partir do primeiro CID: parte das linhas
+    recebe um ou dois CIDs a mais, separados por '*' ou (às vezes) por '/'.
+    """
+    quantidade = len(primeiro_cid)
+    linha = formatar_cid(primeiro_cid)
+    cids_na_linha = rng.choice([1, 2, 3], quantidade, p=[0.85, 0.12, 0.03])
+    for ordem in (2, 3):
+        recebe = cids_na_linha >= ordem
+        separador = np.where(rng.random(quantidade) < 0.05, '/', '').astype(object)
+        extra = separador + formatar_cid(sortear(espaco_extra, quantidade, rng))
+        linha = np.where(recebe, linha + extra, linha)
+    # Alguns campos vêm com espaço sobrando no fim
+    return np.where(rng.random(quantidade) < 0.01, linha + ' ', linha)
+
+
+def gerar_bloco(quantidade: int, inicio: int, espacos: dict, rng: np.random.Generator, ano: int = ANO) -> pd.DataFrame:
+    """Gera `quantidade` declarações de óbito sintéticas, com contador a partir de `inicio`."""
+    dados = {
+        'CONTADOR': formatar_inteiros(np.arange(inicio, inicio + quantidade)),
+        'ORIGEM': np.full(quantidade, '1', dtype=object),
+        'TIPOBITO': np.full(quantidade, '2', dtype=object),
+    }
+
+    # --- Datas e idade: mais óbitos no inverno e idades concentradas nos idosos ---
+    dias_no_ano = (np.datetime64(f'{ano + 1}-01-01') - np.datetime64(f'{ano}-01-01')).astype(int)
+    sazonalidade = 1 + 0.15 * np.cos(2 * np.pi * (np.arange(dias_no_ano) - 196) / 365)
+    data_obito = np.datetime64(f'{ano}-01-01') + rng.choice(dias_no_ano, quantidade, p=sazonalidade / sazonalidade.sum())
+
+    faixa = rng.choice(4, quantidade, p=[0.025, 0.025, 0.08, 0.87])  # < 1 ano, 1-14, 15-44, 45+
+    anos = np.select(
+        [faixa == 1, faixa == 2],
+        [rng.integers(1, 15, quantidade), rng.integers(15, 45, quantidade)],
+        default=np.clip(rng.normal(74, 13, quantidade), 45, 109).astype(int)
+    )
+    # Menores de 1 ano: metade morre na primeira semana
+    dias_de_vida = np.select(
+        [rng.random(quantidade) < 0.5, rng.random(quantidade) < 0.4],
+        [rng.integers(0, 7, quantidade), rng.integers(7, 28, quantidade)],
+        default=rng.integers(28, 365, quantidade)
+    )
+    dias_de_vida = np.where(faixa == 0, dias_de_vida, (anos * 365.25 + rng.integers(0, 365, quantidade)).astype(int))
+    data_nascimento = data_obito - dias_de_vida.astype('timedelta64[D]')
+    idade = codificar_idade(data_obito, data_nascimento, rng)
+    anos = anos_completos(data_obito, data_nascimento)
+
+    infantil = faixa == 0
+    adulto = anos >= 15
+    sexo = sortear_valores(['1', '2', '0'], [0.555, 0.444, 0.001], quantidade, rng)
+    idade_fertil = (sexo == '2') & (anos >= 10) & (anos <= 49)
+
+    dados['DTOBITO'] = formatar_datas(data_obito)
+    minutos = rng.integers(0, 24 * 60, quantidade)
+    dados['HORAOBITO'] = anular(DOIS_DIGITOS[minutos // 60] + DOIS_DIGITOS[minutos % 60], 0.04, rng)
+    dados['DTNASC'] = anular(formatar_datas(data_nascimento), 0.02, rng)
+    dados['IDADE'] = anular(idade, 0.005, rng)
+    dados['SEXO'] = sexo
+    dados['RACACOR'] = sortear_valores(['1', '2', '3', '4', '5', None], [0.44, 0.10, 0.005, 0.41, 0.005, 0.04], quantidade, rng)
+
+    # --- Circunstância: causas externas (acidentes, suicídios, homicídios) entre os mais jovens ---
+    prob_externa = np.where(faixa == 2, 0.45, np.where(faixa == 1, 0.2, 0.05))
+    externa = rng.random(quantidade) < prob_externa
+    dados['CIRCOBITO'] = np.where(
+        externa, sortear_valores(['1', '2', '3', '4', '9'], [0.4, 0.1, 0.35, 0.05, 0.1], quantidade, rng), None
+    )
+    dados['ACIDTRAB'] = np.where(
+        externa, sortear_valores(['1', '2', '9', None], [0.05, 0.7, 0.15, 0.1], quantidade, rng),
+        sortear_valores(['2', None], [0.05, 0.95], quantidade, rng)
+    )
+
+    # --- Local de ocorrência, estabelecimento e municípios ---
+    lococor = np.where(
+        externa, sortear_valores(['1', '3', '4', '5', '9'], [0.45, 0.15, 0.3, 0.09, 0.01], quantidade, rng),
+        sortear_valores(['1', '2', '3', '4', '5', '6', '9'], [0.66, 0.05, 0.22, 0.01, 0.05, 0.001, 0.009], quantidade, rng)
+    )
+    posicao_cnes = sortear_posicoes(espacos['cnes'], quantidade, rng)
+    em_estabelecimento = np.isin(lococor, ['1', '2']) & (rng.random(quantidade) < 0.95)
+
+    municipio_sorteado = sortear(espacos['municipio'], quantidade, rng)
+    municipio_ocorrencia = np.where(em_estabelecimento, espacos['municipio_do_cnes'][posicao_cnes], municipio_sorteado)
+    municipio_residencia = np.where(
+        rng.random(quantidade) < np.where(em_estabelecimento, 0.75, 0.9),
+        municipio_ocorrencia, sortear(espacos['municipio'], quantidade, rng)
+    )
+    municipio_naturalidade = np.where(
+        rng.random(quantidade) < 0.6, municipio_residencia, sortear(espacos['municipio'], quantidade, rng)
+    )
+    dados['LOCOCOR'] = lococor
+    dados['CODESTAB'] = np.where(em_estabelecimento, espacos['cnes'][0][posicao_cnes], None)
+    dados['CODMUNOCOR'] = municipio_ocorrencia
+    dados['CODMUNRES'] = anular(municipio_residencia, 0.002, rng)
+    dados['CODMUNNATU'] = anular(municipio_naturalidade, 0.1, rng)
+
+    # --- Dados sociais do falecido ---
+    dados['ESTCIV'] = np.where(
+        adulto, sortear_valores(['1', '2', '3', '4', '5', '9', None], [0.25, 0.3, 0.25, 0.07, 0.05, 0.03, 0.05], quantidade, rng),
+        sortear_valores(['1', None], [0.6, 0.4], quantidade, rng)
+    )
+    dados['ESC2010'] = np.where(
+        adulto, sortear_valores(['0', '1', '2', '3', '4', '5', '9', None], [0.12, 0.3, 0.15, 0.17, 0.02, 0.07, 0.12, 0.05], quantidade, rng),
+        sortear_valores(['0', '1', '2', None], [0.1, 0.2, 0.05, 0.65], quantidade, rng)
+    )
+    dados['OCUP'] = np.where(adulto, anular(sortear(espacos['ocupacao'], quantidade, rng), 0.3, rng), None)
+
+    # --- Atendimento e atestado ---
+    dados['ASSISTMED'] = sortear_valores(['1', '2', '9', None], [0.65, 0.15, 0.1, 0.1], quantidade, rng)
+    dados['NECROPSIA'] = np.where(
+        externa, sortear_valores(['1', '2', '9', None], [0.8, 0.1, 0.05, 0.05], quantidade, rng),
+        sortear_valores(['1', '2', '9', None], [0.05, 0.75, 0.08, 0.12], quantidade, rng)
+    )
+    dados['ATESTANTE'] = np.where(
+        externa, sortear_valores(['3', '5', '9', None], [0.8, 0.1, 0.05, 0.05], quantidade, rng),
+        sortear_valores(['1', '2', '4', '5', '9', None], [0.5, 0.2, 0.12, 0.1, 0.03, 0.05], quantidade, rng)
+    )
+    dados['DTATESTADO'] = anular(formatar_datas(data_obito + (rng.random(quantidade) < 0.2).astype('timedelta64[D]')), 0.05, rng)
+    dados['DTCADASTRO'] = formatar_datas(data_obito + rng.geometric(0.08, quantidade).astype('timedelta64[D]'))
+
+    # --- Gestação e puerpério (mulheres em idade fértil) ---
+    dados['OBITOGRAV'] = np.where(idade_fertil, sortear_valores(['1', '2', '9', None], [0.01, 0.8, 0.09, 0.1], quantidade, rng), None)
+    dados['OBITOPUER'] = np.where(idade_fertil, sortear_valores(['1', '2', '3', '9', None], [0.01, 0.01, 0.78, 0.1, 0.1], quantidade, rng), None)
+    dados['TPMORTEOCO'] = np.where(
+        idade_fertil, sortear_valores(['1', '2', '3', '4', '5', '8', '9', None], [0.005, 0.003, 0.002, 0.005, 0.005, 0.78, 0.1, 0.1], quantidade, rng), None
+    )
+
+    # --- Dados da mãe e do nascimento (óbitos de menores de 1 ano) ---
+    def da_mae(valores, taxa_de_nulos):
+        return np.where(infantil, anular(valores, taxa_de_nulos, rng), None)
+
+    dados['IDADEMAE'] = da_mae(formatar_inteiros(np.clip(rng.normal(26, 6.5, quantidade), 12, 50)), 0.08)
+    dados['ESCMAE2010'] = da_mae(sortear_valores(['0', '1', '2', '3', '4', '5', '9'], [0.02, 0.1, 0.2, 0.45, 0.05, 0.1, 0.08], quantidade, rng), 0.05)
+    dados['OCUPMAE'] = da_mae(sortear(espacos['ocupacao'], quantidade, rng), 0.5)
+    dados['GRAVIDEZ'] = da_mae(sortear_valores(['1', '2', '3', '9'], [0.93, 0.05, 0.005, 0.015], quantidade, rng), 0.05)
+    dados['PARTO'] = da_mae(sortear_valores(['1', '2', '9'], [0.45, 0.52, 0.03], quantidade, rng), 0.05)
+    dados['QTDFILVIVO'] = da_mae(formatar_inteiros(rng.poisson(1.2, quantidade)), 0.15)
+    dados['QTDFILMORT'] = da_mae(formatar_inteiros(rng.poisson(0.2, quantidade)), 0.2)
+    dados['SEMAGESTAC'] = da_mae(formatar_inteiros(np.clip(rng.normal(33, 5, quantidade), 20, 44)), 0.12)
+    dados['PESO'] = da_mae(formatar_inteiros(np.clip(rng.normal(2200, 950, quantidade), 300, 5500)), 0.1)
+
+    # --- Causas: a básica fica na última linha preenchida da parte I ---
+    causa_basica = np.select(
+        [externa, infantil & (rng.random(quantidade) < 0.6)],
+        [sortear(espacos['cid_externa'], quantidade, rng), sortear(espacos['cid_perinatal'], quantidade, rng)],
+        default=sortear(espacos['cid_natural'], quantidade, rng)
+    )
+    linhas_na_parte_i = rng.choice([1, 2, 3, 4], quantidade, p=[0.3, 0.35, 0.25, 0.1])
+    for numero, coluna in enumerate(['LINHAA', 'LINHAB', 'LINHAC', 'LINHAD'], start=1):
+        # Nas causas externas, a linha A costuma trazer a lesão (capítulos S e T)
+        consequencia = np.where(
+            externa & (numero == 1),
+            sortear(espacos['cid_lesao'], quantidade, rng), sortear(espacos['cid_natural'], quantidade, rng)
+        )
+        primeiro_cid = np.where(linhas_na_parte_i == numero, causa_basica, consequencia)
+        linha = montar_linha_cid(primeiro_cid, espacos['cid_natural'], rng)
+        dados[coluna] = np.where(linhas_na_parte_i >= numero, linha, None)
+    parte_ii = montar_linha_cid(sortear(espacos['cid_natural'], quantidade, rng), espacos['cid_natural'], rng)
+    dados['LINHAII'] = anular(parte_ii, 0.65, rng)
+    dados['CAUSABAS'] = completar_cid(causa_basica)
+
+    # --- Investigação: óbitos de mulheres em idade fértil, infantis e uma amostra dos demais ---
+    investigado = idade_fertil | infantil | (rng.random(quantidade) < 0.05)
+    inicio_investigacao = data_obito + rng.integers(5, 120, quantidade).astype('timedelta64[D]')
+    conclusao_investigacao = inicio_investigacao + rng.integers(0, 60, quantidade).astype('timedelta64[D]')
+    conclusao_caso = conclusao_investigacao + rng.integers(0, 30, quantidade).astype('timedelta64[D]')
+
+    def da_investigacao(valores, taxa_de_nulos=0.05):
+        return np.where(investigado, anular(valores, taxa_de_nulos, rng), None)
+
+    dados['DTINVESTIG'] = da_investigacao(formatar_datas(inicio_investigacao))
+    dados['DTCONINV'] = da_investigacao(formatar_datas(conclusao_investigacao), 0.1)
+    dados['DTCONCASO'] = da_investigacao(formatar_datas(conclusao_caso), 0.15)
+    dados['FONTEINV'] = da_investigacao(sortear_valores(list('123456789'), [0.1, 0.15, 0.3, 0.1, 0.05, 0.05, 0.05, 0.15, 0.05], quantidade, rng))
+    dados['TPNIVELINV'] = da_investigacao(sortear_valores(['M', 'R', 'E'], [0.8, 0.12, 0.08], quantidade, rng))
+    dados['ALTCAUSA'] = da_investigacao(sortear_valores(['1', '2'], [0.2, 0.8], quantidade, rng), 0.1)
+    dados['TPPOSTP'] = da_investigacao(sortear_valores(['1', '2'], [0.9, 0.1], quantidade, rng))
+    dados['TPRESGINFO'] = da_investigacao(sortear_valores(['1', '2', '3'], [0.6, 0.25, 0.15], quantidade, rng), 0.1)
+
+    return pd.DataFrame(dados, columns=COLUNAS_DO_ARQUIVO)
+
+
+def escrever_cadastro_cnes(caminho, codigos: np.ndarray):
+    """Grava um cadastro de estabelecimentos sintético no formato de preprocess.ARQUIVO_LOOKUP_CNES."""
+    df_cnes = pd.DataFrame({'CNES': codigos, 'NO_FANTASIA': [f'ESTABELECIMENTO SINTETICO {codigo}' for codigo in codigos]})
+    df_cnes.to_csv(caminho, sep=';', index=False, encoding='utf-8')
+
+
+def gerar_arquivo_sintetico(caminho_saida=ARQUIVO_SAIDA, numero_de_registros: int = NUMERO_DE_REGISTROS,
+                            semente: int = SEMENTE, ano: int = ANO, tamanho_do_bloco: int = TAMANHO_DO_BLOCO,
+                            caminho_cadastro_cnes=None) -> dict:
+    """
+    Gera um arquivo DO sintético (separado por ';', entre aspas, em latin1, como os do
+    OpenDataSUS) com `numero_de_registros` declarações, em blocos. Se não houver o
+    cadastro CNES real, grava também o cadastro dos estabelecimentos sintéticos em
+    `caminho_cadastro_cnes` (por padrão, ARQUIVO_CADASTRO_CNES_SINTETICO).
+    Retorna o tempo de geração e os caminhos gravados.
+    """
+    inicio = time.perf_counter()
+    rng = np.random.default_rng(semente)
+    espacos = carregar_espacos_de_codigos(semente)
+
+    caminho_saida = Path(caminho_saida)
+    caminho_saida.parent.mkdir(parents=True, exist_ok=True)
+    caminho_temporario = caminho_saida.with_name(f"{caminho_saida.name}.{os.getpid()}.tmp")
+    with open(caminho_temporario, 'w', encoding='latin1', newline='') as f_out:
+        for inicio_bloco in range(0, numero_de_registros, tamanho_do_bloco):
+            quantidade = min(tamanho_do_bloco, numero_de_registros - inicio_bloco)
+            df_bloco = gerar_bloco(quantidade, inicio_bloco + 1, espacos, rng, ano)
+            df_bloco.to_csv(f_out, sep=';', index=False, header=inicio_bloco == 0, quoting=csv.QUOTE_ALL)
+            logging.info(f"{inicio_bloco + quantidade} de {numero_de_registros} registros sintéticos gerados...")
+    os.replace(caminho_temporario, caminho_saida)
+
+    resultado = {'arquivo': str(caminho_saida), 'registros': numero_de_registros, 'cadastro_cnes': None}
+    if espacos['cnes_sintetico']:
+        caminho_cadastro_cnes = Path(caminho_cadastro_cnes or ARQUIVO_CADASTRO_CNES_SINTETICO)
+        caminho_cadastro_cnes.parent.mkdir(parents=True, exist_ok=True)
+        escrever_cadastro_cnes(caminho_cadastro_cnes, espacos['cnes'][0])
+        resultado['cadastro_cnes'] = str(caminho_cadastro_cnes)
+        logging.warning(
+            f"Cadastro CNES '{preprocess.ARQUIVO_LOOKUP_CNES}' não encontrado: gravado um cadastro sintético em "
+            f"'{caminho_cadastro_cnes}'. Aponte o preprocess.ARQUIVO_LOOKUP_CNES para ele ao processar o arquivo sintético."
+        )
+    resultado['tempo_s'] = time.perf_counter() - inicio
+    logging.info(f"Arquivo '{caminho_saida}' gerado em {resultado['tempo_s']:.1f} s.")
+    return resultado
+
+
+if __name__ == '__main__':
+    gerar_arquivo_sintetico(numero_de_registros=int(sys.argv[1]) if len(sys.argv) > 1 else NUMERO_DE_REGISTROS)
@@ -0,0 +1,189 @@
+import cProfile
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Relatório da execução atual, criado por `iniciar_relatorio` (None: as etapas não são registradas).
+_relatorio = None
+# Perfil cProfile acumulado da etapa escolhida em `iniciar_relatorio`.
+_perfil = None
+
+
+def converter_ru_maxrss(pico) -> float:
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def pico_de_memoria_mb():
+    """Pico de memória residente (RSS) do processo até agora, em MB; None se não for possível medir."""
+    if resource is None:
+        return None
+    return converter_ru_maxrss(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def memoria_atual_mb():
+    """Memória residente (RSS) atual do processo, em MB, lida de /proc (Linux); None se não for possível medir."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f_in:
+            paginas = int(f_in.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(paginas * os.sysconf('SC_PAGE_SIZE') / 2**20, 1)
+
+
+def iniciar_relatorio(script: str, etapa_perfilada: str = None, **parametros) -> dict:
+    """
+    Começa um novo relatório de execução, descartando o anterior. Os `parametros`
+    (arquivos de entrada, tamanho do lote...) são gravados junto, para comparar
+    execuções de cargas diferentes.
+    """
+    global _relatorio, _perfil
+    _relatorio = {
+        'script': script,
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'pid': os.getpid(),
+        'parametros': parametros,
+        'etapa_perfilada': etapa_perfilada,
+        'etapas': {},
+        '_inicio_parede': time.perf_counter(),
+        '_inicio_cpu': time.process_time(),
+    }
+    _perfil = cProfile.Profile() if etapa_perfilada else None
+    return _relatorio
+
+
+def nova_medida() -> dict:
+    """
+    Medição vazia de uma etapa. O `pico_rss_processo_mb` é o pico de RSS do processo
+    inteiro (ru_maxrss) ao fim da etapa: inclui tudo o que rodou antes e não é o pico
+    da etapa. O `maior_aumento_rss_mb` é o maior aumento do RSS atual entre o início e
+    o fim de uma chamada da etapa (só no Linux; não capta picos liberados antes do fim).
+    """
+    return {
+        'chamadas': 0, 'tempo_parede_s': 0.0, 'tempo_cpu_s': 0.0,
+        'pico_rss_processo_mb': None, 'maior_aumento_rss_mb': None, 'linhas_entrada': None, 'linhas_saida': None,
+    }
+
+
+def registrar(nome: str, tempo_parede: float, tempo_cpu: float, linhas_entrada=None, linhas_saida=None, rss_inicio=None):
+    """
+    Soma uma medição à etapa `nome` (etapas repetidas por lote ou por tabela são acumuladas).
+    Com `rss_inicio` (de memoria_atual_mb), registra também o aumento de RSS da chamada.
+    """
+    if _relatorio is None:
+        return
+    etapa = _relatorio['etapas'].setdefault(nome, nova_medida())
+    etapa['chamadas'] += 1
+    etapa['tempo_parede_s'] += tempo_parede
+    etapa['tempo_cpu_s'] += tempo_cpu
+    pico = pico_de_memoria_mb()
+    if pico is not None:
+        etapa['pico_rss_processo_mb'] = max(etapa['pico_rss_processo_mb'] or 0, pico)
+    rss_fim = memoria_atual_mb()
+    if rss_inicio is not None and rss_fim is not None:
+        etapa['maior_aumento_rss_mb'] = max(etapa['maior_aumento_rss_mb'] or 0, round(rss_fim - rss_inicio, 1))
+    for chave, linhas in (('linhas_entrada', linhas_entrada), ('linhas_saida', linhas_saida)):
+        if linhas is not None:
+            etapa[chave] = (etapa[chave] or 0) + int(linhas)
+
+
+@contextmanager
+def etapa(nome: str, linhas_entrada=None, linhas_saida=None):
+    """
+    Mede o tempo de parede, o tempo de CPU e a memória (ver nova_medida) de um trecho
+    de código. Quem chama pode preencher medida['linhas_saida'] dentro do bloco. Os
+    tempos das etapas aninhadas também contam na etapa de fora.
+    """
+    medida = {'linhas_entrada': linhas_entrada, 'linhas_saida': linhas_saida}
+    perfilar = _perfil is not None and _relatorio['etapa_perfilada'] == nome
+    rss_inicio = memoria_atual_mb() if _relatorio is not None else None
+    inicio_parede, inicio_cpu = time.perf_counter(), time.process_time()
+    if perfilar:
+        _perfil.enable()
+    try:
+        yield medida
+    finally:
+        if perfilar:
+            _perfil.disable()
+        registrar(nome, time.perf_counter() - inicio_parede, time.process_time() - inicio_cpu,
+                  medida['linhas_entrada'], medida['linhas_saida'], rss_inicio)
+
+
+def medir_lotes(nome: str, lotes):
+    """Repassa os lotes (DataFrames) de um iterador, medindo como etapa `nome` o tempo para obter cada um."""
+    iterador = iter(lotes)
+    while True:
+        inicio_parede, inicio_cpu = time.perf_counter(), time.process_time()
+        lote = next(iterador, None)
+        if lote is None:
+            return
+        registrar(nome, time.perf_counter() - inicio_parede, time.process_time() - inicio_cpu, linhas_saida=len(lote))
+        yield lote
+
+
+def etapas_registradas() -> dict:
+    """Etapas do relatório atual, para um processo de trabalho devolvê-las ao processo principal."""
+    return {} if _relatorio is None else _relatorio['etapas']
+
+
+def incorporar_etapas(etapas: dict, prefixo: str = ''):
+    """
+    Soma ao relatório atual as etapas medidas em outro processo (as medidas de memória
+    ficam as maiores deles). O perfil cProfile não atravessa processos: se a etapa
+    perfilada rodou em um processo de trabalho, avisa que ela não está no perfil.
+    """
+    if _relatorio is None:
+        return
+    etapa_perfilada = _relatorio['etapa_perfilada']
+    if etapa_perfilada in etapas and not _relatorio.get('_aviso_perfil'):
+        logging.warning(f"A etapa perfilada '{etapa_perfilada}' rodou em processos de trabalho e não entra no perfil "
+                        "(o cProfile só mede o processo principal).")
+        _relatorio['_aviso_perfil'] = True
+    for nome, medida in etapas.items():
+        destino = _relatorio['etapas'].setdefault(prefixo + nome, nova_medida())
+        for chave in ('chamadas', 'tempo_parede_s', 'tempo_cpu_s', 'linhas_entrada', 'linhas_saida'):
+            if medida[chave] is not None:
+                destino[chave] = (destino[chave] or 0) + medida[chave]
+        for chave in ('pico_rss_processo_mb', 'maior_aumento_rss_mb'):
+            if medida[chave] is not None:
+                destino[chave] = max(destino[chave] or 0, medida[chave])
+
+
+def salvar_relatorio(caminho, arquivo_perfil=None, **resultados) -> dict:
+    """
+    Fecha o relatório atual, grava-o em JSON em `caminho` (se houver) e, se uma etapa
+    foi perfilada, grava o perfil cProfile em `arquivo_perfil` (abra com pstats ou snakeviz).
+    """
+    if _relatorio is None:
+        return None
+    relatorio = {chave: valor for chave, valor in _relatorio.items() if not chave.startswith('_')}
+    relatorio['resultados'] = resultados
+    relatorio['tempo_parede_s'] = time.perf_counter() - _relatorio['_inicio_parede']
+    relatorio['tempo_cpu_s'] = time.process_time() - _relatorio['_inicio_cpu']
+    relatorio['pico_rss_mb'] = pico_de_memoria_mb()
+
+    if _perfil is not None and arquivo_perfil:
+        if _relatorio['etapa_perfilada'] not in _relatorio['etapas'] and not _relatorio.get('_aviso_perfil'):
+            logging.warning(f"A etapa perfilada '{_relatorio['etapa_perfilada']}' não rodou neste processo: o perfil está vazio.")
+        _perfil.dump_stats(arquivo_perfil)
+        relatorio['arquivo_perfil'] = str(arquivo_perfil)
+
+    if caminho:
+        caminho_temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(caminho_temporario, 'w', encoding='utf-8') as f_out:
+            json.dump(relatorio, f_out, ensure_ascii=False, indent=2, default=str)
+        os.replace(caminho_temporario, caminho)
+    return relatorio
@@ -4,17 +4,51 @@ import logging
 import numpy as np
 import sys
 import os
+import glob
+import shutil
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentacao
+import tabelas_parquet
 
 # --- CONFIGURAÇÕES ---
-ARQUIVO_CSV_ENTRADA = os.path.join("Data","DO24OPEN.csv")
+# Lista de arquivos ou padrões glob (ex.: os.path.join("Data", "DO*OPEN.csv")).
+# Também pode ser informada na linha de comando: python preprocess.py Data/DO18OPEN.csv Data/DO19OPEN.csv
+ARQUIVOS_CSV_ENTRADA = [os.path.join("Data","DO24OPEN.csv")]
 PASTA_SAIDA = "Tables"
-NUMERO_DE_LINHAS = 10000
+NUMERO_DE_LINHAS = 10000  # Por arquivo. Use None para processar o arquivo inteiro
+TAMANHO_DO_LOTE = 200000  # Linhas lidas e transformadas por vez (modo streaming)
+NUMERO_DE_PROCESSOS = os.cpu_count()  # Processos usados quando há mais de um arquivo de entrada
+FORMATO_TABELAS = 'csv'  # 'csv' ou 'parquet' (tipado, conforme tabelas_parquet.TIPOS_DAS_COLUNAS; requer pyarrow)
+# Modo incremental: os ids vêm de uma chave natural do registro (e não da posição no arquivo)
+# e só os registros novos ou alterados desde a última execução são gravados em PASTA_SAIDA.
+MODO_INCREMENTAL = False
+ARQUIVO_MANIFESTO = "manifesto_carga.csv"  # chave natural -> id, hash do conteúdo e ano dos registros já carregados
+# O manifesto de cada execução fica pendente até a carga do delta dar certo: a carga direta do
+# gen_sql_inserts.py o confirma sozinha; depois de carregar o script SQL, confirme com
+# `python preprocess.py --confirmar-carga`. Se a carga falhar, basta rodar o preprocess.py de
+# novo, pois o delta é recalculado a partir do último manifesto confirmado.
+ARQUIVO_MANIFESTO_PENDENTE = "manifesto_carga.pendente.csv"
+# Remove os registros já carregados dos anos presentes na execução que não aparecem mais nos
+# arquivos (excluídos, ou corrigidos em um campo da chave natural e emitidos com outro id).
+# Exige os arquivos completos de cada ano; só vale com NUMERO_DE_LINHAS = None.
+REMOVER_REGISTROS_AUSENTES = True
+# Relatório JSON com tempo de parede, tempo de CPU, memória e linhas de cada etapa (None para não gravar)
+ARQUIVO_RELATORIO_EXECUCAO = "relatorio_preprocess.json"
+ETAPA_PERFILADA = None  # Nome de uma etapa do relatório (ex.: 'normalizacao_cid') para gravar seu perfil cProfile
+ARQUIVO_PERFIL = "perfil_preprocess.prof"
 
 # --- ARQUIVOS DE CONSULTA (LOOKUP) ---
 ARQUIVO_LOOKUP_CID = os.path.join("Codigos", "CID.csv")
 ARQUIVO_LOOKUP_CNES = os.path.join("Codigos", "cnes_estabelecimentos.csv")
 ARQUIVO_LOOKUP_OCUPACAO = os.path.join("Codigos", "ocupacao.csv")
 ARQUIVO_LOOKUP_MUNICIPIO = os.path.join("Codigos", "Municipios.csv")
+# Cache binário dos mapas de consulta já normalizados. É refeito automaticamente
+# quando o tamanho ou a data de modificação de algum arquivo de consulta muda.
+ARQUIVO_CACHE_CONSULTA = os.path.join("Codigos", ".cache_consulta.pickle")
+VERSAO_CACHE_CONSULTA = 1
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -26,7 +60,95 @@ COLUNAS_NECESSARIAS = [
     'DTINVESTIG', 'DTCONINV', 'DTCONCASO', 'FONTEINV', 'TPNIVELINV', 'ALTCAUSA', 'TPPOSTP', 'TPRESGINFO'
 ]
 
-def carregar_dados_de_consulta():
+# Tipos usados na leitura do CSV bruto. Quase todos os campos são códigos, datas ou
+# quantidades com poucos valores distintos, lidos como categóricos (um código inteiro
+# pequeno por célula em vez de um objeto Python); os campos livres de CID usam strings
+# do pyarrow quando disponível. Os categóricos são convertidos para inteiros com
+# `converter_codigo`, que trabalha sobre as categorias e não sobre as linhas.
+TIPO_TEXTO_LIVRE = 'string[pyarrow]' if tabelas_parquet.pa is not None else str
+TIPOS_DAS_COLUNAS_BRUTAS = {
+    coluna: (TIPO_TEXTO_LIVRE if coluna in ('LINHAA', 'LINHAB', 'LINHAC', 'LINHAD', 'LINHAII') else 'category')
+    for coluna in COLUNAS_NECESSARIAS
+}
+
+# Colunas que recebem o id sequencial em cada tabela de fatos; são deslocadas na mesclagem de vários arquivos.
+COLUNAS_DE_ID_SEQUENCIAL = {
+    'Atestado_Causa': ['atestado_de_obito_id'],
+    'Investigacao': ['id'],
+    'Mae': ['id_mae'],
+    'Atestado_de_Obito': ['id_atestado_obito'],
+    'Obito': ['id', 'atestado_de_obito_id', 'investigacao_id'],
+    'Falecido': ['id', 'obito_id', 'mae_id'],
+}
+
+# Campos que identificam um óbito no modo incremental: só os que as revisões do SIM
+# raramente corrigem. Hora, raça/cor, idade, residência e estabelecimento ficam de fora,
+# assim como causas e investigação, para que um registro corrigido neles mantenha o id e
+# seja reemitido como alterado. Uma correção nos campos da chave vira uma chave nova, e a
+# antiga é removida por REMOVER_REGISTROS_AUSENTES.
+COLUNAS_CHAVE_NATURAL = ['DTOBITO', 'CODMUNOCOR', 'LOCOCOR', 'DTNASC', 'SEXO']
+
+# Dimensões dinâmicas: chave do estado de carga e colunas que identificam um registro.
+DIMENSOES_DINAMICAS = {
+    'Ocupacao': ('ocupacao', ['id_ocupacao']),
+    'Municipio': ('municipio', ['codigo_do_municipio']),
+    'CID': ('cid', ['id_cid']),
+    'Estabelecimento_de_Saude': ('estabelecimento', ['codigo_cnes', 'codigo_municipio_id']),
+}
+
+def assinatura_dos_arquivos_de_consulta():
+    """Retorna (caminho, tamanho, mtime) de cada arquivo de consulta, ou None se algum não existir."""
+    assinatura = []
+    for caminho in (ARQUIVO_LOOKUP_CID, ARQUIVO_LOOKUP_CNES, ARQUIVO_LOOKUP_OCUPACAO, ARQUIVO_LOOKUP_MUNICIPIO):
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+        assinatura.append((os.path.abspath(caminho), info.st_size, info.st_mtime_ns))
+    return (VERSAO_CACHE_CONSULTA, tuple(assinatura))
+
+def ler_cache_de_consulta(assinatura):
+    """Retorna os mapas do cache se ele existir e corresponder à assinatura atual; senão, None."""
+    try:
+        with open(ARQUIVO_CACHE_CONSULTA, 'rb') as f:
+            conteudo = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Cache de consulta ilegível ({e}). Ele será refeito.")
+        return None
+    if conteudo.get('assinatura') != assinatura:
+        return None
+    return conteudo['mapas']
+
+def salvar_cache_de_consulta(assinatura, mapas: dict):
+    """Grava o cache em um arquivo temporário e o renomeia, para nunca deixar um cache pela metade."""
+    caminho_temporario = f"{ARQUIVO_CACHE_CONSULTA}.{os.getpid()}.tmp"
+    try:
+        with open(caminho_temporario, 'wb') as f:
+            pickle.dump({'assinatura': assinatura, 'mapas': mapas}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(caminho_temporario, ARQUIVO_CACHE_CONSULTA)
+    except OSError as e:
+        logging.warning(f"Não foi possível gravar o cache de consulta: {e}")
+
+def carregar_dados_de_consulta(usar_cache: bool = True):
+    """
+    Retorna os dicionários de mapeamento dos arquivos de consulta, lendo-os do cache
+    binário quando os arquivos de origem não mudaram desde a última execução.
+    """
+    assinatura = assinatura_dos_arquivos_de_consulta() if usar_cache else None
+    if assinatura is not None:
+        mapas = ler_cache_de_consulta(assinatura)
+        if mapas is not None:
+            logging.info(f"Arquivos de consulta carregados do cache '{ARQUIVO_CACHE_CONSULTA}'.")
+            return mapas
+
+    mapas = construir_mapas_de_consulta()
+    if assinatura is not None:
+        salvar_cache_de_consulta(assinatura, mapas)
+    return mapas
+
+def construir_mapas_de_consulta():
     """Carrega todos os arquivos de consulta em memória e retorna dicionários de mapeamento."""
     logging.info("Carregando arquivos de consulta (lookup) em memória...")
     mapas = {}
@@ -66,201 +188,706 @@ def carregar_dados_de_consulta():
         sys.exit(1)
 
 
-def formatar_data(series: pd.Series) -> pd.Series:
+def converter_codigo(series: pd.Series, tipo: str = 'Int8', substituicoes: dict = None) -> pd.Series:
+    """
+    Converte um campo codificado em inteiro com nulos do tamanho `tipo` (ex.: 'Int8'),
+    com a mesma regra do pd.to_numeric(errors='coerce'): valores não numéricos viram nulo.
+    Valores fracionários ou fora da faixa do tipo também viram nulo (com um aviso), como
+    em tabelas_parquet.converter_coluna_arrow, para que o CSV e o Parquet tenham os
+    mesmos valores. Para categóricos, a conversão é feita uma vez por categoria.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    categorias = pd.Series(series.cat.categories, dtype=object)
+    if substituicoes:
+        categorias = categorias.replace(substituicoes)
+    numeros = pd.to_numeric(categorias, errors='coerce').to_numpy(dtype=float)
+
+    invalidos = ~np.isnan(numeros) & ~tabelas_parquet.inteiros_validos(numeros, tipo)
+    if invalidos.any():
+        logging.warning(f"Coluna '{series.name}': códigos fracionários ou fora da faixa de {tipo} viram nulo: {categorias[invalidos].tolist()[:10]}")
+        numeros[invalidos] = np.nan
+    valores = pd.Series(pd.api.extensions.take(numeros, series.cat.codes.to_numpy(), allow_fill=True), index=series.index)
+    return valores.astype(tipo)
+
+def converter_valores_unicos(series: pd.Series, conversor, cache: dict):
+    """
+    Aplica `conversor` (vetorizado) apenas aos valores distintos da série que ainda não
+    estão no cache. Retorna os códigos de cada linha (-1 para nulos), como no
+    pd.factorize, e os valores convertidos na ordem dos códigos.
+    """
+    codigos, unicos = pd.factorize(series)
+    novos = [valor for valor in unicos if valor not in cache]
+    if novos:
+        cache.update(zip(novos, conversor(pd.Series(novos, dtype=object))))
+    return codigos, [cache[valor] for valor in unicos]
+
+def replicar_valores_unicos(valores_unicos, codigos: np.ndarray, index: pd.Index, valor_para_nulos=None) -> pd.Series:
+    """Replica os valores convertidos para todas as linhas da série original a partir dos códigos."""
+    valores = pd.Series(valores_unicos).to_numpy()
+    replicados = pd.api.extensions.take(valores, codigos, allow_fill=True, fill_value=valor_para_nulos)
+    return pd.Series(replicados, index=index)
+
+def interpretar_datas(series: pd.Series) -> pd.Series:
     # O '%m' é o código correto para o mês numérico (01-12).
-    return pd.to_datetime(series, format='%d%m%Y', errors='coerce').dt.strftime('%Y-%m-%d')
+    return pd.to_datetime(series, format='%d%m%Y', errors='coerce')
 
-def formatar_hora(series: pd.Series) -> pd.Series:
+def interpretar_horas(series: pd.Series) -> pd.Series:
     series_str = pd.to_numeric(series, errors='coerce').fillna(0).astype(int).astype(str).str.zfill(4)
-    return pd.to_datetime(series_str, format='%H%M', errors='coerce').dt.strftime('%H:%M:00')
+    return pd.to_datetime(series_str, format='%H%M', errors='coerce')
+
+# Os campos de data e hora têm poucos valores distintos (alguns milhares de dias e 1440
+# minutos), então cada valor é interpretado uma única vez e o resultado é replicado.
+# O cache (raw -> Timestamp) pode ser compartilhado entre colunas e lotes.
+
+def converter_data(series: pd.Series, cache: dict = None) -> pd.Series:
+    """Converte datas DDMMAAAA em datetime64 (NaT para nulos e datas inválidas)."""
+    codigos, datas = converter_valores_unicos(series, interpretar_datas, {} if cache is None else cache)
+    return replicar_valores_unicos(pd.Series(datas, dtype='datetime64[ns]'), codigos, series.index)
+
+def formatar_data(series: pd.Series, cache: dict = None) -> pd.Series:
+    """Converte datas DDMMAAAA em texto AAAA-MM-DD (nulo para nulos e datas inválidas)."""
+    codigos, datas = converter_valores_unicos(series, interpretar_datas, {} if cache is None else cache)
+    return replicar_valores_unicos(pd.Series(datas, dtype='datetime64[ns]').dt.strftime('%Y-%m-%d'), codigos, series.index, np.nan)
+
+def converter_hora(series: pd.Series, cache: dict = None) -> pd.Series:
+    """Converte horas HHMM em datetime.time (None se inválida). Nulos e valores não numéricos viram 00:00, como em `formatar_hora`."""
+    codigos, horas = converter_valores_unicos(series, interpretar_horas, {} if cache is None else cache)
+    horas = pd.Series(horas, dtype='datetime64[ns]')
+    meia_noite = interpretar_horas(pd.Series(['0'])).dt.time[0]
+    tempos = horas.dt.time.astype(object).where(horas.notna(), None)
+    return replicar_valores_unicos(tempos, codigos, series.index, meia_noite)
+
+def formatar_hora(series: pd.Series, cache: dict = None) -> pd.Series:
+    """Converte horas HHMM em texto HH:MM:00. Nulos e valores não numéricos viram 00:00:00."""
+    codigos, horas = converter_valores_unicos(series, interpretar_horas, {} if cache is None else cache)
+    horas = pd.Series(horas, dtype='datetime64[ns]')
+    return replicar_valores_unicos(horas.dt.strftime('%H:%M:00'), codigos, series.index, '00:00:00')
+
+# Colunas do atestado com CIDs e o código da linha correspondente na tabela Atestado_Causa
+MAPA_LINHAS_CID = {
+    'LINHAA': 'A', 'LINHAB': 'B', 'LINHAC': 'C',
+    'LINHAD': 'D', 'LINHAII': 'II', 'CAUSABAS': 'CB'
+}
+
+def separar_cids(cid_raw: str) -> list:
+    """
+    Separa um campo de CIDs do atestado (ex.: '*I219*J189X') nos códigos individuais:
+    divide em '/' e '*', remove espaços e o 'X' final, e descarta os vazios.
+    """
+    cids = []
+    for cid in re.split('[/*]', cid_raw):
+        cid = cid.strip()
+        if cid.endswith('X'):
+            cid = cid[:-1]
+        if cid != '':
+            cids.append(cid)
+    return cids
+
+def normalizar_causas(df: pd.DataFrame, cache_cid: dict) -> pd.DataFrame:
+    """
+    Gera as linhas (atestado_de_obito_id, cid_id, linha) da tabela Atestado_Causa em uma
+    única passada por coluna. Cada texto distinto é separado uma vez só (o resultado fica
+    em `cache_cid`, reaproveitado entre colunas e lotes) e depois replicado para as linhas.
+    A ordem é a mesma do antigo melt + explode: por coluna, por linha e por posição do CID.
+    """
+    ids, cids, linhas = [], [], []
+    for coluna, linha in MAPA_LINHAS_CID.items():
+        codigos, valores_unicos = pd.factorize(df[coluna])
+
+        separados = []
+        for valor in valores_unicos:
+            if valor not in cache_cid:
+                cache_cid[valor] = separar_cids(valor)
+            separados.append(cache_cid[valor])
+
+        # Quantidade de CIDs e posição no vetor achatado de cada valor distinto; o 0 extra
+        # no fim atende ao código -1 que o factorize atribui aos nulos
+        quantidades_unicos = np.array([len(cids_valor) for cids_valor in separados] + [0], dtype=np.int64)
+        inicios_unicos = np.concatenate(([0], np.cumsum(quantidades_unicos[:-1])))
+        achatados = np.array([cid for cids_valor in separados for cid in cids_valor], dtype=object)
+
+        quantidades = quantidades_unicos[codigos]
+        total = int(quantidades.sum())
+        if total == 0:
+            continue
+        inicio_de_cada_linha = np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+        posicoes = np.arange(total) - inicio_de_cada_linha + np.repeat(inicios_unicos[codigos], quantidades)
+
+        ids.append(np.repeat(df['id_sequencial'].to_numpy(), quantidades))
+        cids.append(achatados[posicoes])
+        linhas.append(np.full(total, linha, dtype=object))
+
+    if not ids:
+        return pd.DataFrame({'atestado_de_obito_id': pd.Series(dtype=np.int64), 'cid_id': pd.Series(dtype=object), 'linha': pd.Series(dtype=object)})
+    return pd.DataFrame({
+        'atestado_de_obito_id': np.concatenate(ids),
+        'cid_id': np.concatenate(cids),
+        'linha': np.concatenate(linhas),
+    })
 
-def transformar_dados(df: pd.DataFrame, pasta_saida: Path, mapas_lookup: dict):
-    logging.info("Iniciando a transformação e enriquecimento dos dados...")
-    
+def novo_estado_de_carga(formato: str = None, manifesto: pd.DataFrame = None) -> dict:
+    """
+    Cria o estado compartilhado entre os lotes de uma mesma execução: o formato das
+    tabelas, o próximo id sequencial, as chaves já emitidas das dimensões dinâmicas,
+    as tabelas cujo arquivo já foi iniciado (para escrever o cabeçalho apenas uma vez),
+    os escritores Parquet abertos e o cache de CIDs já separados e de datas e horas
+    já interpretadas. Com um `manifesto`, a carga é incremental (ver
+    `selecionar_registros_incrementais`) e os ids novos continuam após o maior já emitido.
+    Sem `formato`, usa o FORMATO_TABELAS vigente.
+    """
+    formato = formato or FORMATO_TABELAS
+    if formato not in ('csv', 'parquet'):
+        raise ValueError(f"Formato de tabelas '{formato}' inválido. Use 'csv' ou 'parquet'.")
+    proximo_id = 1
+    if manifesto is not None and not manifesto.empty:
+        proximo_id = int(manifesto['id'].max()) + 1
+    return {
+        'formato': formato,
+        'proximo_id': proximo_id,
+        'ocupacao': set(),
+        'municipio': set(),
+        'cid': set(),
+        'estabelecimento': set(),
+        'tabelas_iniciadas': set(),
+        'escritores_parquet': {},
+        'cache_cid': {},
+        'cache_datas': {},
+        'cache_horas': {},
+        'manifesto': manifesto,
+        'ocorrencias': pd.Series(dtype=np.int64),
+        'atualizacoes_manifesto': [],
+        'chaves_vistas': [],
+        'anos_vistos': set(),
+    }
+
+def escrever_tabela(df: pd.DataFrame, pasta_saida: Path, nome_tabela: str, estado: dict):
+    """Escreve o lote no arquivo da tabela: sobrescreve no primeiro lote e anexa nos seguintes."""
+    primeiro_lote = nome_tabela not in estado['tabelas_iniciadas']
+    with instrumentacao.etapa(f'escrita:{nome_tabela}', linhas_saida=len(df)):
+        if estado['formato'] == 'parquet':
+            tabela = tabelas_parquet.para_tabela_arrow(df, nome_tabela)
+            if primeiro_lote:
+                estado['escritores_parquet'][nome_tabela] = tabelas_parquet.pq.ParquetWriter(pasta_saida / f'{nome_tabela}.parquet', tabela.schema)
+            estado['escritores_parquet'][nome_tabela].write_table(tabela)
+        else:
+            df.to_csv(pasta_saida / f'{nome_tabela}.csv', index=False, mode='w' if primeiro_lote else 'a', header=primeiro_lote)
+    estado['tabelas_iniciadas'].add(nome_tabela)
+
+def finalizar_tabelas(estado: dict):
+    """Fecha os arquivos Parquet abertos (no formato CSV não há nada a fazer)."""
+    for escritor in estado['escritores_parquet'].values():
+        escritor.close()
+    estado['escritores_parquet'].clear()
+
+def ler_tabela_em_lotes(caminho: Path, formato: str, tamanho_do_lote: int = None):
+    """
+    Lê uma tabela gerada por `escrever_tabela` em lotes de DataFrames (por padrão, de
+    TAMANHO_DO_LOTE linhas), preservando os valores gravados.
+    """
+    tamanho_do_lote = tamanho_do_lote or TAMANHO_DO_LOTE
+    if formato == 'parquet':
+        for lote in tabelas_parquet.pq.ParquetFile(caminho).iter_batches(batch_size=tamanho_do_lote):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(caminho, dtype=str, keep_default_na=False, chunksize=tamanho_do_lote)
+
+def filtrar_novos(valores, vistos: set) -> list:
+    """Retorna, na ordem original, os valores ainda não emitidos e os registra como vistos."""
+    novos = [v for v in valores if v not in vistos]
+    vistos.update(novos)
+    return novos
+
+def carregar_manifesto(caminho: str = None) -> pd.DataFrame:
+    """
+    Lê o manifesto da carga incremental (indexado pela chave natural); vazio na primeira
+    execução. Sem `caminho`, usa o ARQUIVO_MANIFESTO vigente.
+    """
+    caminho = caminho or ARQUIVO_MANIFESTO
+    tipos = {'chave': np.uint64, 'id': np.int64, 'hash': np.uint64, 'ano': np.int64}
+    if not Path(caminho).exists():
+        return pd.DataFrame({coluna: pd.Series(dtype=tipo) for coluna, tipo in tipos.items()}).set_index('chave')
+    manifesto = pd.read_csv(caminho, dtype=tipos)
+    if list(manifesto.columns) != list(tipos):
+        raise ValueError(f"O manifesto '{caminho}' tem um formato antigo; remova-o e refaça a carga completa.")
+    return manifesto.set_index('chave')
+
+def salvar_manifesto(manifesto: pd.DataFrame, caminho: str = None):
+    """
+    Grava o manifesto (por padrão, em ARQUIVO_MANIFESTO) em um arquivo temporário e o
+    renomeia, para nunca deixá-lo pela metade.
+    """
+    caminho = caminho or ARQUIVO_MANIFESTO
+    caminho_temporario = f"{caminho}.{os.getpid()}.tmp"
+    manifesto.reset_index().to_csv(caminho_temporario, index=False)
+    os.replace(caminho_temporario, caminho)
+
+def confirmar_manifesto() -> bool:
+    """Promove o manifesto pendente a ARQUIVO_MANIFESTO, depois que o delta foi carregado com sucesso."""
+    if not Path(ARQUIVO_MANIFESTO_PENDENTE).exists():
+        logging.warning(f"Não há manifesto pendente em '{ARQUIVO_MANIFESTO_PENDENTE}' para confirmar.")
+        return False
+    os.replace(ARQUIVO_MANIFESTO_PENDENTE, ARQUIVO_MANIFESTO)
+    logging.info(f"Carga confirmada: manifesto '{ARQUIVO_MANIFESTO}' atualizado.")
+    return True
+
+def hash_das_colunas(df: pd.DataFrame, colunas: list) -> np.ndarray:
+    """Hash estável (uint64) do texto bruto das colunas de cada linha, independente do dtype de leitura."""
+    texto = df[colunas].astype(object)
+    texto = texto.where(texto.notna(), '')
+    return pd.util.hash_pandas_object(texto, index=False).to_numpy()
+
+def selecionar_registros_incrementais(df: pd.DataFrame, pasta_saida: Path, estado: dict) -> pd.DataFrame:
+    """
+    Atribui a cada registro o id guardado no manifesto para a sua chave natural (ou um
+    id novo, se a chave ainda não existe) e devolve só os registros novos ou cujo
+    conteúdo mudou. Registros com a mesma chave natural são diferenciados pela ordem
+    de ocorrência. Os ids dos alterados vão para a tabela Registros_Alterados, para que
+    o gen_sql_inserts.py remova as linhas antigas antes de recarregá-los.
+    """
+    chave_base = hash_das_colunas(df, COLUNAS_CHAVE_NATURAL)
+    anos = pd.to_numeric(df['DTOBITO'].astype(str).str[-4:], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    ocorrencias_anteriores = estado['ocorrencias'].reindex(chave_base).fillna(0).to_numpy(dtype=np.int64)
+    ocorrencia = ocorrencias_anteriores + pd.Series(chave_base).groupby(chave_base).cumcount().to_numpy()
+    estado['ocorrencias'] = estado['ocorrencias'].add(pd.Series(chave_base).value_counts(), fill_value=0)
+
+    chaves = pd.util.hash_pandas_object(pd.DataFrame({'chave': chave_base, 'ocorrencia': ocorrencia}), index=False).to_numpy()
+    hashes = hash_das_colunas(df, COLUNAS_NECESSARIAS)
+    estado['chaves_vistas'].append(chaves)
+    estado['anos_vistos'].update(np.unique(anos).tolist())
+
+    manifesto = estado['manifesto']
+    posicoes = manifesto.index.get_indexer(chaves)
+    novos = posicoes < 0
+    conhecidos = ~novos
+
+    ids = np.empty(len(df), dtype=np.int64)
+    ids[conhecidos] = manifesto['id'].to_numpy()[posicoes[conhecidos]]
+    ids[novos] = np.arange(estado['proximo_id'], estado['proximo_id'] + novos.sum())
+    estado['proximo_id'] += int(novos.sum())
+
+    alterados = np.zeros(len(df), dtype=bool)
+    alterados[conhecidos] = manifesto['hash'].to_numpy()[posicoes[conhecidos]] != hashes[conhecidos]
+
+    selecionados = novos | alterados
+    estado['atualizacoes_manifesto'].append(pd.DataFrame({
+        'chave': chaves[selecionados], 'id': ids[selecionados], 'hash': hashes[selecionados], 'ano': anos[selecionados],
+    }))
+    escrever_tabela(pd.DataFrame({'id': ids[alterados]}), pasta_saida, 'Registros_Alterados', estado)
+    logging.info(f"Carga incremental: {novos.sum()} registros novos, {alterados.sum()} alterados e {len(df) - selecionados.sum()} sem mudança.")
+
+    df = df[selecionados].copy()
+    df['id_sequencial'] = ids[selecionados]
+    return df
+
+def gerar_tabelas_estaticas(pasta_saida: Path, estado: dict):
     # --- 1. Geração das Tabelas de Dimensão Estáticas ---
-    (pasta_saida / 'Sexo.csv').parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame({'id_sexo': [1, 2, 0, 9], 'descricao_sexo': ['Masculino', 'Feminino', 'Ignorado', 'Ignorado']}).to_csv(pasta_saida / 'Sexo.csv', index=False)
-    pd.DataFrame({'id_cor': [1, 2, 3, 4, 5, 9], 'descricao_cor': ['Branca', 'Preta', 'Amarela', 'Parda', 'Indígena', 'Ignorado']}).to_csv(pasta_saida / 'Raca_Cor.csv', index=False)
-    pd.DataFrame({'id_situacao_conjugal': [1, 2, 3, 4, 5, 9], 'descricao_conjugal': ['Solteiro', 'Casado', 'Viúvo', 'Separado', 'União estável', 'Ignorado']}).to_csv(pasta_saida / 'Situacao_Conjugal.csv', index=False)
-    pd.DataFrame({'id_escolaridade': [0, 1, 2, 3, 4, 5, 9], 'nivel_escolaridade': ['Sem escolaridade', 'Fundamental I', 'Fundamental II', 'Médio', 'Superior incompleto', 'Superior completo', 'Ignorado']}).to_csv(pasta_saida / 'Escolaridade.csv', index=False)
-    pd.DataFrame({'id': [1, 2, 3, 9], 'descricao_gravidez': ['Única', 'Dupla', 'Tripla e mais', 'Ignorada']}).to_csv(pasta_saida / 'Tipo_de_Gravidez.csv', index=False)
-    pd.DataFrame({'id': [1, 2, 9], 'descricao_parto': ['Vaginal', 'Cesáreo', 'Ignorado']}).to_csv(pasta_saida / 'Tipo_de_Parto.csv', index=False)
-    pd.DataFrame({'id_atestante': [1, 2, 3, 4, 5, 9], 'descricao_atestante': ['Assistente', 'Substituto', 'IML', 'SVO', 'Outro', 'Ignorado']}).to_csv(pasta_saida / 'Atestante.csv', index=False)
-    pd.DataFrame({'id_acidente': [1, 2, 9], 'descricao_acidente': ['Sim', 'Não', 'Ignorado']}).to_csv(pasta_saida / 'Acidente_de_Trabalho.csv', index=False)
-    pd.DataFrame({'id_localidade': [1, 2, 3, 4, 5, 6, 9], 'tipo_localidade': ['Hospital', 'Outros estabelecimentos de saúde', 'Domicílio', 'Via pública', 'Outros', 'Aldeia indígena', 'Ignorado']}).to_csv(pasta_saida / 'Localidade.csv', index=False)
-    pd.DataFrame({'id': [1, 2, 3, 4, 9], 'descricao_morte': ['Acidente', 'Suicídio', 'Homicídio', 'Outros', 'Ignorado']}).to_csv(pasta_saida / 'Tipo_de_Morte.csv', index=False)
-    pd.DataFrame({'id_assist_medica': [1, 2, 9], 'descricao_assist_med': ['Sim', 'Não', 'Ignorado']}).to_csv(pasta_saida / 'Recebeu_Assist_Medica.csv', index=False)
-    pd.DataFrame({'id_necropsia': [1, 2, 9], 'descricao_necropsia': ['Sim', 'Não', 'Ignorado']}).to_csv(pasta_saida / 'Feito_Necropsia.csv', index=False)
-    pd.DataFrame({'id_obito_gravidez': [1, 2, 9], 'descricao_obito_gravidez': ['Sim', 'Não', 'Ignorado']}).to_csv(pasta_saida / 'Obito_Gravidez.csv', index=False)
-    pd.DataFrame({'id_puerperio': [1, 2, 3, 9], 'descricao_puerperio': ['Sim, até 42 dias', 'Sim, de 43 dias a 1 ano', 'Não', 'Ignorado']}).to_csv(pasta_saida / 'Obito_Puerperio.csv', index=False)
-    pd.DataFrame({'id_gestacional': [1, 2, 3, 4, 5, 8, 9], 'descricao_gestacional': ['Na gravidez', 'No parto', 'No abortamento', 'Até 42 dias pós-parto', 'De 43 dias a 1 ano pós-gestação', 'Não ocorreu nestes períodos', 'Ignorado']}).to_csv(pasta_saida / 'Situacao_Gestacional.csv', index=False)
-    pd.DataFrame({'id_fonte': [1, 2, 3, 4, 5, 6, 7, 8, 9], 'descricao_fonte': ['Comitê', 'Visita domiciliar', 'Prontuário', 'BD', 'SVO', 'IML', 'Outra', 'Múltiplas', 'Ignorado']}).to_csv(pasta_saida / 'Fonte.csv', index=False)
-    pd.DataFrame({'id_investigador': ['E', 'R', 'M'], 'descricao_nivel': ['Estadual', 'Regional', 'Municipal']}).to_csv(pasta_saida / 'Nivel_Investigador.csv', index=False)
-    pd.DataFrame({'id_alteracao': [1, 2], 'descricao_alteracao': ['Sim', 'Não']}).to_csv(pasta_saida / 'Alteracao.csv', index=False)
-    pd.DataFrame({'id_investigado': [1, 2], 'descricao_investigado': ['Sim', 'Não']}).to_csv(pasta_saida / 'Foi_Investigado.csv', index=False)
-    pd.DataFrame({'id_resgate': [1, 2, 3], 'descricao_resgate': ['Não acrescentou/corrigiu', 'Permitiu resgate', 'Permitiu correção']}).to_csv(pasta_saida / 'Resgate.csv', index=False)
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    escrever_tabela(pd.DataFrame({'id_sexo': [1, 2, 0, 9], 'descricao_sexo': ['Masculino', 'Feminino', 'Ignorado', 'Ignorado']}), pasta_saida, 'Sexo', estado)
+    escrever_tabela(pd.DataFrame({'id_cor': [1, 2, 3, 4, 5, 9], 'descricao_cor': ['Branca', 'Preta', 'Amarela', 'Parda', 'Indígena', 'Ignorado']}), pasta_saida, 'Raca_Cor', estado)
+    escrever_tabela(pd.DataFrame({'id_situacao_conjugal': [1, 2, 3, 4, 5, 9], 'descricao_conjugal': ['Solteiro', 'Casado', 'Viúvo', 'Separado', 'União estável', 'Ignorado']}), pasta_saida, 'Situacao_Conjugal', estado)
+    escrever_tabela(pd.DataFrame({'id_escolaridade': [0, 1, 2, 3, 4, 5, 9], 'nivel_escolaridade': ['Sem escolaridade', 'Fundamental I', 'Fundamental II', 'Médio', 'Superior incompleto', 'Superior completo', 'Ignorado']}), pasta_saida, 'Escolaridade', estado)
+    escrever_tabela(pd.DataFrame({'id': [1, 2, 3, 9], 'descricao_gravidez': ['Única', 'Dupla', 'Tripla e mais', 'Ignorada']}), pasta_saida, 'Tipo_de_Gravidez', estado)
+    escrever_tabela(pd.DataFrame({'id': [1, 2, 9], 'descricao_parto': ['Vaginal', 'Cesáreo', 'Ignorado']}), pasta_saida, 'Tipo_de_Parto', estado)
+    escrever_tabela(pd.DataFrame({'id_atestante': [1, 2, 3, 4, 5, 9], 'descricao_atestante': ['Assistente', 'Substituto', 'IML', 'SVO', 'Outro', 'Ignorado']}), pasta_saida, 'Atestante', estado)
+    escrever_tabela(pd.DataFrame({'id_acidente': [1, 2, 9], 'descricao_acidente': ['Sim', 'Não', 'Ignorado']}), pasta_saida, 'Acidente_de_Trabalho', estado)
+    escrever_tabela(pd.DataFrame({'id_localidade': [1, 2, 3, 4, 5, 6, 9], 'tipo_localidade': ['Hospital', 'Outros estabelecimentos de saúde', 'Domicílio', 'Via pública', 'Outros', 'Aldeia indígena', 'Ignorado']}), pasta_saida, 'Localidade', estado)
+    escrever_tabela(pd.DataFrame({'id': [1, 2, 3, 4, 9], 'descricao_morte': ['Acidente', 'Suicídio', 'Homicídio', 'Outros', 'Ignorado']}), pasta_saida, 'Tipo_de_Morte', estado)
+    escrever_tabela(pd.DataFrame({'id_assist_medica': [1, 2, 9], 'descricao_assist_med': ['Sim', 'Não', 'Ignorado']}), pasta_saida, 'Recebeu_Assist_Medica', estado)
+    escrever_tabela(pd.DataFrame({'id_necropsia': [1, 2, 9], 'descricao_necropsia': ['Sim', 'Não', 'Ignorado']}), pasta_saida, 'Feito_Necropsia', estado)
+    escrever_tabela(pd.DataFrame({'id_obito_gravidez': [1, 2, 9], 'descricao_obito_gravidez': ['Sim', 'Não', 'Ignorado']}), pasta_saida, 'Obito_Gravidez', estado)
+    escrever_tabela(pd.DataFrame({'id_puerperio': [1, 2, 3, 9], 'descricao_puerperio': ['Sim, até 42 dias', 'Sim, de 43 dias a 1 ano', 'Não', 'Ignorado']}), pasta_saida, 'Obito_Puerperio', estado)
+    escrever_tabela(pd.DataFrame({'id_gestacional': [1, 2, 3, 4, 5, 8, 9], 'descricao_gestacional': ['Na gravidez', 'No parto', 'No abortamento', 'Até 42 dias pós-parto', 'De 43 dias a 1 ano pós-gestação', 'Não ocorreu nestes períodos', 'Ignorado']}), pasta_saida, 'Situacao_Gestacional', estado)
+    escrever_tabela(pd.DataFrame({'id_fonte': [1, 2, 3, 4, 5, 6, 7, 8, 9], 'descricao_fonte': ['Comitê', 'Visita domiciliar', 'Prontuário', 'BD', 'SVO', 'IML', 'Outra', 'Múltiplas', 'Ignorado']}), pasta_saida, 'Fonte', estado)
+    escrever_tabela(pd.DataFrame({'id_investigador': ['E', 'R', 'M'], 'descricao_nivel': ['Estadual', 'Regional', 'Municipal']}), pasta_saida, 'Nivel_Investigador', estado)
+    escrever_tabela(pd.DataFrame({'id_alteracao': [1, 2], 'descricao_alteracao': ['Sim', 'Não']}), pasta_saida, 'Alteracao', estado)
+    escrever_tabela(pd.DataFrame({'id_investigado': [1, 2], 'descricao_investigado': ['Sim', 'Não']}), pasta_saida, 'Foi_Investigado', estado)
+    escrever_tabela(pd.DataFrame({'id_resgate': [1, 2, 3], 'descricao_resgate': ['Não acrescentou/corrigiu', 'Permitiu resgate', 'Permitiu correção']}), pasta_saida, 'Resgate', estado)
+
+
+def transformar_dados(df: pd.DataFrame, pasta_saida: Path, mapas_lookup: dict, estado: dict = None):
+    """
+    Transforma um lote de dados brutos e grava as tabelas normalizadas.
+    Quando chamada lote a lote com o mesmo `estado`, os ids continuam a contagem
+    entre os lotes e as dimensões dinâmicas são deduplicadas na execução inteira.
+    """
+    lote_avulso = estado is None
+    if lote_avulso:
+        estado = novo_estado_de_carga()
+
+    logging.info("Iniciando a transformação e enriquecimento dos dados...")
+
+    if 'estaticas' not in estado['tabelas_iniciadas']:
+        gerar_tabelas_estaticas(pasta_saida, estado)
+        estado['tabelas_iniciadas'].add('estaticas')
+
+    if estado['manifesto'] is not None:
+        with instrumentacao.etapa('selecao_incremental', linhas_entrada=len(df)) as medida:
+            df = selecionar_registros_incrementais(df, pasta_saida, estado)
+            medida['linhas_saida'] = len(df)
 
     # --- 2. Geração das Tabelas de Dimensão Dinâmicas ---
     logging.info("Gerando e enriquecendo tabelas de dimensão dinâmicas...")
     
-    # CORREÇÃO: Normaliza os códigos de ocupação nos dados brutos antes de usá-los
-    df['OCUP'] = df['OCUP'].str.lstrip('0')
-    df['OCUPMAE'] = df['OCUPMAE'].str.lstrip('0')
-
-    ocupacoes_ids = pd.concat([df['OCUP'], df['OCUPMAE']]).dropna().unique()
-    df_ocupacoes = pd.DataFrame({'id_ocupacao': ocupacoes_ids})
-    df_ocupacoes['descricao_ocupacao'] = df_ocupacoes['id_ocupacao'].map(mapas_lookup['ocupacao']).fillna('DESCONHECIDO')
-    df_ocupacoes.to_csv(pasta_saida / 'Ocupacao.csv', index=False)
-
-    mapa_uf = {
-        '11': 'RO', '12': 'AC', '13': 'AM', '14': 'RR', '15': 'PA', '16': 'AP', '17': 'TO',
-        '21': 'MA', '22': 'PI', '23': 'CE', '24': 'RN', '25': 'PB', '26': 'PE', '27': 'AL', '28': 'SE', '29': 'BA',
-        '31': 'MG', '32': 'ES', '33': 'RJ', '35': 'SP',
-        '41': 'PR', '42': 'SC', '43': 'RS',
-        '50': 'MS', '51': 'MT', '52': 'GO', '53': 'DF'
-    }
-    municipios_ids = pd.concat([df['CODMUNRES'], df['CODMUNNATU'], df['CODMUNOCOR']]).dropna().unique()
-    df_municipios = pd.DataFrame({'codigo_do_municipio': municipios_ids})
-    df_municipios['nome'] = df_municipios['codigo_do_municipio'].map(mapas_lookup['municipio']).fillna('DESCONHECIDO')
-    df_municipios['estado'] = df_municipios['codigo_do_municipio'].astype(str).str[:2].map(mapa_uf).fillna('DESCONHECIDO')
-    df_municipios.to_csv(pasta_saida / 'Municipio.csv', index=False)
+    with instrumentacao.etapa('dimensoes_dinamicas', linhas_entrada=len(df)):
+        # CORREÇÃO: Normaliza os códigos de ocupação nos dados brutos antes de usá-los
+        df['OCUP'] = df['OCUP'].str.lstrip('0')
+        df['OCUPMAE'] = df['OCUPMAE'].str.lstrip('0')
+
+        ocupacoes_ids = filtrar_novos(pd.concat([df['OCUP'], df['OCUPMAE']]).dropna().unique(), estado['ocupacao'])
+        df_ocupacoes = pd.DataFrame({'id_ocupacao': ocupacoes_ids})
+        df_ocupacoes['descricao_ocupacao'] = df_ocupacoes['id_ocupacao'].map(mapas_lookup['ocupacao']).fillna('DESCONHECIDO')
+        escrever_tabela(df_ocupacoes, pasta_saida, 'Ocupacao', estado)
+
+        mapa_uf = {
+            '11': 'RO', '12': 'AC', '13': 'AM', '14': 'RR', '15': 'PA', '16': 'AP', '17': 'TO',
+            '21': 'MA', '22': 'PI', '23': 'CE', '24': 'RN', '25': 'PB', '26': 'PE', '27': 'AL', '28': 'SE', '29': 'BA',
+            '31': 'MG', '32': 'ES', '33': 'RJ', '35': 'SP',
+            '41': 'PR', '42': 'SC', '43': 'RS',
+            '50': 'MS', '51': 'MT', '52': 'GO', '53': 'DF'
+        }
+        municipios_ids = filtrar_novos(pd.concat([df['CODMUNRES'], df['CODMUNNATU'], df['CODMUNOCOR']]).dropna().unique(), estado['municipio'])
+        df_municipios = pd.DataFrame({'codigo_do_municipio': municipios_ids})
+        df_municipios['nome'] = df_municipios['codigo_do_municipio'].map(mapas_lookup['municipio']).fillna('DESCONHECIDO')
+        df_municipios['estado'] = df_municipios['codigo_do_municipio'].astype(str).str[:2].map(mapa_uf).fillna('DESCONHECIDO')
+        escrever_tabela(df_municipios, pasta_saida, 'Municipio', estado)
 
     # --- 3. Geração das Tabelas de Fatos e Relacionadas ---
     logging.info("Gerando tabelas de fatos e relacionadas...")
+
+    # No Parquet, datas e horas são gravadas tipadas; no CSV, como texto
+    if estado['formato'] == 'parquet':
+        converter_datas, converter_horas = converter_data, converter_hora
+    else:
+        converter_datas, converter_horas = formatar_data, formatar_hora
     
-    df['id_sequencial'] = range(1, len(df) + 1)
+    # Os ids continuam a contagem dos lotes anteriores (no modo incremental, já vêm do manifesto)
+    if estado['manifesto'] is None:
+        df['id_sequencial'] = range(estado['proximo_id'], estado['proximo_id'] + len(df))
+        estado['proximo_id'] += len(df)
     
     # --- Normalização dos CIDs ---
     logging.info("Processando e normalizando os CIDs para a tabela 'Atestado_Causa'...")
     
-    cid_cols = ['LINHAA', 'LINHAB', 'LINHAC', 'LINHAD', 'LINHAII', 'CAUSABAS']
-    
-    df_causas = df.melt(
-        id_vars=['id_sequencial'], value_vars=cid_cols,
-        var_name='linha_original', value_name='cid_raw'
-    )
-    
-    df_causas.dropna(subset=['cid_raw'], inplace=True)
-    
-    df_causas['cid_id'] = df_causas['cid_raw'].str.split('[/*]')
-    df_causas = df_causas.explode('cid_id')
-
-    df_causas['cid_id'] = df_causas['cid_id'].str.strip()
-
-    df_causas['cid_id'] = df_causas['cid_id'].str.replace('X$', '', regex=True)
-    
-    mapa_linhas = {
-        'LINHAA': 'A', 'LINHAB': 'B', 'LINHAC': 'C',
-        'LINHAD': 'D', 'LINHAII': 'II', 'CAUSABAS': 'CB'
-    }
-    df_causas['linha'] = df_causas['linha_original'].map(mapa_linhas)
-    
-    df_causas_final = df_causas[['id_sequencial', 'cid_id', 'linha']].copy()
-    df_causas_final.rename(columns={'id_sequencial': 'atestado_de_obito_id'}, inplace=True)
-
-    df_causas_final = df_causas_final[df_causas_final['cid_id'] != '']
+    with instrumentacao.etapa('normalizacao_cid', linhas_entrada=len(df)) as medida:
+        df_causas_final = normalizar_causas(df, estado['cache_cid'])
+        medida['linhas_saida'] = len(df_causas_final)
     
-    df_causas_final.to_csv(pasta_saida / 'Atestado_Causa.csv', index=False)
-    logging.info(f"Tabela 'Atestado_Causa.csv' gerada com {len(df_causas_final)} registros.")
+    escrever_tabela(df_causas_final, pasta_saida, 'Atestado_Causa', estado)
+    logging.info(f"Tabela 'Atestado_Causa' gerada com {len(df_causas_final)} registros.")
 
     logging.info("Gerando tabela de dimensão 'CID' a partir dos dados processados...")
-    cids_unicos = df_causas_final['cid_id'].dropna().unique()
+    cids_unicos = filtrar_novos(df_causas_final['cid_id'].dropna().unique(), estado['cid'])
     df_cids = pd.DataFrame({'id_cid': cids_unicos})
     df_cids['descricao_cid'] = df_cids['id_cid'].map(mapas_lookup['cid']).fillna('DESCONHECIDO')
-    df_cids.to_csv(pasta_saida / 'CID.csv', index=False)
+    escrever_tabela(df_cids, pasta_saida, 'CID', estado)
     
     # --- Continuação da geração das outras tabelas ---
-    df_estab = df[['CODESTAB', 'CODMUNOCOR']].dropna(subset=['CODESTAB']).drop_duplicates().copy()
-    df_estab.rename(columns={'CODESTAB': 'codigo_cnes', 'CODMUNOCOR': 'codigo_municipio_id'}, inplace=True)
-    df_estab['nome'] = df_estab['codigo_cnes'].astype(str).map(mapas_lookup['cnes']).fillna('NULL')
-    df_estab[['codigo_cnes', 'nome', 'codigo_municipio_id']].to_csv(pasta_saida / 'Estabelecimento_de_Saude.csv', index=False)
+    with instrumentacao.etapa('tabelas_de_fatos', linhas_entrada=len(df)):
+        df_estab = df[['CODESTAB', 'CODMUNOCOR']].dropna(subset=['CODESTAB']).drop_duplicates().astype(object)
+        df_estab.rename(columns={'CODESTAB': 'codigo_cnes', 'CODMUNOCOR': 'codigo_municipio_id'}, inplace=True)
+        chaves_estab = df_estab['codigo_cnes'] + '|' + df_estab['codigo_municipio_id'].fillna('')
+        df_estab = df_estab[chaves_estab.isin(filtrar_novos(chaves_estab, estado['estabelecimento']))].copy()
+        df_estab['nome'] = df_estab['codigo_cnes'].astype(str).map(mapas_lookup['cnes'])
+        escrever_tabela(df_estab[['codigo_cnes', 'nome', 'codigo_municipio_id']], pasta_saida, 'Estabelecimento_de_Saude', estado)
     
-    df_investigacao = pd.DataFrame({
-        'id': df['id_sequencial'], 'data_inicio': formatar_data(df['DTINVESTIG']),
-        'data_conclusao_invest': formatar_data(df['DTCONINV']), 'data_conclusao_caso': formatar_data(df['DTCONCASO']),
-        'fonte_id': pd.to_numeric(df['FONTEINV'], errors='coerce'), 'nivel_investigador': df['TPNIVELINV'],
-        'ocorreu_alteracao_id': pd.to_numeric(df['ALTCAUSA'], errors='coerce'), 'foi_investigado': pd.to_numeric(df['TPPOSTP'], errors='coerce'),
-        'resgate_de_info': pd.to_numeric(df['TPRESGINFO'], errors='coerce'),
-    })
-    df_investigacao.to_csv(pasta_saida / 'Investigacao.csv', index=False)
-
-    df_mae = pd.DataFrame({
-        'id_mae': df['id_sequencial'], 'idade': pd.to_numeric(df['IDADEMAE'], errors='coerce'), 'ocupacao_habitual': df['OCUPMAE'],
-        'tipo_de_gravidez_id': pd.to_numeric(df['GRAVIDEZ'], errors='coerce'), 'escolaridade_nivel_id': pd.to_numeric(df['ESCMAE2010'], errors='coerce'),
-        'numero_de_filhos_vivos': pd.to_numeric(df['QTDFILVIVO'], errors='coerce'), 'numero_de_filhos_mortos': pd.to_numeric(df['QTDFILMORT'], errors='coerce'),
-        'semanas_gestacao': pd.to_numeric(df['SEMAGESTAC'], errors='coerce'), 'tipo_de_parto_id': pd.to_numeric(df['PARTO'], errors='coerce')
-    })
-    df_mae.to_csv(pasta_saida / 'Mae.csv', index=False)
-
-    df_atestado = pd.DataFrame({
-        'id_atestado_obito': df['id_sequencial'],
-        'data_cadastro': formatar_data(df['DTCADASTRO']),
-        'data_atestado': formatar_data(df['DTATESTADO']),
-        'atestante_id': pd.to_numeric(df['ATESTANTE'], errors='coerce'),
-        'acidente_de_trabalho_id': pd.to_numeric(df['ACIDTRAB'], errors='coerce')
-    })
-    df_atestado.to_csv(pasta_saida / 'Atestado_de_Obito.csv', index=False)
-
-    df_obito = pd.DataFrame({
-        'id': df['id_sequencial'], 'atestado_de_obito_id': df['id_sequencial'],
-        'local_obito_id': pd.to_numeric(df['LOCOCOR'], errors='coerce'), 'tipo_de_morte_id': pd.to_numeric(df['CIRCOBITO'], errors='coerce'),
-        'data_ocorrencia': formatar_data(df['DTOBITO']), 'hora_ocorrencia': formatar_hora(df['HORAOBITO']),
-        'codigo_municipio_ocorrencia_id': pd.to_numeric(df['CODMUNOCOR'], errors='coerce'), 'recebeu_assist_med_id': pd.to_numeric(df['ASSISTMED'], errors='coerce'),
-        'foi_feita_necrospia_id': pd.to_numeric(df['NECROPSIA'], errors='coerce'), 'obito_gravidez_id': pd.to_numeric(df['OBITOGRAV'], errors='coerce'),
-        'obito_puerperio_id': pd.to_numeric(df['OBITOPUER'], errors='coerce'),
-        'estabelecimento_de_saude_id': pd.to_numeric(df['CODESTAB'], errors='coerce'),
-        'situacao_gestacional': pd.to_numeric(df['TPMORTEOCO'], errors='coerce'), 'investigacao_id': df['id_sequencial']
-    })
-    df_obito.to_csv(pasta_saida / 'Obito.csv', index=False)
-
-    df_falecido = pd.DataFrame({
-        'id': df['id_sequencial'], 'obito_id': df['id_sequencial'],
-        'data_nascimento': formatar_data(df['DTNASC']), 'idade_original': df['IDADE'],
-        'sexo_id': pd.to_numeric(df['SEXO'].replace({'M': 1, 'F': 2, 'I': 0}), errors='coerce'), 'cor_id': pd.to_numeric(df['RACACOR'], errors='coerce'),
-        'peso_ao_nascer': pd.to_numeric(df['PESO'], errors='coerce'), 'situacao_conjugal_id': pd.to_numeric(df['ESTCIV'], errors='coerce'),
-        'ocupacao_habitual': df['OCUP'], 'municipio_residencia_id': pd.to_numeric(df['CODMUNRES'], errors='coerce'),
-        'municipio_naturalidade_id': pd.to_numeric(df['CODMUNNATU'], errors='coerce'), 'mae_id': df['id_sequencial'],
-        'escolaridade_nivel_id': pd.to_numeric(df['ESC2010'], errors='coerce')
-    })
-    df_falecido.to_csv(pasta_saida / 'Falecido.csv', index=False)
+        df_investigacao = pd.DataFrame({
+            'id': df['id_sequencial'], 'data_inicio': converter_datas(df['DTINVESTIG'], estado['cache_datas']),
+            'data_conclusao_invest': converter_datas(df['DTCONINV'], estado['cache_datas']), 'data_conclusao_caso': converter_datas(df['DTCONCASO'], estado['cache_datas']),
+            'fonte_id': converter_codigo(df['FONTEINV']), 'nivel_investigador': df['TPNIVELINV'],
+            'ocorreu_alteracao_id': converter_codigo(df['ALTCAUSA']), 'foi_investigado': converter_codigo(df['TPPOSTP']),
+            'resgate_de_info': converter_codigo(df['TPRESGINFO']),
+        })
+        escrever_tabela(df_investigacao, pasta_saida, 'Investigacao', estado)
+
+        df_mae = pd.DataFrame({
+            'id_mae': df['id_sequencial'], 'idade': converter_codigo(df['IDADEMAE'], 'Int16'), 'ocupacao_habitual': df['OCUPMAE'],
+            'tipo_de_gravidez_id': converter_codigo(df['GRAVIDEZ']), 'escolaridade_nivel_id': converter_codigo(df['ESCMAE2010']),
+            'numero_de_filhos_vivos': converter_codigo(df['QTDFILVIVO'], 'Int16'), 'numero_de_filhos_mortos': converter_codigo(df['QTDFILMORT'], 'Int16'),
+            'semanas_gestacao': converter_codigo(df['SEMAGESTAC'], 'Int16'), 'tipo_de_parto_id': converter_codigo(df['PARTO'])
+        })
+        escrever_tabela(df_mae, pasta_saida, 'Mae', estado)
+
+        df_atestado = pd.DataFrame({
+            'id_atestado_obito': df['id_sequencial'],
+            'data_cadastro': converter_datas(df['DTCADASTRO'], estado['cache_datas']),
+            'data_atestado': converter_datas(df['DTATESTADO'], estado['cache_datas']),
+            'atestante_id': converter_codigo(df['ATESTANTE']),
+            'acidente_de_trabalho_id': converter_codigo(df['ACIDTRAB'])
+        })
+        escrever_tabela(df_atestado, pasta_saida, 'Atestado_de_Obito', estado)
+
+        df_obito = pd.DataFrame({
+            'id': df['id_sequencial'], 'atestado_de_obito_id': df['id_sequencial'],
+            'local_obito_id': converter_codigo(df['LOCOCOR']), 'tipo_de_morte_id': converter_codigo(df['CIRCOBITO']),
+            'data_ocorrencia': converter_datas(df['DTOBITO'], estado['cache_datas']), 'hora_ocorrencia': converter_horas(df['HORAOBITO'], estado['cache_horas']),
+            'codigo_municipio_ocorrencia_id': converter_codigo(df['CODMUNOCOR'], 'Int32'), 'recebeu_assist_med_id': converter_codigo(df['ASSISTMED']),
+            'foi_feita_necrospia_id': converter_codigo(df['NECROPSIA']), 'obito_gravidez_id': converter_codigo(df['OBITOGRAV']),
+            'obito_puerperio_id': converter_codigo(df['OBITOPUER']),
+            'estabelecimento_de_saude_id': converter_codigo(df['CODESTAB'], 'Int32'),
+            'situacao_gestacional': converter_codigo(df['TPMORTEOCO']), 'investigacao_id': df['id_sequencial']
+        })
+        escrever_tabela(df_obito, pasta_saida, 'Obito', estado)
+
+        df_falecido = pd.DataFrame({
+            'id': df['id_sequencial'], 'obito_id': df['id_sequencial'],
+            'data_nascimento': converter_datas(df['DTNASC'], estado['cache_datas']), 'idade_original': df['IDADE'],
+            'sexo_id': converter_codigo(df['SEXO'], substituicoes={'M': 1, 'F': 2, 'I': 0}), 'cor_id': converter_codigo(df['RACACOR']),
+            'peso_ao_nascer': converter_codigo(df['PESO'], 'Int16'), 'situacao_conjugal_id': converter_codigo(df['ESTCIV']),
+            'ocupacao_habitual': df['OCUP'], 'municipio_residencia_id': converter_codigo(df['CODMUNRES'], 'Int32'),
+            'municipio_naturalidade_id': converter_codigo(df['CODMUNNATU'], 'Int32'), 'mae_id': df['id_sequencial'],
+            'escolaridade_nivel_id': converter_codigo(df['ESC2010'])
+        })
+        escrever_tabela(df_falecido, pasta_saida, 'Falecido', estado)
+
+    if lote_avulso:
+        finalizar_tabelas(estado)
     
-    logging.info("Transformação concluída. Todos os arquivos CSV foram gerados.")
+    logging.info("Transformação concluída. Todas as tabelas foram geradas.")
+
+
+def resolver_arquivos_de_entrada(entradas) -> list:
+    """Expande a lista de arquivos/padrões glob em caminhos existentes, sem repetições e na ordem informada."""
+    if isinstance(entradas, (str, os.PathLike)):
+        entradas = [entradas]
+    arquivos = []
+    for entrada in entradas:
+        encontrados = sorted(glob.glob(str(entrada)))
+        if not encontrados:
+            logging.error(f"Arquivo de entrada não encontrado: '{entrada}'")
+        for caminho in encontrados:
+            if Path(caminho) not in arquivos:
+                arquivos.append(Path(caminho))
+    return arquivos
+
+
+def processar_arquivo(arquivo_entrada_path: Path, pasta_saida_path: Path, mapas_lookup: dict, estado: dict = None) -> int:
+    """
+    Lê o arquivo em lotes, transforma cada lote e grava as tabelas. Retorna o número de
+    registros lidos. Sem `estado`, cria um para o arquivo e fecha as tabelas no fim.
+    """
+    if NUMERO_DE_LINHAS is None:
+        logging.info(f"Lendo '{arquivo_entrada_path}' em lotes de {TAMANHO_DO_LOTE} linhas...")
+    else:
+        logging.info(f"Lendo as primeiras {NUMERO_DE_LINHAS} linhas de '{arquivo_entrada_path}' em lotes de {TAMANHO_DO_LOTE} linhas...")
+    leitor = pd.read_csv(
+        arquivo_entrada_path, sep=';', header=0, nrows=NUMERO_DE_LINHAS,
+        dtype=TIPOS_DAS_COLUNAS_BRUTAS, encoding='latin1', chunksize=TAMANHO_DO_LOTE,
+        usecols=lambda column: column in COLUNAS_NECESSARIAS
+    )
+
+    pasta_saida_path.mkdir(parents=True, exist_ok=True)
+    estado_do_arquivo = estado is None
+    if estado_do_arquivo:
+        estado = novo_estado_de_carga()
+    registros_lidos = 0
+    try:
+        for numero_lote, df_bruto in enumerate(instrumentacao.medir_lotes('leitura_csv', leitor), start=1):
+            logging.info(f"Processando o lote {numero_lote} de '{arquivo_entrada_path.name}' ({len(df_bruto)} linhas)...")
+
+            colunas_faltando = set(COLUNAS_NECESSARIAS) - set(df_bruto.columns)
+            if colunas_faltando:
+                if numero_lote == 1:
+                    logging.warning(f"Colunas não encontradas no CSV: {colunas_faltando}. Serão preenchidas com nulo.")
+                for col in colunas_faltando:
+                    df_bruto[col] = pd.Series(None, index=df_bruto.index, dtype=object)
+
+            with instrumentacao.etapa('transformacao', linhas_entrada=len(df_bruto)):
+                transformar_dados(df_bruto, pasta_saida_path, mapas_lookup, estado)
+            registros_lidos += len(df_bruto)
+    finally:
+        if estado_do_arquivo:
+            finalizar_tabelas(estado)
+
+    return registros_lidos
+
+
+def mesclar_resultados_parciais(pastas_parciais: list, totais: list, pasta_saida_path: Path):
+    """
+    Junta as tabelas geradas para cada arquivo: desloca os ids sequenciais de cada
+    arquivo pelo total dos anteriores (ids únicos globalmente) e deduplica as dimensões
+    dinâmicas. Cada tabela parcial é lida uma única vez, em lotes.
+    """
+    logging.info("Mesclando as tabelas geradas para cada arquivo...")
+    estado = novo_estado_de_carga()
+    formato = estado['formato']
+    gerar_tabelas_estaticas(pasta_saida_path, estado)
+
+    deslocamento = 0
+    for pasta_parcial, total in zip(pastas_parciais, totais):
+        for nome_tabela, colunas_id in COLUNAS_DE_ID_SEQUENCIAL.items():
+            caminho = pasta_parcial / f'{nome_tabela}.{formato}'
+            if not caminho.exists():
+                continue
+            for lote in ler_tabela_em_lotes(caminho, formato):
+                for col in colunas_id:
+                    lote[col] = lote[col].astype(np.int64) + deslocamento
+                escrever_tabela(lote, pasta_saida_path, nome_tabela, estado)
+
+        for nome_tabela, (chave_estado, colunas_chave) in DIMENSOES_DINAMICAS.items():
+            caminho = pasta_parcial / f'{nome_tabela}.{formato}'
+            if not caminho.exists():
+                continue
+            df_dimensao = pd.concat(ler_tabela_em_lotes(caminho, formato), ignore_index=True)
+            chaves = df_dimensao[colunas_chave].astype(str).agg('|'.join, axis=1)
+            df_dimensao = df_dimensao[chaves.isin(filtrar_novos(chaves, estado[chave_estado]))]
+            escrever_tabela(df_dimensao, pasta_saida_path, nome_tabela, estado)
+
+        deslocamento += total
+
+    finalizar_tabelas(estado)
+    return deslocamento
+
+
+# Mapas de consulta do processo de trabalho, definidos por `inicializar_processo`.
+_mapas_do_processo = None
+
+def inicializar_processo(mapas_lookup: dict, formato_tabelas: str, numero_de_linhas: int, tamanho_do_lote: int):
+    """Repassa ao processo de trabalho os mapas de consulta e a configuração de leitura e escrita do processo principal."""
+    global _mapas_do_processo, FORMATO_TABELAS, NUMERO_DE_LINHAS, TAMANHO_DO_LOTE
+    _mapas_do_processo = mapas_lookup
+    FORMATO_TABELAS = formato_tabelas
+    NUMERO_DE_LINHAS = numero_de_linhas
+    TAMANHO_DO_LOTE = tamanho_do_lote
+
+
+def processar_arquivo_no_processo(arquivo_entrada_path: Path, pasta_saida_path: Path) -> tuple:
+    """Processa um arquivo e devolve o número de registros e as etapas medidas neste processo para ele."""
+    instrumentacao.iniciar_relatorio('preprocess.py')
+    total = processar_arquivo(arquivo_entrada_path, pasta_saida_path, _mapas_do_processo)
+    return total, instrumentacao.etapas_registradas()
+
+
+def processar_arquivos_em_paralelo(arquivos: list, pasta_saida_path: Path, mapas_lookup: dict, numero_de_processos: int = None) -> int:
+    """
+    Transforma cada arquivo em um processo separado (até `numero_de_processos`; por padrão,
+    NUMERO_DE_PROCESSOS), gravando em uma subpasta temporária, e depois mescla os
+    resultados na pasta de saída. Retorna o número total de registros.
+    """
+    numero_de_processos = numero_de_processos or NUMERO_DE_PROCESSOS
+    pasta_parciais = pasta_saida_path / '_parciais'
+    pastas_parciais = [pasta_parciais / f'{i:03d}_{arquivo.stem}' for i, arquivo in enumerate(arquivos)]
+
+    numero_de_processos = max(1, min(numero_de_processos or 1, len(arquivos)))
+    logging.info(f"Processando {len(arquivos)} arquivos com {numero_de_processos} processos...")
+    # Os mapas vão para cada processo uma única vez, no inicializador (e, com 'fork', são
+    # herdados da memória do processo principal), em vez de acompanhar cada tarefa.
+    with ProcessPoolExecutor(max_workers=numero_de_processos, initializer=inicializar_processo,
+                             initargs=(mapas_lookup, FORMATO_TABELAS, NUMERO_DE_LINHAS, TAMANHO_DO_LOTE)) as executor:
+        futuros = [
+            executor.submit(processar_arquivo_no_processo, arquivo, pasta)
+            for arquivo, pasta in zip(arquivos, pastas_parciais)
+        ]
+        totais = []
+        for futuro in futuros:
+            total_do_arquivo, etapas = futuro.result()
+            totais.append(total_do_arquivo)
+            # Etapas dos processos de trabalho: tempos somados, medidas de memória do maior processo
+            instrumentacao.incorporar_etapas(etapas, prefixo='processos:')
+
+    with instrumentacao.etapa('mesclagem'):
+        total = mesclar_resultados_parciais(pastas_parciais, totais, pasta_saida_path)
+    shutil.rmtree(pasta_parciais)
+    return total
+
+
+def registros_ausentes(manifesto: pd.DataFrame, estado: dict) -> pd.DataFrame:
+    """
+    Registros do manifesto, dos anos presentes nesta execução, cuja chave natural não
+    apareceu nela: foram excluídos da nova versão do SIM ou corrigidos em um campo da
+    chave (e, nesse caso, voltaram com outra chave e um id novo).
+    """
+    vistas = np.concatenate(estado['chaves_vistas']) if estado['chaves_vistas'] else np.array([], dtype=np.uint64)
+    candidatos = manifesto[manifesto['ano'].isin(estado['anos_vistos'])]
+    return candidatos[~candidatos.index.isin(vistas)]
+
+def processar_arquivos_incrementais(arquivos: list, pasta_saida_path: Path, mapas_lookup: dict) -> int:
+    """
+    Processa os arquivos em sequência no modo incremental e, se tudo correr bem, grava
+    o manifesto atualizado em ARQUIVO_MANIFESTO_PENDENTE (ver confirmar_manifesto). As
+    tabelas de saída contêm apenas o delta desta execução; os ids dos registros
+    alterados e dos ausentes (ver registros_ausentes) vão para Registros_Alterados.
+    """
+    manifesto = carregar_manifesto(ARQUIVO_MANIFESTO)
+    logging.info(f"Carga incremental: {len(manifesto)} registros já carregados segundo '{ARQUIVO_MANIFESTO}'.")
+    if Path(ARQUIVO_MANIFESTO_PENDENTE).exists():
+        logging.warning(f"O manifesto pendente '{ARQUIVO_MANIFESTO_PENDENTE}' não foi confirmado e será substituído.")
+    estado = novo_estado_de_carga(manifesto=manifesto)
+
+    # Sem alterações nesta execução, a tabela não seria reescrita: remove a da execução anterior
+    for formato in ('csv', 'parquet'):
+        (pasta_saida_path / f'Registros_Alterados.{formato}').unlink(missing_ok=True)
+
+    total = 0
+    ausentes = manifesto.iloc[:0]
+    try:
+        for arquivo in arquivos:
+            total += processar_arquivo(arquivo, pasta_saida_path, mapas_lookup, estado)
+
+        if REMOVER_REGISTROS_AUSENTES and NUMERO_DE_LINHAS is not None:
+            logging.warning("REMOVER_REGISTROS_AUSENTES ignorado: com NUMERO_DE_LINHAS, os arquivos não são lidos inteiros.")
+        elif REMOVER_REGISTROS_AUSENTES:
+            ausentes = registros_ausentes(manifesto, estado)
+            if not ausentes.empty:
+                escrever_tabela(pd.DataFrame({'id': ausentes['id'].to_numpy()}), pasta_saida_path, 'Registros_Alterados', estado)
+            logging.info(f"Carga incremental: {len(ausentes)} registros dos {len(estado['anos_vistos'])} anos processados não aparecem mais e serão removidos.")
+    finally:
+        finalizar_tabelas(estado)
+
+    manifesto = manifesto.drop(ausentes.index)
+    if estado['atualizacoes_manifesto']:
+        atualizacoes = pd.concat(estado['atualizacoes_manifesto'], ignore_index=True).set_index('chave')
+        manifesto = pd.concat([manifesto.drop(atualizacoes.index, errors='ignore'), atualizacoes])
+    salvar_manifesto(manifesto, ARQUIVO_MANIFESTO_PENDENTE)
+    logging.info(
+        f"Manifesto desta execução gravado em '{ARQUIVO_MANIFESTO_PENDENTE}'. Depois de carregar o delta, "
+        "confirme com 'python preprocess.py --confirmar-carga' (a carga direta do gen_sql_inserts.py confirma sozinha)."
+    )
+    return total
+
 
+def main(entradas=None):
+    arquivos = resolver_arquivos_de_entrada(entradas or ARQUIVOS_CSV_ENTRADA)
+    instrumentacao.iniciar_relatorio(
+        'preprocess.py', ETAPA_PERFILADA, entradas=[str(arquivo) for arquivo in arquivos],
+        numero_de_linhas=NUMERO_DE_LINHAS, tamanho_do_lote=TAMANHO_DO_LOTE, numero_de_processos=NUMERO_DE_PROCESSOS,
+        formato_tabelas=FORMATO_TABELAS, modo_incremental=MODO_INCREMENTAL,
+    )
 
-def main():
-    mapas_lookup = carregar_dados_de_consulta()
+    with instrumentacao.etapa('carga_consultas'):
+        mapas_lookup = carregar_dados_de_consulta()
     
     pasta_saida_path = Path(PASTA_SAIDA)
     pasta_saida_path.mkdir(exist_ok=True)
 
-    arquivo_entrada_path = Path(ARQUIVO_CSV_ENTRADA)
-    if not arquivo_entrada_path.exists():
-        logging.error(f"Arquivo de entrada não encontrado: '{arquivo_entrada_path}'")
+    if not arquivos:
         return
 
+    total, erro = None, None
     try:
-        logging.info(f"Lendo as primeiras {NUMERO_DE_LINHAS} linhas de '{ARQUIVO_CSV_ENTRADA}'...")
-        df_bruto = pd.read_csv(
-            arquivo_entrada_path, sep=';', header=0, nrows=NUMERO_DE_LINHAS,
-            dtype=str, encoding='latin1',
-            usecols=lambda column: column in COLUNAS_NECESSARIAS
-        )
-        
-        colunas_faltando = set(COLUNAS_NECESSARIAS) - set(df_bruto.columns)
-        if colunas_faltando:
-            logging.warning(f"Colunas não encontradas no CSV: {colunas_faltando}. Serão preenchidas com nulo.")
-            for col in colunas_faltando:
-                df_bruto[col] = np.nan
+        if MODO_INCREMENTAL:
+            total = processar_arquivos_incrementais(arquivos, pasta_saida_path, mapas_lookup)
+        elif len(arquivos) == 1:
+            total = processar_arquivo(arquivos[0], pasta_saida_path, mapas_lookup)
+        else:
+            total = processar_arquivos_em_paralelo(arquivos, pasta_saida_path, mapas_lookup)
 
-        transformar_dados(df_bruto, pasta_saida_path, mapas_lookup)
+        logging.info(f"{total} registros processados no total.")
 
         print("\n" + "="*60)
         print("✅ Processo de pré-processamento finalizado com sucesso!")
-        print(f"Os arquivos CSV enriquecidos foram salvos na pasta: '{PASTA_SAIDA}'")
+        print(f"As tabelas em {FORMATO_TABELAS.upper()} foram salvas na pasta: '{PASTA_SAIDA}'")
         print("="*60)
 
     except Exception as e:
+        erro = str(e)
         logging.error(f"Ocorreu um erro inesperado no processamento: {e}")
 
+    instrumentacao.salvar_relatorio(ARQUIVO_RELATORIO_EXECUCAO, ARQUIVO_PERFIL, registros=total, erro=erro)
+    if ARQUIVO_RELATORIO_EXECUCAO:
+        logging.info(f"Relatório da execução salvo em '{ARQUIVO_RELATORIO_EXECUCAO}'.")
+
 if __name__ == '__main__':
-    main()
+    if sys.argv[1:] == ['--confirmar-carga']:
+        sys.exit(0 if confirmar_manifesto() else 1)
+    main(sys.argv[1:])
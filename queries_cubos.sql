@@ -0,0 +1,89 @@
+-- Versões das consultas de queries.sql sobre os cubos de cubos.sql (mesma numeração e resultado)
+
+-- 1. Causas mais frequentes de óbito, por sexo biologico - CID
+SELECT
+    s.descricao_sexo,
+    c.descricao_cid,
+    SUM(cb.total_obitos) AS total_obitos
+FROM bdsm.cubo_causa_basica_sexo cb
+JOIN bdsm.sexo s ON cb.sexo_id = s.id_sexo
+JOIN bdsm.cid c ON cb.cid_id = c.id_cid
+GROUP BY s.descricao_sexo, c.descricao_cid
+ORDER BY total_obitos DESC
+LIMIT 10;
+
+-- 2. Análise geográfica de disparidades
+SELECT
+    m.nome AS municipio,
+    m.estado,
+    SUM(cm.total_obitos) AS total_obitos,
+    COALESCE(SUM(CASE WHEN e.id_escolaridade <= 3 THEN cm.total_obitos END), 0)
+        AS obitos_baixa_escolaridade,
+    ROUND(
+        COALESCE(SUM(CASE WHEN ram.id_assist_medica = 2 THEN cm.total_obitos END), 0) * 100.0
+            / SUM(cm.total_obitos),
+        2
+    ) AS pct_sem_assist_medica,
+    ROUND(SUM(cm.soma_idades) * 1.0 / NULLIF(SUM(cm.obitos_com_idade), 0), 1) AS idade_media_obito
+FROM bdsm.municipio m
+JOIN bdsm.cubo_municipio_residencia cm ON m.codigo_do_municipio = cm.municipio_residencia_id
+LEFT JOIN bdsm.escolaridade e ON cm.escolaridade_nivel_id = e.id_escolaridade
+LEFT JOIN
+    bdsm.recebeu_assist_medica ram
+    ON cm.recebeu_assist_med_id = ram.id_assist_medica
+GROUP BY m.nome, m.estado
+HAVING SUM(cm.total_obitos) > 100
+ORDER BY pct_sem_assist_medica DESC, obitos_baixa_escolaridade DESC
+LIMIT 20;
+
+-- 3. Óbitos relacionados a acidente de trabalho por ocupação
+SELECT
+    o.descricao_ocupacao,
+    SUM(co.total_obitos) AS total
+FROM bdsm.cubo_ocupacao_acidente co
+JOIN bdsm.ocupacao o ON co.ocupacao_habitual = o.id_ocupacao
+JOIN bdsm.acidente_de_trabalho at ON co.acidente_de_trabalho_id = at.id_acidente
+WHERE at.descricao_acidente = 'Sim'
+GROUP BY o.descricao_ocupacao
+ORDER BY total DESC
+LIMIT 10;
+
+-- 4. Mortalidade infantil por condições maternas
+SELECT
+    'Peso ao nascer' AS fator,
+    ci.faixa_peso AS categoria,
+    SUM(ci.total_obitos) AS total_obitos,
+    ROUND(SUM(ci.soma_idade_mae) * 1.0 / NULLIF(SUM(ci.maes_com_idade), 0), 1) AS idade_media_mae
+FROM bdsm.cubo_mortalidade_infantil ci
+WHERE ci.faixa_peso IS NOT NULL
+GROUP BY fator, categoria
+
+UNION ALL
+
+SELECT
+    'Semanas de gestação' AS fator,
+    ci.faixa_gestacao AS categoria,
+    SUM(ci.total_obitos) AS total_obitos,
+    ROUND(SUM(ci.soma_idade_mae) * 1.0 / NULLIF(SUM(ci.maes_com_idade), 0), 1) AS idade_media_mae
+FROM bdsm.cubo_mortalidade_infantil ci
+WHERE ci.faixa_gestacao IS NOT NULL
+GROUP BY fator, categoria
+ORDER BY fator, total_obitos DESC;
+
+
+-- 5. Mortalidade por faixa etária e escolaridade
+SELECT
+    CASE
+        WHEN idade < 20 THEN 'Menos de 20'
+        WHEN idade BETWEEN 20 AND 39 THEN '20-39'
+        WHEN idade BETWEEN 40 AND 59 THEN '40-59'
+        WHEN idade BETWEEN 60 AND 79 THEN '60-79'
+        ELSE '80+'
+    END AS faixa_etaria,
+    e.nivel_escolaridade,
+    SUM(ce.total_obitos) AS total
+FROM bdsm.cubo_idade_escolaridade ce
+JOIN bdsm.escolaridade e ON ce.escolaridade_nivel_id = e.id_escolaridade
+GROUP BY faixa_etaria, e.nivel_escolaridade
+ORDER BY faixa_etaria, e.nivel_escolaridade
+LIMIT 10;
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# --- TIPOS DAS COLUNAS DE CADA TABELA (conforme schema.sql) ---
+# 'int8'/'int16'/'int32': inteiros com nulos; 'texto': string; 'categoria': string
+# codificada em dicionário (poucos valores distintos); 'data': date32; 'hora': time32.
+# Os códigos CNES seguem numéricos, como no CSV, para casar com Obito.estabelecimento_de_saude_id.
+TIPOS_DAS_COLUNAS = {
+    'Sexo': {'id_sexo': 'int8', 'descricao_sexo': 'categoria'},
+    'Raca_Cor': {'id_cor': 'int8', 'descricao_cor': 'categoria'},
+    'Situacao_Conjugal': {'id_situacao_conjugal': 'int8', 'descricao_conjugal': 'categoria'},
+    'Escolaridade': {'id_escolaridade': 'int8', 'nivel_escolaridade': 'categoria'},
+    'Tipo_de_Gravidez': {'id': 'int8', 'descricao_gravidez': 'categoria'},
+    'Tipo_de_Parto': {'id': 'int8', 'descricao_parto': 'categoria'},
+    'Atestante': {'id_atestante': 'int8', 'descricao_atestante': 'categoria'},
+    'Acidente_de_Trabalho': {'id_acidente': 'int8', 'descricao_acidente': 'categoria'},
+    'Localidade': {'id_localidade': 'int8', 'tipo_localidade': 'categoria'},
+    'Tipo_de_Morte': {'id': 'int8', 'descricao_morte': 'categoria'},
+    'Recebeu_Assist_Medica': {'id_assist_medica': 'int8', 'descricao_assist_med': 'categoria'},
+    'Feito_Necropsia': {'id_necropsia': 'int8', 'descricao_necropsia': 'categoria'},
+    'Obito_Gravidez': {'id_obito_gravidez': 'int8', 'descricao_obito_gravidez': 'categoria'},
+    'Obito_Puerperio': {'id_puerperio': 'int8', 'descricao_puerperio': 'categoria'},
+    'Situacao_Gestacional': {'id_gestacional': 'int8', 'descricao_gestacional': 'categoria'},
+    'Fonte': {'id_fonte': 'int8', 'descricao_fonte': 'categoria'},
+    'Nivel_Investigador': {'id_investigador': 'categoria', 'descricao_nivel': 'categoria'},
+    'Alteracao': {'id_alteracao': 'int8', 'descricao_alteracao': 'categoria'},
+    'Foi_Investigado': {'id_investigado': 'int8', 'descricao_investigado': 'categoria'},
+    'Resgate': {'id_resgate': 'int8', 'descricao_resgate': 'categoria'},
+    'Ocupacao': {'id_ocupacao': 'texto', 'descricao_ocupacao': 'texto'},
+    'Municipio': {'codigo_do_municipio': 'int32', 'nome': 'texto', 'estado': 'categoria'},
+    'CID': {'id_cid': 'texto', 'descricao_cid': 'texto'},
+    'Mae': {
+        'id_mae': 'int32', 'idade': 'int16', 'ocupacao_habitual': 'texto', 'tipo_de_gravidez_id': 'int8',
+        'escolaridade_nivel_id': 'int8', 'numero_de_filhos_vivos': 'int16', 'numero_de_filhos_mortos': 'int16',
+        'semanas_gestacao': 'int16', 'tipo_de_parto_id': 'int8',
+    },
+    'Atestado_de_Obito': {
+        'id_atestado_obito': 'int32', 'data_cadastro': 'data', 'data_atestado': 'data',
+        'atestante_id': 'int8', 'acidente_de_trabalho_id': 'int8',
+    },
+    'Atestado_Causa': {'atestado_de_obito_id': 'int32', 'cid_id': 'categoria', 'linha': 'categoria'},
+    'Investigacao': {
+        'id': 'int32', 'data_inicio': 'data', 'data_conclusao_invest': 'data', 'data_conclusao_caso': 'data',
+        'fonte_id': 'int8', 'nivel_investigador': 'categoria', 'ocorreu_alteracao_id': 'int8',
+        'foi_investigado': 'int8', 'resgate_de_info': 'int8',
+    },
+    'Estabelecimento_de_Saude': {'codigo_cnes': 'int32', 'nome': 'texto', 'codigo_municipio_id': 'int32'},
+    'Obito': {
+        'id': 'int32', 'atestado_de_obito_id': 'int32', 'local_obito_id': 'int8', 'tipo_de_morte_id': 'int8',
+        'data_ocorrencia': 'data', 'hora_ocorrencia': 'hora', 'codigo_municipio_ocorrencia_id': 'int32',
+        'recebeu_assist_med_id': 'int8', 'foi_feita_necrospia_id': 'int8', 'obito_gravidez_id': 'int8',
+        'obito_puerperio_id': 'int8', 'estabelecimento_de_saude_id': 'int32', 'situacao_gestacional': 'int8',
+        'investigacao_id': 'int32',
+    },
+    'Falecido': {
+        'id': 'int32', 'obito_id': 'int32', 'data_nascimento': 'data', 'idade_original': 'texto',
+        'sexo_id': 'int8', 'cor_id': 'int8', 'peso_ao_nascer': 'int16', 'situacao_conjugal_id': 'int8',
+        'ocupacao_habitual': 'texto', 'municipio_residencia_id': 'int32', 'municipio_naturalidade_id': 'int32',
+        'mae_id': 'int32', 'escolaridade_nivel_id': 'int8',
+    },
+    # Ids dos registros alterados na carga incremental (não é uma tabela do schema)
+    'Registros_Alterados': {'id': 'int32'},
+}
+
+
+def exigir_pyarrow():
+    if pa is None:
+        raise ImportError("O formato Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+
+
+def tipo_arrow(tipo: str):
+    return {
+        'int8': pa.int8(), 'int16': pa.int16(), 'int32': pa.int32(),
+        'texto': pa.string(), 'categoria': pa.dictionary(pa.int32(), pa.string()),
+        'data': pa.date32(), 'hora': pa.time32('s'),
+    }[tipo]
+
+
+def esquema_arrow(nome_tabela: str):
+    """Retorna o schema Arrow da tabela a partir de TIPOS_DAS_COLUNAS."""
+    exigir_pyarrow()
+    return pa.schema([(coluna, tipo_arrow(tipo)) for coluna, tipo in TIPOS_DAS_COLUNAS[nome_tabela].items()])
+
+
+def inteiros_validos(numeros: np.ndarray, tipo: str) -> np.ndarray:
+    """Máscara dos valores (float) inteiros e dentro da faixa do tipo `tipo` ('int8', 'Int16'...); nulos dão False."""
+    limites = np.iinfo(tipo.lower())
+    with np.errstate(invalid='ignore'):
+        return ~np.isnan(numeros) & (numeros % 1 == 0) & (numeros >= limites.min) & (numeros <= limites.max)
+
+
+def converter_coluna_arrow(serie: pd.Series, tipo: str):
+    """
+    Converte uma coluna do pandas para o array Arrow do tipo declarado. Nas colunas
+    inteiras, valores não numéricos, fracionários ou fora da faixa viram nulo, com a
+    mesma regra do preprocess.converter_codigo.
+    """
+    if tipo in ('int8', 'int16', 'int32'):
+        numeros = pd.to_numeric(serie, errors='coerce').astype('float64')
+        numeros = numeros.where(inteiros_validos(numeros.to_numpy(), tipo))
+        return pa.array(numeros, type=tipo_arrow(tipo), from_pandas=True)
+    if tipo == 'data':
+        return pa.array(pd.to_datetime(serie, errors='coerce'), from_pandas=True).cast(pa.date32())
+    if tipo == 'hora':
+        return pa.array(serie.astype(object), type=pa.time32('s'), from_pandas=True)
+
+    array = pa.array(serie.astype(object), type=pa.string(), from_pandas=True)
+    return array.dictionary_encode() if tipo == 'categoria' else array
+
+
+def para_tabela_arrow(df: pd.DataFrame, nome_tabela: str):
+    """Converte o DataFrame de uma tabela em uma tabela Arrow com o schema explícito dela."""
+    esquema = esquema_arrow(nome_tabela)
+    arrays = [converter_coluna_arrow(df[campo.name], TIPOS_DAS_COLUNAS[nome_tabela][campo.name]) for campo in esquema]
+    return pa.Table.from_arrays(arrays, schema=esquema)
+
+
+def ler_tabela_parquet(caminho, colunas: list = None) -> pd.DataFrame:
+    """Lê uma tabela Parquet para o pandas: inteiros com nulos viram float, datas e horas viram objetos date/time."""
+    exigir_pyarrow()
+    return pq.read_table(caminho, columns=colunas).to_pandas()
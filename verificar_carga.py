@@ -0,0 +1,255 @@
+import io
+import re
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import gen_sql_inserts
+import tabelas_parquet
+
+# --- CONFIGURAÇÕES ---
+PASTA_TABELAS = "Tables"
+FORMATO_TABELAS = 'csv'  # Formato das tabelas geradas pelo preprocess.py: 'csv' ou 'parquet'
+REGISTROS_ALTERADOS_DE_TESTE = 50  # Óbitos marcados como alterados no delta da verificação incremental
+
+PADRAO_STAGING = re.compile(r'CREATE TEMP TABLE (\w+) \(LIKE (bdsm\.\w+) INCLUDING DEFAULTS\);')
+
+
+@contextmanager
+def configuracao_gen_sql(**valores):
+    """Troca temporariamente as configurações do gen_sql_inserts.py, restaurando-as no fim."""
+    anteriores = {nome: getattr(gen_sql_inserts, nome) for nome in valores}
+    for nome, valor in valores.items():
+        setattr(gen_sql_inserts, nome, valor)
+    try:
+        yield
+    finally:
+        for nome, valor in anteriores.items():
+            setattr(gen_sql_inserts, nome, valor)
+
+
+def comandos_do_script(texto: str):
+    """
+    Percorre um script de dados do gen_sql_inserts.py e gera, na ordem, cada comando SQL
+    como ('sql', comando) e cada bloco COPY como ('copy', (destino, colunas, registros)),
+    lido com gen_sql_inserts.ler_blocos_copy.
+    """
+    linhas = iter(texto.split('\n'))
+    comando = []
+    for linha in linhas:
+        if not comando and (not linha.strip() or linha.startswith('--')):
+            continue
+        if not comando and linha.startswith('COPY '):
+            bloco = [linha]
+            for registro in linhas:
+                bloco.append(registro)
+                if registro == '\\.':
+                    break
+            (destino, (colunas, registros)), = gen_sql_inserts.ler_blocos_copy('\n'.join(bloco)).items()
+            yield 'copy', (destino, colunas, registros)
+            continue
+        comando.append(linha)
+        if linha.endswith(';'):
+            yield 'sql', '\n'.join(comando)
+            comando = []
+
+
+def executar_script_no_sqlite(conexao: sqlite3.Connection, texto: str):
+    """
+    Executa no SQLite um script de dados do gen_sql_inserts.py (sem schema, índices e
+    cubos). Cada bloco COPY vira um INSERT simples, que falha com chave repetida como o
+    COPY do PostgreSQL, e as tabelas temporárias de staging copiam as colunas do destino.
+    """
+    for tipo, conteudo in comandos_do_script(texto):
+        if tipo == 'copy':
+            destino, colunas, registros = conteudo
+            nomes_colunas_sql = ', '.join(f'"{coluna}"' for coluna in colunas)
+            conexao.executemany(f"INSERT INTO {destino} ({nomes_colunas_sql}) VALUES ({', '.join('?' * len(colunas))})", registros)
+            continue
+        comando = PADRAO_STAGING.sub(r'CREATE TEMP TABLE \1 AS SELECT * FROM \2 WHERE 0;', conteudo)
+        # No SQLite, o ON CONFLICT depois de INSERT ... SELECT ... FROM precisa de um WHERE para não ser lido como junção
+        comando = re.sub(r'(FROM stg_\w+) ON CONFLICT', r'\1 WHERE true ON CONFLICT', comando)
+        conexao.execute(comando)
+    conexao.commit()
+
+
+def coluna_igual(original: pd.Series, lida: pd.Series) -> bool:
+    """Compara uma coluna do DataFrame com a lida de volta do COPY (texto, com None para nulos)."""
+    if gen_sql_inserts.eh_coluna_numerica(original):
+        return np.array_equal(pd.to_numeric(original).astype('float64').to_numpy(),
+                              pd.to_numeric(lida).astype('float64').to_numpy(), equal_nan=True)
+    esperada = [None if pd.isna(valor) else str(valor) for valor in original]
+    return esperada == lida.tolist()
+
+
+def ida_e_volta_copy(nome_tabela: str, df: pd.DataFrame) -> list:
+    """Escreve o DataFrame como bloco COPY, lê de volta com ler_blocos_copy e retorna as colunas que mudaram."""
+    f_out = io.StringIO()
+    gen_sql_inserts.escrever_copy_tabela(f_out, nome_tabela, df, usar_staging=False)
+    colunas, registros = gen_sql_inserts.ler_blocos_copy(f_out.getvalue())[f"bdsm.{nome_tabela}"]
+    if colunas != list(df.columns) or len(registros) != len(df):
+        return list(df.columns)
+    lido = pd.DataFrame(registros, columns=colunas, dtype=object)
+    return [coluna for coluna in df.columns if not coluna_igual(df[coluna], lido[coluna])]
+
+
+def verificar_ida_e_volta_copy() -> bool:
+    """
+    Confere que o formato COPY preserva os dados: um DataFrame com tabulações, quebras
+    de linha, barras invertidas, o texto '\\N', textos vazios e nulos, e as tabelas de
+    PASTA_TABELAS (se existirem), são escritos com escrever_copy_tabela, lidos de volta
+    com ler_blocos_copy e comparados com a origem.
+    """
+    casos = {'Casos_Especiais': pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6, 7],
+        'texto': ['a\tb', 'linha 1\nlinha 2\r\n', 'C:\\pasta\\arquivo', '\\N', '', None, "aspas ' \" e acentuação"],
+        'numero': [1.5, None, 3.0, 0.0, -2.0, 1e6, 7.25],
+        'codigo': pd.array([1, None, 3, 4, None, 6, 7], dtype='Int16'),
+    })}
+    pasta_tabelas = Path(PASTA_TABELAS)
+    for nome_tabela in gen_sql_inserts.ORDEM_DE_CARGA:
+        caminho_tabela = pasta_tabelas / f"{nome_tabela}.{FORMATO_TABELAS}"
+        if caminho_tabela.exists():
+            casos[nome_tabela] = gen_sql_inserts.ler_tabela(caminho_tabela, FORMATO_TABELAS)
+
+    tudo_certo = True
+    for nome_tabela, df in casos.items():
+        diferentes = ida_e_volta_copy(nome_tabela, df)
+        tudo_certo &= not diferentes
+        print(f"COPY ida e volta {nome_tabela:<26} {len(df):>8} linhas | "
+              f"{'OK' if not diferentes else f'DIFERENTE nas colunas {diferentes}'}")
+    return tudo_certo
+
+
+def conteudo_do_banco(conexao: sqlite3.Connection) -> dict:
+    """Linhas de cada tabela do banco, ordenadas, para comparar dois estados da carga."""
+    return {
+        nome_tabela: sorted(conexao.execute(f"SELECT * FROM bdsm.{nome_tabela}").fetchall(), key=repr)
+        for nome_tabela in gen_sql_inserts.ORDEM_DE_CARGA
+    }
+
+
+def linhas_esperadas(pasta_tabelas: Path) -> dict:
+    """Linhas de cada tabela depois da carga: as do arquivo, sem as chaves de conflito repetidas."""
+    esperadas = {}
+    for nome_tabela in gen_sql_inserts.ORDEM_DE_CARGA:
+        caminho_tabela = pasta_tabelas / f"{nome_tabela}.{FORMATO_TABELAS}"
+        if caminho_tabela.exists():
+            df = gen_sql_inserts.ler_tabela(caminho_tabela, FORMATO_TABELAS)
+            esperadas[nome_tabela] = len(df.drop_duplicates(subset=gen_sql_inserts.colunas_de_conflito(nome_tabela)))
+        else:
+            esperadas[nome_tabela] = 0
+    return esperadas
+
+
+def verificar_carga_direta_sqlite() -> bool:
+    """
+    Carrega as tabelas duas vezes no mesmo SQLite com a carga direta (conectar_sqlite e
+    carregar_no_banco) e confere que a primeira carga tem as linhas esperadas de cada
+    tabela e que a segunda não muda nada (a carga é idempotente).
+    """
+    pasta_tabelas = Path(PASTA_TABELAS)
+    if not pasta_tabelas.exists():
+        print(f"ERRO: A pasta '{PASTA_TABELAS}' não foi encontrada.")
+        return False
+
+    esperadas = linhas_esperadas(pasta_tabelas)
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        conexao = gen_sql_inserts.conectar_sqlite(Path(pasta_temporaria) / 'bdsim.sqlite')
+        estados = []
+        with configuracao_gen_sql(PASTA_CSVS=str(pasta_tabelas), FORMATO_TABELAS=FORMATO_TABELAS, MODO_INCREMENTAL=False):
+            for _ in range(2):
+                gen_sql_inserts.carregar_no_banco(conexao, criar_schema=False, executar_pos_carga=False)
+                estados.append(conteudo_do_banco(conexao))
+        conexao.close()
+
+    primeira, segunda = estados
+    tudo_certo = True
+    for nome_tabela in gen_sql_inserts.ORDEM_DE_CARGA:
+        igual = len(primeira[nome_tabela]) == esperadas[nome_tabela] and primeira[nome_tabela] == segunda[nome_tabela]
+        tudo_certo &= igual
+        print(f"Carga direta {nome_tabela:<26} {esperadas[nome_tabela]:>8} esperadas | {len(primeira[nome_tabela]):>8} na 1a carga | "
+              f"{len(segunda[nome_tabela]):>8} na 2a | {'OK' if igual else 'DIFERENTE'}")
+    return tudo_certo
+
+
+def escrever_registros_alterados(pasta: Path, ids: pd.Series):
+    """Grava a tabela Registros_Alterados do delta no formato das demais tabelas."""
+    nome_tabela = gen_sql_inserts.TABELA_REGISTROS_ALTERADOS
+    df = pd.DataFrame({'id': ids})
+    if FORMATO_TABELAS == 'parquet':
+        tabelas_parquet.pq.write_table(tabelas_parquet.para_tabela_arrow(df, nome_tabela), pasta / f"{nome_tabela}.parquet")
+    else:
+        df.to_csv(pasta / f"{nome_tabela}.csv", index=False)
+
+
+def verificar_copy_incremental() -> bool:
+    """
+    Carrega as tabelas em um SQLite, gera um script incremental em formato COPY cujo
+    delta repete todas as linhas já carregadas (com alguns óbitos marcados como
+    alterados) e o executa sobre o banco já populado. O script não pode reemitir as
+    tabelas estáticas nem fazer COPY direto em tabelas do banco, e o banco deve
+    terminar igual ao de antes.
+    """
+    pasta_tabelas = Path(PASTA_TABELAS)
+    if not pasta_tabelas.exists():
+        print(f"ERRO: A pasta '{PASTA_TABELAS}' não foi encontrada.")
+        return False
+
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        pasta_temporaria = Path(pasta_temporaria)
+        with configuracao_gen_sql(PASTA_CSVS=str(pasta_tabelas), FORMATO_TABELAS=FORMATO_TABELAS, MODO_INCREMENTAL=False):
+            conexao = gen_sql_inserts.conectar_sqlite(pasta_temporaria / 'bdsim.sqlite')
+            gen_sql_inserts.carregar_no_banco(conexao, criar_schema=False, executar_pos_carga=False)
+        antes = conteudo_do_banco(conexao)
+
+        pasta_delta = pasta_temporaria / 'delta'
+        shutil.copytree(pasta_tabelas, pasta_delta)
+        ids_obito = gen_sql_inserts.ler_tabela(pasta_delta / f"Obito.{FORMATO_TABELAS}", FORMATO_TABELAS)['id']
+        escrever_registros_alterados(pasta_delta, ids_obito.head(REGISTROS_ALTERADOS_DE_TESTE))
+
+        arquivo_script = pasta_temporaria / 'incremental.sql'
+        with configuracao_gen_sql(
+            PASTA_CSVS=str(pasta_delta), FORMATO_TABELAS=FORMATO_TABELAS, MODO_INCREMENTAL=True,
+            ARQUIVO_SAIDA=str(arquivo_script), CRIAR_INDICES=False, GERAR_CUBOS=False,
+            ARQUIVO_RELATORIO_EXECUCAO=str(pasta_temporaria / 'relatorio_gen_sql.json'),
+        ):
+            gen_sql_inserts.gerar_script_sql_com_inserts('copy')
+        texto = arquivo_script.read_text(encoding='utf-8')
+
+        tudo_certo = True
+        reemitidas = [tabela for tabela in gen_sql_inserts.TABELAS_ESTATICAS if re.search(rf'\bbdsm\.{tabela}\b', texto)]
+        if reemitidas:
+            print(f"ERRO: O script incremental reemite as tabelas estáticas {reemitidas}.")
+            tudo_certo = False
+        diretos = re.findall(r'^COPY (bdsm\.\w+)', texto, flags=re.MULTILINE)
+        if diretos:
+            print(f"ERRO: O script incremental faz COPY direto em tabelas já carregadas: {diretos}.")
+            tudo_certo = False
+
+        try:
+            executar_script_no_sqlite(conexao, texto)
+        except sqlite3.Error as erro:
+            print(f"ERRO: O script incremental falhou no banco já populado: {erro}")
+            conexao.close()
+            return False
+        depois = conteudo_do_banco(conexao)
+        conexao.close()
+
+    for nome_tabela in gen_sql_inserts.ORDEM_DE_CARGA:
+        igual = antes[nome_tabela] == depois[nome_tabela]
+        tudo_certo &= igual
+        print(f"{nome_tabela:<26} {len(antes[nome_tabela]):>8} linhas antes | {len(depois[nome_tabela]):>8} depois | "
+              f"{'OK' if igual else 'DIFERENTE'}")
+    return tudo_certo
+
+
+if __name__ == '__main__':
+    resultados = [verificar_ida_e_volta_copy(), verificar_carga_direta_sqlite(), verificar_copy_incremental()]
+    if not all(resultados):
+        raise SystemExit(1)
@@ -0,0 +1,133 @@
+import re
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+import gen_sql_inserts
+import tabelas_parquet
+
+# --- CONFIGURAÇÕES ---
+PASTA_TABELAS = "Tables"
+FORMATO_TABELAS = 'csv'  # Formato das tabelas geradas pelo preprocess.py: 'csv' ou 'parquet'
+ARQUIVO_CUBOS = 'cubos.sql'
+ARQUIVO_CONSULTAS = 'queries.sql'
+ARQUIVO_CONSULTAS_CUBOS = 'queries_cubos.sql'
+
+
+def idade_em_anos(data_fim: str, data_inicio: str):
+    """Equivalente a EXTRACT(YEAR FROM AGE(data_fim, data_inicio)) do PostgreSQL, para datas ISO."""
+    if data_fim is None or data_inicio is None:
+        return None
+    fim, inicio = date.fromisoformat(data_fim), date.fromisoformat(data_inicio)
+    return fim.year - inicio.year - ((fim.month, fim.day) < (inicio.month, inicio.day))
+
+
+def adaptar_para_sqlite(comando: str) -> str:
+    """Troca as construções do PostgreSQL usadas nas consultas pelas equivalentes do SQLite."""
+    comando = re.sub(r'EXTRACT\(YEAR FROM AGE\(([^()]*)\)\)', r'idade_em_anos(\1)', comando)
+    return comando.replace('::INT', '')
+
+
+def separar_comandos(texto: str) -> list:
+    """Separa um arquivo .sql em comandos, descartando os trechos que só têm comentários."""
+    comandos = []
+    for comando in texto.split(';'):
+        sem_comentarios = re.sub(r'/\*.*?\*/|--[^\n]*', '', comando, flags=re.DOTALL)
+        if sem_comentarios.strip():
+            comandos.append(comando.strip())
+    return comandos
+
+
+def carregar_tabela(caminho: Path, nome_tabela: str) -> pd.DataFrame:
+    """Lê uma tabela gerada pelo preprocess.py com os tipos de tabelas_parquet.TIPOS_DAS_COLUNAS."""
+    if FORMATO_TABELAS == 'parquet':
+        df = tabelas_parquet.ler_tabela_parquet(caminho)
+    else:
+        df = pd.read_csv(caminho, dtype=str)
+
+    for coluna, tipo in tabelas_parquet.TIPOS_DAS_COLUNAS[nome_tabela].items():
+        if tipo in ('int8', 'int16', 'int32'):
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce').astype('Int64')
+        else:
+            df[coluna] = df[coluna].astype('string')
+
+    # As chaves repetidas seriam descartadas pelo ON CONFLICT DO NOTHING na carga
+    return df.drop_duplicates(subset=gen_sql_inserts.colunas_de_conflito(nome_tabela))
+
+
+def criar_banco(pasta_tabelas: Path) -> sqlite3.Connection:
+    """Carrega as tabelas em um SQLite em memória, com o schema anexado como 'bdsm'."""
+    conexao = sqlite3.connect(':memory:')
+    conexao.execute("ATTACH DATABASE ':memory:' AS bdsm")
+    conexao.create_function('idade_em_anos', 2, idade_em_anos, deterministic=True)
+
+    for nome_tabela in gen_sql_inserts.ORDEM_DE_CARGA:
+        caminho_tabela = pasta_tabelas / f"{nome_tabela}.{FORMATO_TABELAS}"
+        if not caminho_tabela.exists():
+            print(f"AVISO: Arquivo '{caminho_tabela}' não encontrado. Pulando a tabela '{nome_tabela}'.")
+            continue
+        df = carregar_tabela(caminho_tabela, nome_tabela)
+        colunas = ', '.join(f'"{coluna}"' for coluna in df.columns)
+        conexao.execute(f"CREATE TABLE bdsm.{nome_tabela} ({colunas})")
+        linhas = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        conexao.executemany(f"INSERT INTO bdsm.{nome_tabela} VALUES ({', '.join('?' * len(df.columns))})", linhas)
+    return conexao
+
+
+def executar(conexao: sqlite3.Connection, comando: str):
+    """Executa uma consulta e retorna as linhas e o tempo de parede em segundos."""
+    inicio = time.perf_counter()
+    linhas = conexao.execute(adaptar_para_sqlite(comando)).fetchall()
+    return linhas, time.perf_counter() - inicio
+
+
+def normalizar_resultado(linhas: list) -> list:
+    """Ordena as linhas e arredonda os números, para comparar resultados independentemente de empates."""
+    def normalizar(valor):
+        return round(float(valor), 6) if isinstance(valor, (int, float)) else valor
+    return sorted((tuple(normalizar(valor) for valor in linha) for linha in linhas), key=repr)
+
+
+def verificar_cubos() -> bool:
+    """
+    Constrói os cubos sobre as tabelas geradas e confere que cada consulta de
+    queries.sql e sua versão em queries_cubos.sql retornam o mesmo resultado. O LIMIT
+    final é removido das duas, para comparar o resultado inteiro (e não só o topo,
+    que pode variar entre empates).
+    """
+    pasta_tabelas = Path(PASTA_TABELAS)
+    if not pasta_tabelas.exists():
+        print(f"ERRO: A pasta '{PASTA_TABELAS}' não foi encontrada.")
+        return False
+
+    conexao = criar_banco(pasta_tabelas)
+
+    inicio = time.perf_counter()
+    for comando in separar_comandos(Path(ARQUIVO_CUBOS).read_text(encoding='utf-8')):
+        conexao.execute(adaptar_para_sqlite(comando))
+    print(f"Cubos construídos em {time.perf_counter() - inicio:.3f} s.")
+
+    consultas = separar_comandos(Path(ARQUIVO_CONSULTAS).read_text(encoding='utf-8'))
+    consultas_cubos = separar_comandos(Path(ARQUIVO_CONSULTAS_CUBOS).read_text(encoding='utf-8'))
+    if len(consultas) != len(consultas_cubos):
+        print(f"ERRO: '{ARQUIVO_CONSULTAS}' tem {len(consultas)} consultas e '{ARQUIVO_CONSULTAS_CUBOS}' tem {len(consultas_cubos)}.")
+        return False
+
+    tudo_certo = True
+    for numero, (consulta, consulta_cubo) in enumerate(zip(consultas, consultas_cubos), start=1):
+        linhas, tempo = executar(conexao, re.sub(r'\s+LIMIT\s+\d+\s*$', '', consulta))
+        linhas_cubo, tempo_cubo = executar(conexao, re.sub(r'\s+LIMIT\s+\d+\s*$', '', consulta_cubo))
+        igual = normalizar_resultado(linhas) == normalizar_resultado(linhas_cubo)
+        tudo_certo &= igual
+        print(f"Consulta {numero}: {len(linhas):>6} linhas | original {tempo:8.4f} s | cubos {tempo_cubo:8.4f} s "
+              f"({tempo / max(tempo_cubo, 1e-9):.1f}x) | {'OK' if igual else 'DIFERENTE'}")
+
+    return tudo_certo
+
+
+if __name__ == '__main__':
+    if not verificar_cubos():
+        raise SystemExit(1)
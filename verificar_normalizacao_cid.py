@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+import preprocess
+
+# --- CONFIGURAÇÕES ---
+LINHAS_DE_TESTE_GERADAS = 20000
+SEMENTE = 0
+
+
+def causas_com_melt(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementação original (melt + split + explode + regex), mantida como referência de `preprocess.normalizar_causas`."""
+    df_causas = df.melt(
+        id_vars=['id_sequencial'], value_vars=list(preprocess.MAPA_LINHAS_CID),
+        var_name='linha_original', value_name='cid_raw'
+    )
+    df_causas.dropna(subset=['cid_raw'], inplace=True)
+    df_causas['cid_id'] = df_causas['cid_raw'].str.split('[/*]')
+    df_causas = df_causas.explode('cid_id')
+    df_causas['cid_id'] = df_causas['cid_id'].str.strip()
+    df_causas['cid_id'] = df_causas['cid_id'].str.replace('X$', '', regex=True)
+    df_causas['linha'] = df_causas['linha_original'].map(preprocess.MAPA_LINHAS_CID)
+    df_causas_final = df_causas[['id_sequencial', 'cid_id', 'linha']].copy()
+    df_causas_final.rename(columns={'id_sequencial': 'atestado_de_obito_id'}, inplace=True)
+    return df_causas_final[df_causas_final['cid_id'] != '']
+
+
+def gerar_colunas_cid(numero_de_linhas: int, semente: int = 0) -> pd.DataFrame:
+    """Gera as colunas LINHA*/CAUSABAS com CIDs múltiplos, separadores '*' e '/', 'X' final e nulos."""
+    rng = np.random.default_rng(semente)
+    textos = ['*I219', '*J189X', '*C349/*I10', '*R99', '*A419*E149X', '*X59', '*I64 ', '*K746', 'X', ' *I10X*I10 ', '**', '*N179/', '*I1 X']
+    df = pd.DataFrame({'id_sequencial': np.arange(1, numero_de_linhas + 1)})
+    for coluna, taxa_de_nulos in zip(preprocess.MAPA_LINHAS_CID, (0.1, 0.3, 0.5, 0.8, 0.5, 0.0)):
+        valores = rng.choice(textos, numero_de_linhas).astype(object)
+        valores[rng.random(numero_de_linhas) < taxa_de_nulos] = np.nan
+        df[coluna] = valores
+    return df
+
+
+def montar_caso(valores_por_linha: list) -> pd.DataFrame:
+    """Monta um DataFrame de atestados em que a linha i tem o mesmo texto em todas as colunas de CID."""
+    df = pd.DataFrame({'id_sequencial': np.arange(1, len(valores_por_linha) + 1, dtype=np.int64)})
+    for coluna in preprocess.MAPA_LINHAS_CID:
+        df[coluna] = pd.Series(valores_por_linha, dtype=object)
+    return df
+
+
+def casos_de_teste() -> dict:
+    """Casos de borda da normalização de CIDs, além de um lote gerado aleatoriamente."""
+    casos = {
+        'sem_linhas': montar_caso([]),
+        'vazios_e_nulos': montar_caso(['', ' ', '**', '*/', 'X', ' X ', None, np.nan]),
+        'cids_repetidos': montar_caso(['*I10X*I10', '*I10/*I10X', '*J189*J189*J189', ' *I10X*I10 ']),
+        'cids_desconhecidos': montar_caso(['*Z999', '*ZZZ*I10', 'i10', '*12345X', '*ÇÃO', '*I10XX', '*X']),
+        'gerados': gerar_colunas_cid(LINHAS_DE_TESTE_GERADAS, SEMENTE),
+    }
+    # Colunas inteiras nulas (total == 0 em normalizar_causas) ao lado de colunas preenchidas
+    misto = montar_caso(['*I219', '*J189X*I10', None])
+    misto[list(preprocess.MAPA_LINHAS_CID)[1:3]] = np.nan
+    casos['colunas_nulas'] = misto
+    return casos
+
+
+def resultados_iguais(esperado: pd.DataFrame, obtido: pd.DataFrame) -> bool:
+    """Compara as linhas de Atestado_Causa como texto, na mesma ordem."""
+    return esperado.reset_index(drop=True).astype(str).equals(obtido.reset_index(drop=True).astype(str))
+
+
+def verificar_normalizacao_cid() -> bool:
+    """
+    Confere que `preprocess.normalizar_causas` gera as mesmas linhas que a implementação
+    original em cada caso, com um cache novo e com o cache compartilhado entre os casos
+    (como acontece entre os lotes do preprocess.py).
+    """
+    cache_compartilhado = {}
+    tudo_ok = True
+    for nome, df in casos_de_teste().items():
+        esperado = causas_com_melt(df)
+        iguais = (resultados_iguais(esperado, preprocess.normalizar_causas(df, {}))
+                  and resultados_iguais(esperado, preprocess.normalizar_causas(df, cache_compartilhado)))
+        print(f"{nome:<20} {len(esperado):>8} linhas  {'OK' if iguais else 'DIFERENTE'}")
+        tudo_ok &= iguais
+    return tudo_ok
+
+
+if __name__ == '__main__':
+    if not verificar_normalizacao_cid():
+        print("ERRO: a normalização de CIDs difere da implementação original.")
+        raise SystemExit(1)
+    print("A normalização de CIDs é equivalente à implementação original.")